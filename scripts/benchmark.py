@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""Benchmark corpus loading, verse lookup, served payloads and the image pipeline.
+
+Suites:
+
+    parse      per corpus file: size, cold and warm json parse time, peak RSS
+               (each file is measured in a fresh forked process; "cold" first
+               drops the file from the page cache where the OS allows it)
+    lookup     verse lookup latency by streaming the source JSON (corpus_reader),
+               from the SQLite store and from the Gita shards, when those are built
+    payload    bytes (and gzip bytes for JSON) of every file the app fetches
+    pipeline   generate_all_story_images.py against an offline stub
+               ImageGenerationModel, so only our own per-section overhead
+               (planning, cache manifest, story JSON updates, threads) is timed
+
+Results are written to build/benchmark.json and compared with the baseline
+committed at benchmarks/baseline.json. Any measure
+that got worse by more than its tolerance is reported and the exit status is 1.
+Sizes (5%) and memory (10%) are gated tightly. Timings are only gated per
+collection, suite or lookup path, with a loose default (50%), because timings
+on a shared machine vary a lot from run to run:
+
+    python3 scripts/benchmark.py                          # compare with benchmarks/baseline.json
+    python3 scripts/benchmark.py --save-baseline          # on main: refresh the baseline, then commit it
+    python3 scripts/benchmark.py --suite parse lookup --collection gita mahabharata
+"""
+
+import argparse
+import base64
+import contextlib
+import datetime
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+import corpus_reader
+import generate_all_story_images as pipeline
+from content_sync import is_served
+from gita_shards import DEFAULT_OUT as GITA_SHARDS_DIR, GitaShards
+from scripture_store import DEFAULT_DB, ScriptureStore
+
+REPO_ROOT = corpus_reader.REPO_ROOT
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "build", "benchmark.json")
+# Committed, so every checkout compares against the same numbers.
+DEFAULT_BASELINE = os.path.join(REPO_ROOT, "benchmarks", "baseline.json")
+
+SUITES = ["parse", "lookup", "payload", "pipeline"]
+
+# Sections of the results file that are compared with the baseline, and which kinds of measure count.
+# Single-file parse times swing by tens of percent between identical runs, so only each
+# collection's total time is gated; per-file sizes and memory are stable enough to gate.
+GATES = {
+    "parse": ("time", "memory", "size"),
+    "parse-files": ("memory", "size"),
+    "lookup": ("time",),
+    "payload": ("size",),
+    "pipeline": ("time",),
+}
+
+# How a measure is compared, by unit suffix: (tolerance kind, absolute noise floor, higher is better).
+# Changes below the floor are not reported however large the ratio, since they are mostly scheduler noise.
+MEASURES = {
+    "ms": ("time", 2.0, False),
+    "us": ("time", 20.0, False),
+    "mb": ("memory", 1.0, False),
+    "bytes": ("size", 0, False),
+    "per_s": ("time", 0, True),
+}
+
+# A 1×1 PNG, written by the stub model for every generated image.
+STUB_PNG = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=")
+
+
+def rel(path: str) -> str:
+    return os.path.relpath(path, REPO_ROOT).replace(os.sep, "/")
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in KB on Linux and bytes on macOS.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1 << (20 if sys.platform == "darwin" else 10))
+
+
+# --- parse -------------------------------------------------------------------------
+
+def evict(path: str):
+    """Drop a file from the page cache so the next read comes from disk (best effort)."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+def parse_file(path: str):
+    with open(path, "rb") as f:
+        return json.loads(f.read())
+
+
+def measure_parse(path: str, repeat: int) -> dict:
+    """Runs in a freshly forked process, so ru_maxrss reflects this file alone."""
+    rss_before = max_rss_mb()
+    evict(path)
+    started = time.perf_counter()
+    try:
+        doc = parse_file(path)
+    except ValueError as e:
+        return {"bytes": os.path.getsize(path), "error": str(e)}
+    cold = time.perf_counter() - started
+    del doc
+    warm = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        doc = parse_file(path)
+        warm.append(time.perf_counter() - started)
+        del doc
+    peak = max_rss_mb()
+    return {
+        "bytes": os.path.getsize(path),
+        "cold_ms": round(cold * 1000, 2),
+        # Best of N, as timeit does: slower runs measure other load on the machine, not the parser.
+        "warm_ms": round(min(warm) * 1000, 2),
+        "peak_rss_mb": round(peak, 1),
+        "rss_growth_mb": round(peak - rss_before, 1),
+    }
+
+
+def bench_parse(collections: list[str], repeat: int) -> tuple[dict, dict]:
+    """Return (per-collection totals, per-file results)."""
+    paths = [(c, p) for c in collections for p in corpus_reader.collection_files(c)]
+    files, totals = {}, {}
+    # One task per child: every file starts from the same small parent process.
+    with multiprocessing.get_context("fork").Pool(1, maxtasksperchild=1) as pool:
+        measured = pool.starmap(measure_parse, [(p, repeat) for _, p in paths], chunksize=1)
+    for (collection, path), result in zip(paths, measured):
+        files[rel(path)] = result
+        if "error" in result:
+            print(f"  ⚠️  {rel(path)}: {result['error']}")
+            continue
+        total = totals.setdefault(collection, {"files": 0, "bytes": 0, "cold_ms": 0, "warm_ms": 0, "peak_rss_mb": 0})
+        total["files"] += 1
+        total["bytes"] += result["bytes"]
+        total["cold_ms"] = round(total["cold_ms"] + result["cold_ms"], 2)
+        total["warm_ms"] = round(total["warm_ms"] + result["warm_ms"], 2)
+        total["peak_rss_mb"] = max(total["peak_rss_mb"], result["peak_rss_mb"])
+    for collection, t in totals.items():
+        print(f"parse {collection}: {t['files']} files, {t['bytes'] / 1e6:.1f} MB, "
+              f"cold {t['cold_ms']:.0f} ms, warm {t['warm_ms']:.0f} ms, peak RSS {t['peak_rss_mb']:.0f} MB")
+    return totals, files
+
+
+# --- lookup ------------------------------------------------------------------------
+
+def sample_refs(collection: str) -> list[str]:
+    """The middle record of the first, middle and last file of a collection."""
+    files = corpus_reader.collection_files(collection)
+    if not files:
+        return []
+    refs = []
+    for path in dict.fromkeys([files[0], files[len(files) // 2], files[-1]]):
+        records = [(parts, half) for parts, half, _ in corpus_reader.load(collection, path)]
+        if records:
+            parts, half = records[len(records) // 2]
+            refs.append(corpus_reader.format_ref(collection, parts, half))
+    return refs
+
+
+def timings(fn, refs: list[str], repeat: int, scale: float) -> list[float]:
+    samples = []
+    for ref in refs:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn(ref)
+            samples.append((time.perf_counter() - started) * scale)
+    return samples
+
+
+def bench_lookup(collections: list[str], repeat: int) -> dict:
+    refs = {c: sample_refs(c) for c in collections}
+    results = {}
+
+    for collection, sample in refs.items():
+        ms = timings(lambda ref: next(corpus_reader.read(collection, ref, ref)), sample, repeat, 1000)
+        results[f"stream/{collection}"] = {"refs": len(sample), "median_ms": round(statistics.median(ms), 2),
+                                           "p95_ms": round(percentile(ms, 95), 2)}
+
+    if os.path.exists(DEFAULT_DB):
+        with ScriptureStore() as store:
+            for collection, sample in refs.items():
+                us = timings(store.get, sample, repeat * 20, 1e6)
+                results[f"store/{collection}"] = {"refs": len(sample), "median_us": round(statistics.median(us), 1),
+                                                  "p95_us": round(percentile(us, 95), 1)}
+    else:
+        print(f"  ⚠️  {rel(DEFAULT_DB)} not found, skipping store lookups (run scripture_store.py build)")
+
+    if "gita" in refs and os.path.exists(os.path.join(GITA_SHARDS_DIR, "index.json")):
+        with GitaShards(GITA_SHARDS_DIR) as gita:
+            commentary = sorted(gita.commentaries)[:1]
+
+            def verse(ref):
+                chapter, number = corpus_reader.parse_ref(ref)[1][:2]
+                gita.verse(chapter, number, commentaries=commentary)
+
+            us = timings(verse, refs["gita"], repeat * 20, 1e6)
+            results["gita-shards/gita"] = {"refs": len(refs["gita"]), "median_us": round(statistics.median(us), 1),
+                                           "p95_us": round(percentile(us, 95), 1)}
+    elif "gita" in refs:
+        print(f"  ⚠️  {rel(GITA_SHARDS_DIR)} not found, skipping Gita shard lookups (run gita_shards.py build)")
+
+    for name, r in results.items():
+        latency = f"{r['median_ms']} ms" if "median_ms" in r else f"{r['median_us']} µs"
+        print(f"lookup {name}: median {latency}")
+    return results
+
+
+# --- payload -----------------------------------------------------------------------
+
+def bench_payload() -> dict:
+    results = {}
+    for dirpath, dirnames, filenames in os.walk(REPO_ROOT):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d not in ("build", "sync"))
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            if not is_served(rel(path)):
+                continue
+            entry = {"bytes": os.path.getsize(path)}
+            if name.endswith(".json"):
+                with open(path, "rb") as f:
+                    # Level 6 is what CDNs typically serve with.
+                    entry["gzip_bytes"] = len(gzip.compress(f.read(), compresslevel=6, mtime=0))
+            results[rel(path)] = entry
+    json_files = [r for r in results.values() if "gzip_bytes" in r]
+    results["(total)"] = {
+        "files": len(results),
+        "bytes": sum(r["bytes"] for r in results.values()),
+        "json_bytes": sum(r["bytes"] for r in json_files),
+        "json_gzip_bytes": sum(r["gzip_bytes"] for r in json_files),
+    }
+    t = results["(total)"]
+    print(f"payload: {t['files']} served files, {t['bytes'] / 1e6:.0f} MB; "
+          f"JSON {t['json_bytes'] / 1e6:.1f} MB, {t['json_gzip_bytes'] / 1e6:.1f} MB gzipped")
+    return results
+
+
+# --- pipeline ----------------------------------------------------------------------
+
+class StubImageGenerationModel:
+    """Offline stand-in for vertexai's ImageGenerationModel.
+
+    generate_images() waits `latency` seconds and returns one 1×1 PNG per
+    requested image, so the pipeline can run without credentials or quota.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def generate_images(self, prompt: str, number_of_images: int = 1, aspect_ratio: str = "1:1", **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(images=[StubImage() for _ in range(number_of_images)])
+
+
+class StubImage:
+    def save(self, location: str, include_generation_parameters: bool = False):
+        with open(location, "wb") as f:
+            f.write(STUB_PNG)
+
+
+@contextlib.contextmanager
+def scratch_story_tree():
+    """Point generate_all_story_images at a temporary copy of the story JSON with no images."""
+    saved = {name: getattr(pipeline, name) for name in ("EN_DIR", "HI_DIR", "IMAGES_DIR", "CACHE_PATH")}
+    with tempfile.TemporaryDirectory() as tmp:
+        for lang_dir in ("EN_DIR", "HI_DIR"):
+            target = os.path.join(tmp, os.path.basename(saved[lang_dir]))
+            os.makedirs(target)
+            for name in os.listdir(saved[lang_dir]):
+                if name.endswith(".json"):
+                    shutil.copy(os.path.join(saved[lang_dir], name), target)
+            setattr(pipeline, lang_dir, target)
+        pipeline.IMAGES_DIR = os.path.join(tmp, "images")
+        pipeline.CACHE_PATH = os.path.join(tmp, "image-cache.json")
+        os.makedirs(pipeline.IMAGES_DIR)
+        try:
+            yield
+        finally:
+            for name, value in saved.items():
+                setattr(pipeline, name, value)
+
+
+def bench_pipeline(latency: float, workers: int, repeat: int) -> dict:
+    stories = sorted(pipeline.STORY_PROMPTS)
+    elapsed, noop = [], []
+    for _ in range(repeat):
+        model = StubImageGenerationModel(latency)
+        with scratch_story_tree(), contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            pipeline.process_stories(model, stories, workers=workers, qps=1e9)
+            elapsed.append(time.perf_counter() - started)
+            # Second pass: everything is cached, so this is pure planning cost.
+            started = time.perf_counter()
+            pipeline.process_stories(model, stories, workers=workers, qps=1e9)
+            noop.append(time.perf_counter() - started)
+    sections = model.calls
+    elapsed, noop = min(elapsed), min(noop)
+    result = {
+        "sections": sections,
+        "workers": workers,
+        "stub_latency_ms": latency * 1000,
+        "per_section_ms": round(elapsed * 1000 / max(sections, 1), 2),
+        "sections_per_s": round(sections / elapsed, 1),
+        "noop_ms": round(noop * 1000, 1),
+    }
+    print(f"pipeline: {sections} sections in {elapsed:.2f}s ({result['sections_per_s']}/s with "
+          f"{latency * 1000:.0f} ms stub latency, {workers} workers); cached re-run {result['noop_ms']} ms")
+    # Runs with a different latency or worker count aren't comparable, so they get their own key.
+    return {f"stub-{latency * 1000:g}ms-{workers}w": result}
+
+
+# --- Baseline comparison -----------------------------------------------------------
+
+def measure_rule(measure: str) -> tuple | None:
+    # Tail latency on a shared machine is too noisy to gate on; p95 is recorded for reading only.
+    if measure.startswith("p95"):
+        return None
+    return next((r for unit, r in MEASURES.items() if measure == unit or measure.endswith("_" + unit)), None)
+
+
+def compare(results: dict, baseline: dict, tolerances: dict) -> tuple[list[str], int]:
+    """Return (regression lines, number of measures compared)."""
+    regressions = []
+    compared = 0
+    for suite, kinds in GATES.items():
+        for subject, measures in results.get(suite, {}).items():
+            before = baseline.get(suite, {}).get(subject)
+            if not before:
+                continue
+            for measure, value in measures.items():
+                old = before.get(measure)
+                rule = measure_rule(measure)
+                if rule is None or rule[0] not in kinds or not old:
+                    continue
+                kind, floor, higher_is_better = rule
+                compared += 1
+                change = (old - value) if higher_is_better else (value - old)
+                if change > floor and change / old > tolerances[kind]:
+                    regressions.append(f"{suite} {subject} {measure}: {old} → {value} "
+                                       f"({'-' if higher_is_better else '+'}{change / old:.0%})")
+    return regressions, compared
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_json(path: str, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark corpus loading, lookups, payloads and the image pipeline")
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=SUITES)
+    parser.add_argument("--collection", nargs="+", choices=sorted(corpus_reader.COLLECTIONS),
+                        default=list(corpus_reader.COLLECTIONS), help="Corpora for the parse and lookup suites")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (default: 5)")
+    parser.add_argument("--stub-latency", type=float, default=0.0, metavar="MS",
+                        help="Simulated Imagen latency per request in the pipeline suite (default: 0)")
+    parser.add_argument("--workers", type=int, default=pipeline.DEFAULT_WORKERS, help="Pipeline worker threads")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"Results file (default: {rel(DEFAULT_OUTPUT)})")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help=f"Baseline to compare with (default: {rel(DEFAULT_BASELINE)})")
+    parser.add_argument("--save-baseline", action="store_true", help="Also store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed slowdown before a timing counts as a regression (default: 0.5)")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="Allowed RSS growth (default: 0.10)")
+    parser.add_argument("--size-tolerance", type=float, default=0.05, help="Allowed payload growth (default: 0.05)")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+    }
+    # parse runs first so the forked children start from the smallest possible parent.
+    if "parse" in args.suite:
+        results["parse"], results["parse-files"] = bench_parse(args.collection, args.repeat)
+    if "lookup" in args.suite:
+        results["lookup"] = bench_lookup(args.collection, args.repeat)
+    if "payload" in args.suite:
+        results["payload"] = bench_payload()
+    if "pipeline" in args.suite:
+        results["pipeline"] = bench_pipeline(args.stub_latency / 1000, args.workers, args.repeat)
+
+    write_json(args.output, results)
+    print(f"\n✓ Results written to {rel(args.output)}")
+
+    status = 0
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        tolerances = {"time": args.tolerance, "memory": args.memory_tolerance, "size": args.size_tolerance}
+        regressions, compared = compare(results, baseline, tolerances)
+        print(f"Compared {compared} measures with {rel(args.baseline)} "
+              f"({(baseline['meta'].get('commit') or '?')[:10]}, {baseline['meta'].get('date')})")
+        if (baseline["meta"].get("platform"), baseline["meta"].get("cpus")) != (results["meta"]["platform"], results["meta"]["cpus"]):
+            print(f"  ⚠️  Baseline is from another machine ({baseline['meta'].get('platform')}, "
+                  f"{baseline['meta'].get('cpus')} CPUs); timings may differ for that reason alone")
+        for line in regressions:
+            print(f"  ✗ {line}")
+        if regressions:
+            status = 1
+        else:
+            print("  ✓ No regressions")
+    elif not args.save_baseline:
+        print(f"No baseline at {rel(args.baseline)}; run with --save-baseline to create one")
+
+    if args.save_baseline:
+        write_json(args.baseline, results)
+        print(f"✓ Baseline saved to {rel(args.baseline)}")
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
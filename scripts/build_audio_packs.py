@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""Pack each story's narration into one MP3 with a section offset index.
+
+stories/{en,hi}/audio/<story-id>/ holds 0.mp3 … N.mp3 plus moral.mp3, so a
+player makes 6-8 requests per story and has to probe every file for its
+duration. This concatenates a story's files frame by frame (ID3 tags and
+Xing/Info header frames are dropped, so the result is one clean MPEG stream)
+into stories/{lang}/audio/packs/<story-id>.mp3, and writes an `audioPack`
+block into the story JSON:
+
+    "audioPack": {
+      "path": "audio/packs/vedic-agni-hymn.mp3",
+      "bytes": 569664,
+      "durationMs": 142416,
+      "segments": [
+        {"section": 0, "offset": 0, "bytes": 75168, "startMs": 0, "durationMs": 18792},
+        ...
+        {"section": "moral", ...}
+      ]
+    }
+
+so the app can play or seek to any section with a single ranged request.
+Every segment starts on a frame boundary, and each source file's first frame
+doesn't borrow from the bit reservoir, so a segment decodes on its own.
+
+packs/manifest.json remembers the source hashes behind every pack; stories
+whose audio hasn't changed are skipped, and packs whose audio directory has
+been deleted are removed along with their `audioPack`.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORIES_DIR = os.path.join(REPO_ROOT, "stories")
+LANGS = ("en", "hi")
+
+# Bump to rebuild every pack after changing the output format.
+SPEC_VERSION = 1
+
+# MPEG audio version bits -> name, Layer III bitrates (kbps), sample rates, samples per frame
+MPEG_VERSIONS = {
+    3: ("1", [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320], [44100, 48000, 32000], 1152),
+    2: ("2", [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160], [22050, 24000, 16000], 576),
+    0: ("2.5", [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160], [11025, 12000, 8000], 576),
+}
+
+
+def parse_header(data: bytes, pos: int) -> dict | None:
+    """Decode the 4-byte Layer III frame header at pos, or None if there isn't one."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version_bits, layer_bits = (b1 >> 3) & 3, (b1 >> 1) & 3
+    bitrate_index, rate_index, padding = b2 >> 4, (b2 >> 2) & 3, (b2 >> 1) & 1
+    if version_bits not in MPEG_VERSIONS or layer_bits != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    version, bitrates, rates, samples = MPEG_VERSIONS[version_bits]
+    sample_rate = rates[rate_index]
+    mono = (b3 >> 6) == 3
+    return {
+        "format": (version, sample_rate, mono),
+        "length": (samples // 8) * bitrates[bitrate_index] * 1000 // sample_rate + padding,
+        "samples": samples,
+        # Where a Xing/Info tag would start: after the header (and CRC) and the side information.
+        "side_info_end": pos + 4 + (0 if b1 & 1 else 2) + ((17 if mono else 32) if version == "1" else (9 if mono else 17)),
+    }
+
+
+def id3v2_size(data: bytes) -> int:
+    if data[:3] != b"ID3" or len(data) < 10:
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    return 10 + size + (10 if data[5] & 0x10 else 0)
+
+
+def read_frames(path: str) -> tuple[bytes, tuple, int]:
+    """Return (concatenated audio frames, (version, sample rate, mono), total samples) for one MP3."""
+    with open(path, "rb") as f:
+        data = f.read()
+    end = len(data) - 128 if data[-128:-125] == b"TAG" else len(data)
+    pos = id3v2_size(data)
+    frames = []
+    fmt = None
+    samples = 0
+    while pos < end:
+        header = parse_header(data, pos)
+        if header is None:
+            # Skip junk between tags and audio (or a trailing APE tag) up to the next frame sync.
+            next_sync = data.find(b"\xff", pos + 1, end)
+            if next_sync < 0:
+                break
+            pos = next_sync
+            continue
+        frame_end = pos + header["length"]
+        if frame_end > end:
+            break  # truncated last frame
+        tag = data[header["side_info_end"]:header["side_info_end"] + 4]
+        if not frames and (tag in (b"Xing", b"Info") or data[pos + 36:pos + 40] == b"VBRI"):
+            pos = frame_end
+            continue
+        if fmt is None:
+            fmt = header["format"]
+        elif header["format"] != fmt:
+            raise ValueError(f"{path}: stream changes format mid-file ({fmt} → {header['format']})")
+        frames.append(data[pos:frame_end])
+        samples += header["samples"]
+        pos = frame_end
+    if not frames:
+        raise ValueError(f"{path}: no MPEG Layer III frames found")
+    return b"".join(frames), fmt, samples
+
+
+def segment_files(audio_dir: str) -> list[tuple]:
+    """[(section index or "moral", path)] in playback order."""
+    numbered = []
+    for name in os.listdir(audio_dir):
+        m = re.fullmatch(r"(\d+)\.mp3", name)
+        if m:
+            numbered.append((int(m.group(1)), os.path.join(audio_dir, name)))
+    segments = sorted(numbered)
+    moral = os.path.join(audio_dir, "moral.mp3")
+    if os.path.exists(moral):
+        segments.append(("moral", moral))
+    return segments
+
+
+def file_hash(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def build_pack(lang: str, story_id: str) -> dict:
+    """Write one story's pack and return its audioPack block (runs in a worker process)."""
+    audio_dir = os.path.join(STORIES_DIR, lang, "audio", story_id)
+    segments = []
+    chunks = []
+    fmt = None
+    offset = samples_before = 0
+    sample_rate = None
+    for section, path in segment_files(audio_dir):
+        frames, seg_fmt, samples = read_frames(path)
+        if fmt is None:
+            fmt, sample_rate = seg_fmt, seg_fmt[1]
+        elif seg_fmt != fmt:
+            raise ValueError(f"{os.path.basename(path)} is MPEG-{seg_fmt[0]} {seg_fmt[1]} Hz, "
+                             f"the rest of the story is MPEG-{fmt[0]} {fmt[1]} Hz")
+        segments.append({
+            "section": section,
+            "offset": offset,
+            "bytes": len(frames),
+            "startMs": samples_before * 1000 // sample_rate,
+            "durationMs": samples * 1000 // sample_rate,
+        })
+        chunks.append(frames)
+        offset += len(frames)
+        samples_before += samples
+
+    packs_dir = os.path.join(STORIES_DIR, lang, "audio", "packs")
+    os.makedirs(packs_dir, exist_ok=True)
+    out_path = os.path.join(packs_dir, f"{story_id}.mp3")
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, out_path)
+
+    return {
+        "path": f"audio/packs/{story_id}.mp3",
+        "bytes": offset,
+        "durationMs": samples_before * 1000 // sample_rate,
+        "segments": segments,
+    }
+
+
+def manifest_path(lang: str) -> str:
+    return os.path.join(STORIES_DIR, lang, "audio", "packs", "manifest.json")
+
+
+def load_manifest(lang: str) -> dict:
+    path = manifest_path(lang)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    if manifest.get("specVersion") != SPEC_VERSION:
+        return {}
+    return manifest.get("packs", {})
+
+
+def save_manifest(lang: str, packs: dict):
+    path = manifest_path(lang)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"specVersion": SPEC_VERSION, "packs": dict(sorted(packs.items()))}, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def source_hashes(lang: str, story_id: str) -> dict[str, str]:
+    audio_dir = os.path.join(STORIES_DIR, lang, "audio", story_id)
+    return {os.path.basename(path): file_hash(path) for _, path in segment_files(audio_dir)}
+
+
+def update_story(lang: str, story_id: str, pack: dict | None) -> str:
+    """Set (or with pack=None, remove) the story's audioPack; returns "missing", "unchanged" or "updated"."""
+    path = os.path.join(STORIES_DIR, lang, f"{story_id}.json")
+    if not os.path.exists(path):
+        return "missing"
+    with open(path) as f:
+        story = json.load(f)
+    if story.get("audioPack") == pack:
+        return "unchanged"
+    if pack is None:
+        del story["audioPack"]
+    else:
+        story["audioPack"] = pack
+    with open(path, "w") as f:
+        json.dump(story, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    return "updated"
+
+
+def prune_deleted(lang: str, manifest: dict, ids: list[str]):
+    """Drop packs (and their manifest entries and audioPack blocks) whose audio directory is gone."""
+    for story_id in sorted(set(manifest) - set(ids)):
+        del manifest[story_id]
+        pack_path = os.path.join(STORIES_DIR, lang, "audio", "packs", f"{story_id}.mp3")
+        if os.path.exists(pack_path):
+            os.remove(pack_path)
+        update_story(lang, story_id, None)
+        print(f"  🗑  Removed pack {lang}/{story_id} (audio deleted)")
+
+
+def story_ids(lang: str) -> list[str]:
+    audio_root = os.path.join(STORIES_DIR, lang, "audio")
+    if not os.path.isdir(audio_root):
+        return []
+    return sorted(d for d in os.listdir(audio_root)
+                  if d != "packs" and os.path.isdir(os.path.join(audio_root, d)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack story narration into one MP3 per story with section offsets")
+    parser.add_argument("--story", nargs="+", metavar="ID", help="Only pack these story IDs")
+    parser.add_argument("--lang", nargs="+", choices=LANGS, default=list(LANGS))
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the source audio is unchanged")
+    args = parser.parse_args()
+
+    manifests = {lang: load_manifest(lang) for lang in args.lang}
+    todo = []
+    current = 0
+    for lang in args.lang:
+        ids = story_ids(lang)
+        if not args.story:
+            prune_deleted(lang, manifests[lang], ids)
+        for story_id in ids:
+            if args.story and story_id not in args.story:
+                continue
+            hashes = source_hashes(lang, story_id)
+            entry = manifests[lang].get(story_id)
+            pack_path = os.path.join(STORIES_DIR, lang, "audio", "packs", f"{story_id}.mp3")
+            if not args.force and entry and entry["sources"] == hashes and os.path.exists(pack_path):
+                # The pack is current, but the story JSON may have been regenerated without it.
+                update_story(lang, story_id, entry["pack"])
+                current += 1
+                continue
+            todo.append((lang, story_id, hashes))
+
+    print(f"{current} pack(s) up to date, {len(todo)} to build")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(build_pack, lang, story_id): (lang, story_id, hashes) for lang, story_id, hashes in todo}
+        for future in as_completed(futures):
+            lang, story_id, hashes = futures[future]
+            try:
+                pack = future.result()
+            except Exception as e:
+                print(f"  ✗ {lang}/{story_id}: {e}")
+                continue
+            manifests[lang][story_id] = {"sources": hashes, "pack": pack}
+            status = update_story(lang, story_id, pack)
+            print(f"  ✓ {lang}/{story_id}: {len(pack['segments'])} segments, {pack['durationMs'] / 1000:.1f}s, "
+                  f"{pack['bytes'] // 1024} KB{' (no story JSON)' if status == 'missing' else ''}")
+
+    for lang in args.lang:
+        save_manifest(lang, manifests[lang])
+
+    for lang in args.lang:
+        packs = manifests[lang].values()
+        if packs:
+            total = sum(p["pack"]["durationMs"] for p in packs) / 60000
+            print(f"{lang}: {len(packs)} packs, {total:.0f} min of narration, "
+                  f"{sum(len(p['pack']['segments']) for p in packs)} files → {len(packs)} requests")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""Incrementally rebuild the files derived from story and lyrics sources.
+
+stories/catalog.json, lyrics-catalog.json, the section `image` refs in
+stories/en and stories/hi and story read times are all derived from other
+files. They used to be refreshed by hand or by passes that re-read and rewrote
+every file. Here each derived file is a node in a dependency graph:
+
+    images/<story>     section image refs in stories/{en,hi}/<story>.json   ← STORY_PROMPTS
+    readtime/<story>   readTimeMinutes, for stories that don't set one       ← the story text
+    story/<story>      the story's catalog entry and section/image stats     ← stories/{en,hi}/<story>.json
+    catalog            stories/catalog.json                                  ← every story/*
+    lyrics/<id>        the catalog fields of one lyrics file                 ← lyrics/<id>.json
+    lyrics-catalog     lyrics-catalog.json                                   ← every lyrics/*
+    coverage           build/story-coverage.json (text, images, narration)   ← story/*, PNGs, MP3s
+
+build/graph-cache.json records, per node, a hash of everything it read (input
+files, parameters, its dependencies' results) and of the files it wrote. A
+node runs again only when one of those changed, so editing one story rebuilds
+that story's nodes and, only if its catalog fields changed, the catalog.
+File hashes are cached against (mtime, size), so checking an unchanged tree
+needs nothing but stat(). Stale nodes whose dependencies are finished run
+together on a process pool.
+
+    python3 scripts/build_graph.py                  # rebuild whatever is stale
+    python3 scripts/build_graph.py catalog          # one target (and what it depends on)
+    python3 scripts/build_graph.py saint-kabir      # every node for one story
+    python3 scripts/build_graph.py --dry-run        # list stale nodes
+    python3 scripts/build_graph.py --graph          # print the graph
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import NamedTuple
+
+from generate_all_story_images import STORY_PROMPTS, story_image_ids, update_story_json
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(REPO_ROOT, "build", "graph-cache.json")
+
+STORY_CATALOG = "stories/catalog.json"
+LYRICS_CATALOG = "lyrics-catalog.json"
+COVERAGE_REPORT = "build/story-coverage.json"
+
+# Bump to rebuild every node after changing what an action produces.
+SPEC_VERSION = 1
+
+# Read-aloud pace for children's stories; the hand-set read times average about this.
+READING_WPM = 100
+
+# Catalog entry fields, in catalog order. `bundled` is kept from the existing catalog entry.
+CATALOG_FIELDS = ["id", "title", "titleHi", "category", "ageGroup", "readTimeMinutes", "moral", "moralHi",
+                  "coverImage", "tags", "bundled", "version"]
+
+# Copied from lyrics/<id>.json into its catalog entry; `type` and `source` stay as the catalog has them.
+LYRICS_FIELDS = ["id", "name", "nameEn", "deity", "category"]
+
+# Type of a new lyrics entry, from the end of its ID, when the file doesn't say.
+LYRICS_TYPE_SUFFIXES = {"aarti": "aarti", "chalisa": "chalisa", "bhajan": "bhajan", "mantra": "mantra",
+                        "stotra": "stotra", "stotram": "stotra"}
+
+
+def abspath(rel: str) -> str:
+    return os.path.join(REPO_ROOT, rel)
+
+
+def read_json(rel: str):
+    with open(abspath(rel), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(rel: str, data) -> bool:
+    """Write only when the content changed, keeping the file's trailing-newline convention."""
+    path = abspath(rel)
+    text = json.dumps(data, indent=2, ensure_ascii=False)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            old = f.read()
+        text += "\n" if old.endswith("\n") else ""
+        if old == text:
+            return False
+    else:
+        text += "\n"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return True
+
+
+def story_path(lang: str, story_id: str) -> str:
+    return f"stories/{lang}/{story_id}.json"
+
+
+# --- Actions (run in worker processes) -------------------------------------------
+#
+# Each takes the node's params and its dependencies' results ({node name: result})
+# and returns a JSON-serializable result, which is cached and passed to dependents.
+
+def image_refs(params: dict, deps: dict):
+    update_story_json(params["story"], params["images"])
+
+
+def read_time(params: dict, deps: dict) -> int:
+    rel = story_path("en", params["story"])
+    story = read_json(rel)
+    if story.get("readTimeMinutes"):
+        return story["readTimeMinutes"]
+    words = sum(len(s["text"].split()) for s in story["sections"]) + len(story.get("moral", "").split())
+    # Keep the catalog's key order: readTimeMinutes goes after ageGroup.
+    fields = [k for k in story if k != "readTimeMinutes"]
+    fields.insert(fields.index("ageGroup") + 1 if "ageGroup" in fields else len(fields), "readTimeMinutes")
+    story["readTimeMinutes"] = max(1, round(words / READING_WPM))
+    write_json(rel, {k: story[k] for k in fields})
+    return story["readTimeMinutes"]
+
+
+def story_entry(params: dict, deps: dict) -> dict:
+    en = read_json(story_path("en", params["story"]))
+    hi_rel = story_path("hi", params["story"])
+    hi = read_json(hi_rel) if os.path.exists(abspath(hi_rel)) else None
+    return {
+        "entry": {k: en[k] for k in CATALOG_FIELDS if k in en},
+        "images": [s.get("image") for s in en["sections"]],
+        "hiSections": len(hi["sections"]) if hi else None,
+    }
+
+
+def stories_catalog(params: dict, deps: dict) -> int:
+    existing = {e["id"]: e for e in read_json(STORY_CATALOG)}
+    entries = {r["entry"]["id"]: r["entry"] for r in deps.values()}
+    # Existing stories keep their place; new ones are appended.
+    ids = [sid for sid in existing if sid in entries] + sorted(set(entries) - set(existing))
+    catalog = []
+    for sid in ids:
+        fields = dict(entries[sid], bundled=existing.get(sid, {}).get("bundled", False))
+        catalog.append({k: fields[k] for k in CATALOG_FIELDS if k in fields})
+    write_json(STORY_CATALOG, catalog)
+    return len(catalog)
+
+
+def lyrics_entry(params: dict, deps: dict) -> dict:
+    doc = read_json(f"lyrics/{params['id']}.json")
+    entry = {k: doc[k] for k in LYRICS_FIELDS if k in doc}
+    if doc.get("type"):
+        entry["type"] = doc["type"]
+    return entry
+
+
+def lyrics_catalog(params: dict, deps: dict) -> int:
+    files = {r["id"]: r for r in deps.values()}
+    catalog = []
+    for entry in read_json(LYRICS_CATALOG):
+        if entry["id"] in files:
+            entry = {**entry, **{k: v for k, v in files.pop(entry["id"]).items() if k != "type"}}
+        catalog.append(entry)
+    for lyrics_id, fields in sorted(files.items()):
+        lyrics_type = fields.get("type") or LYRICS_TYPE_SUFFIXES.get(lyrics_id.rsplit("-", 1)[-1])
+        if lyrics_type is None:
+            raise ValueError(f"lyrics/{lyrics_id}.json: add a \"type\" field (aarti, chalisa, bhajan, mantra, stotra)")
+        catalog.append({**{k: v for k, v in fields.items() if k != "type"}, "type": lyrics_type, "source": "remote"})
+    write_json(LYRICS_CATALOG, catalog)
+    return len(catalog)
+
+
+def coverage(params: dict, deps: dict) -> dict:
+    pngs = {os.path.splitext(os.path.basename(p))[0] for p in glob.glob(abspath("stories/images/*.png"))}
+    audio = {}
+    for path in glob.glob(abspath("stories/*/audio/*/*.mp3")):
+        lang, _, folder, name = os.path.relpath(path, abspath("stories")).split(os.sep)
+        audio.setdefault((lang, folder), set()).add(os.path.splitext(name)[0])
+
+    stories = {}
+    for name, result in sorted(deps.items()):
+        sid = result["entry"]["id"]
+        sections = len(result["images"])
+        missing = [i for i in result["images"] if i and i not in pngs]
+        report = {
+            "sections": sections,
+            "prompts": sid in params["prompts"],
+            "hiSections": result["hiSections"],
+            "images": {"referenced": sum(1 for i in result["images"] if i), "missing": missing},
+            "audio": {},
+        }
+        for lang in ("en", "hi"):
+            files = audio.get((lang, sid), set())
+            report["audio"][lang] = {
+                "sections": sum(1 for i in range(sections) if str(i) in files),
+                "moral": "moral" in files,
+                "pack": sid in audio.get((lang, "packs"), set()),
+            }
+        stories[sid] = report
+
+    def narrated(lang):
+        return sum(1 for r in stories.values() if r["audio"][lang]["sections"] == r["sections"] and r["audio"][lang]["moral"])
+
+    totals = {
+        "stories": len(stories),
+        "illustrated": sum(1 for r in stories.values() if r["images"]["referenced"] == r["sections"] and not r["images"]["missing"]),
+        "missingImages": sum(len(r["images"]["missing"]) for r in stories.values()),
+        "hindi": sum(1 for r in stories.values() if r["hiSections"] == r["sections"]),
+        "narrated": {lang: narrated(lang) for lang in ("en", "hi")},
+        "packed": {lang: sum(1 for r in stories.values() if r["audio"][lang]["pack"]) for lang in ("en", "hi")},
+    }
+    write_json(COVERAGE_REPORT, {"totals": totals, "stories": stories})
+    return totals
+
+
+ACTIONS = {
+    "image_refs": image_refs,
+    "read_time": read_time,
+    "story_entry": story_entry,
+    "stories_catalog": stories_catalog,
+    "lyrics_entry": lyrics_entry,
+    "lyrics_catalog": lyrics_catalog,
+    "coverage": coverage,
+}
+
+
+def run_action(action: str, params: dict, deps: dict):
+    return ACTIONS[action](params, deps)
+
+
+# --- Graph -----------------------------------------------------------------------------
+
+class Node(NamedTuple):
+    name: str
+    action: str
+    params: dict
+    inputs: tuple = ()     # files whose content the action reads
+    listings: tuple = ()   # globs whose set of matches the action reads
+    outputs: tuple = ()    # files the action writes
+    deps: tuple = ()       # nodes that must finish first; their results are passed in
+
+
+def build_graph() -> dict[str, Node]:
+    nodes = []
+    story_ids = sorted(os.path.basename(p)[:-len(".json")] for p in glob.glob(abspath("stories/en/*.json")))
+    for sid in story_ids:
+        story_files = tuple(story_path(lang, sid) for lang in ("en", "hi") if os.path.exists(abspath(story_path(lang, sid))))
+        # Nodes that write the same story file are chained so they never run at the same time.
+        after = ()
+        if sid in STORY_PROMPTS:
+            nodes.append(Node(f"images/{sid}", "image_refs", {"story": sid, "images": story_image_ids(sid)},
+                              outputs=story_files))
+            after = (f"images/{sid}",)
+        nodes.append(Node(f"readtime/{sid}", "read_time", {"story": sid}, outputs=(story_path("en", sid),), deps=after))
+        nodes.append(Node(f"story/{sid}", "story_entry", {"story": sid}, inputs=story_files, deps=(f"readtime/{sid}",)))
+    story_nodes = tuple(f"story/{sid}" for sid in story_ids)
+    nodes.append(Node("catalog", "stories_catalog", {}, outputs=(STORY_CATALOG,), deps=story_nodes))
+    nodes.append(Node("coverage", "coverage", {"prompts": sorted(STORY_PROMPTS)},
+                      listings=("stories/images/*.png", "stories/*/audio/*/*.mp3"),
+                      outputs=(COVERAGE_REPORT,), deps=story_nodes))
+
+    lyrics_ids = sorted(os.path.basename(p)[:-len(".json")] for p in glob.glob(abspath("lyrics/*.json")))
+    for lyrics_id in lyrics_ids:
+        nodes.append(Node(f"lyrics/{lyrics_id}", "lyrics_entry", {"id": lyrics_id}, inputs=(f"lyrics/{lyrics_id}.json",)))
+    nodes.append(Node("lyrics-catalog", "lyrics_catalog", {}, outputs=(LYRICS_CATALOG,),
+                      deps=tuple(f"lyrics/{i}" for i in lyrics_ids)))
+    return {node.name: node for node in nodes}
+
+
+def select(graph: dict[str, Node], targets: list[str]) -> set[str]:
+    """Nodes named by `targets` (a node, a node kind like `images`, or a story/lyrics ID) plus their dependencies."""
+    wanted = set()
+    for target in targets:
+        matches = [n for n in graph if n == target or n.startswith(target + "/") or n.endswith("/" + target)]
+        if not matches:
+            raise SystemExit(f"Unknown target {target!r} (try --graph)")
+        wanted.update(matches)
+    stack = list(wanted)
+    while stack:
+        for dep in graph[stack.pop()].deps:
+            if dep not in wanted:
+                wanted.add(dep)
+                stack.append(dep)
+    return wanted
+
+
+# --- Cache -----------------------------------------------------------------------------
+
+class FileHashes:
+    """sha256 of repo files, reused while a file's (mtime, size) is unchanged."""
+
+    def __init__(self, entries: dict):
+        self.entries = entries
+
+    def sha(self, rel: str) -> str | None:
+        path = abspath(rel)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.entries.pop(rel, None)
+            return None
+        entry = self.entries.get(rel)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            return entry[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        self.entries[rel] = [st.st_mtime_ns, st.st_size, h.hexdigest()]
+        return h.hexdigest()
+
+
+def load_cache() -> dict:
+    if os.path.exists(CACHE_PATH):
+        with open(CACHE_PATH) as f:
+            cache = json.load(f)
+        if cache.get("specVersion") == SPEC_VERSION:
+            return cache
+    return {"specVersion": SPEC_VERSION, "files": {}, "nodes": {}}
+
+
+def save_cache(cache: dict):
+    os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+    tmp_path = CACHE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def node_key(node: Node, hashes: FileHashes, results: dict) -> str:
+    payload = [
+        SPEC_VERSION, node.action, node.params, node.outputs,
+        {rel: hashes.sha(rel) for rel in node.inputs},
+        {pattern: sorted(os.path.relpath(p, REPO_ROOT) for p in glob.glob(abspath(pattern))) for pattern in node.listings},
+        {dep: results[dep] for dep in node.deps},
+    ]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def outputs_changed(node: Node, record: dict, hashes: FileHashes) -> bool:
+    return any(hashes.sha(rel) != record["outputs"].get(rel) for rel in node.outputs)
+
+
+# --- Build -----------------------------------------------------------------------------
+
+def build(targets: list[str] | None = None, force: bool = False, dry_run: bool = False,
+          workers: int | None = None) -> int:
+    started = time.perf_counter()
+    graph = build_graph()
+    todo = select(graph, targets) if targets else set(graph)
+    cache = load_cache()
+    hashes = FileHashes(cache["files"])
+    results, done, failed, stale, ran = {}, set(), set(), set(), []
+    running = {}
+    pool = None
+
+    try:
+        while todo or running:
+            ready = sorted(n for n in todo if all(d in done or d in failed for d in graph[n].deps))
+            for name in ready:
+                todo.discard(name)
+                node = graph[name]
+                if any(d in failed for d in node.deps):
+                    print(f"  ✗ {name}: skipped, a dependency failed")
+                    failed.add(name)
+                    continue
+                record = cache["nodes"].get(name)
+                if dry_run and any(d in stale for d in node.deps):
+                    # Can't know the dependency's new result without running it.
+                    stale.add(name)
+                    results[name] = record["result"] if record else None
+                    done.add(name)
+                    continue
+                key = node_key(node, hashes, results)
+                if not force and record and record["key"] == key and not outputs_changed(node, record, hashes):
+                    results[name] = record["result"]
+                    done.add(name)
+                    continue
+                if dry_run:
+                    stale.add(name)
+                    results[name] = record["result"] if record else None
+                    done.add(name)
+                    continue
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=workers)
+                future = pool.submit(run_action, node.action, node.params, {d: results[d] for d in node.deps})
+                running[future] = (name, key)
+
+            if not running:
+                if todo and not ready:
+                    raise RuntimeError(f"Dependency cycle among: {', '.join(sorted(todo))}")
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, key = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  ✗ {name}: {e}")
+                    cache["nodes"].pop(name, None)
+                    failed.add(name)
+                    continue
+                print(f"  ✓ {name}")
+                results[name] = result
+                cache["nodes"][name] = {"key": key, "result": result, "outputs": {}}
+                done.add(name)
+                ran.append(name)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if dry_run:
+        for name in sorted(stale):
+            print(f"  ↻ {name}")
+        print(f"\n{len(stale)} of {len(done)} node(s) stale")
+        return 0
+
+    # Record outputs last: a later node may rewrite a file an earlier one also writes
+    # (images/ then readtime/ both edit the story JSON).
+    for name in done:
+        if name in cache["nodes"]:
+            cache["nodes"][name]["outputs"] = {rel: hashes.sha(rel) for rel in graph[name].outputs}
+    save_cache(cache)
+
+    if results.get("coverage"):
+        t = results["coverage"]
+        print(f"\nCoverage: {t['illustrated']}/{t['stories']} stories fully illustrated ({t['missingImages']} images missing), "
+              f"Hindi {t['hindi']}/{t['stories']}, narration en {t['narrated']['en']} hi {t['narrated']['hi']}, "
+              f"packs en {t['packed']['en']} hi {t['packed']['hi']}")
+    print(f"{len(done) - len(ran)} node(s) up to date, {len(ran)} rebuilt, {len(failed)} failed "
+          f"in {time.perf_counter() - started:.2f}s")
+    return 1 if failed else 0
+
+
+def print_graph():
+    graph = build_graph()
+    for name, node in graph.items():
+        parts = []
+        if node.inputs:
+            parts.append(f"reads {', '.join(node.inputs)}")
+        if node.listings:
+            parts.append(f"lists {', '.join(node.listings)}")
+        if node.outputs:
+            parts.append(f"writes {', '.join(node.outputs)}")
+        if node.deps:
+            parts.append(f"after {node.deps[0]}" + (f" (+{len(node.deps) - 1})" if len(node.deps) > 1 else ""))
+        print(f"{name}: {'; '.join(parts)}")
+    print(f"\n{len(graph)} nodes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild derived catalogs and story fields that are out of date")
+    parser.add_argument("targets", nargs="*", help="Nodes, node kinds (images, readtime, story, lyrics) or story/lyrics IDs")
+    parser.add_argument("--dry-run", action="store_true", help="List stale nodes without running them")
+    parser.add_argument("--force", action="store_true", help="Rebuild the selected nodes even if they look current")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    parser.add_argument("--graph", action="store_true", help="Print the dependency graph and exit")
+    args = parser.parse_args()
+
+    if args.graph:
+        print_graph()
+        return
+    sys.exit(build(args.targets, force=args.force, dry_run=args.dry_run, workers=args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""Build compressed, size-bucketed variants of the story illustrations.
+
+Run after generate_all_story_images.py. Every PNG in stories/images is
+re-encoded on a process pool into WebP (and AVIF when Pillow supports it) at a
+few target widths, and each story section gets an `imageVariants` list so the
+app can fetch the smallest file that fits the screen instead of the ~2 MB PNG.
+
+stories/images/variants/manifest.json remembers the source hash behind every
+image's variants, so unchanged images are skipped on the next run. Variants of
+PNGs that have been deleted are removed, along with their `imageVariants`.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from PIL import Image, features
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EN_DIR = os.path.join(REPO_ROOT, "stories", "en")
+HI_DIR = os.path.join(REPO_ROOT, "stories", "hi")
+IMAGES_DIR = os.path.join(REPO_ROOT, "stories", "images")
+VARIANTS_DIR = os.path.join(IMAGES_DIR, "variants")
+MANIFEST_PATH = os.path.join(VARIANTS_DIR, "manifest.json")
+
+# Target widths; images are never upscaled past the source.
+BUCKETS = {
+    "thumb": 240,
+    "phone": 720,
+    "tablet": 1280,
+}
+
+# Encoder settings per format. AVIF is only produced when this Pillow build can write it.
+FORMATS = {
+    "webp": {"quality": 80, "method": 6},
+    "avif": {"quality": 55, "speed": 6},
+}
+
+# Bump to re-encode everything after changing BUCKETS or FORMATS.
+SPEC_VERSION = 1
+
+
+def enabled_formats() -> list[str]:
+    return [fmt for fmt in FORMATS if features.check(fmt)]
+
+
+def source_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_variants(image_id: str, src_path: str, formats: list[str]) -> list[dict]:
+    """Encode every bucket/format variant of one image (runs in a worker process)."""
+    variants = []
+    with Image.open(src_path) as src:
+        src = src.convert("RGB")
+        for bucket, target_width in BUCKETS.items():
+            width = min(target_width, src.width)
+            height = round(src.height * width / src.width)
+            resized = src if width == src.width else src.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                name = f"{image_id}-{bucket}.{fmt}"
+                out_path = os.path.join(VARIANTS_DIR, name)
+                resized.save(out_path, format=fmt.upper(), **FORMATS[fmt])
+                variants.append({
+                    "bucket": bucket,
+                    "format": fmt,
+                    "path": f"variants/{name}",
+                    "width": width,
+                    "height": height,
+                    "bytes": os.path.getsize(out_path),
+                })
+    return variants
+
+
+def load_manifest() -> dict:
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    with open(MANIFEST_PATH) as f:
+        manifest = json.load(f)
+    if manifest.get("specVersion") != SPEC_VERSION:
+        return {}
+    return manifest.get("images", {})
+
+
+def save_manifest(images: dict):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"specVersion": SPEC_VERSION, "images": dict(sorted(images.items()))}, f, indent=2)
+        f.write("\n")
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def is_current(entry: dict | None, src_path: str, formats: list[str]) -> tuple[bool, str | None]:
+    """Return (up to date, source hash). The hash is only recomputed when size or mtime moved."""
+    if entry is None:
+        return False, None
+    stat = os.stat(src_path)
+    if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime_ns:
+        digest = entry["source"]
+    else:
+        digest = source_hash(src_path)
+    current = (
+        digest == entry["source"]
+        and sorted({v["format"] for v in entry["variants"]}) == sorted(formats)
+        and all(os.path.exists(os.path.join(IMAGES_DIR, v["path"])) for v in entry["variants"])
+    )
+    return current, digest
+
+
+def prune_deleted(manifest: dict, image_ids: list[str]):
+    """Drop manifest entries (and their variant files) whose PNG no longer exists."""
+    for image_id in sorted(set(manifest) - set(image_ids)):
+        for variant in manifest.pop(image_id)["variants"]:
+            path = os.path.join(IMAGES_DIR, variant["path"])
+            if os.path.exists(path):
+                os.remove(path)
+        print(f"  🗑  Removed variants of {image_id} (PNG deleted)")
+
+
+def update_story_variants(path: str, manifest: dict) -> bool:
+    with open(path) as f:
+        story = json.load(f)
+
+    changed = False
+    for section in story.get("sections", []):
+        entry = manifest.get(section.get("image"))
+        if entry and section.get("imageVariants") != entry["variants"]:
+            section["imageVariants"] = entry["variants"]
+            changed = True
+        elif not entry and "imageVariants" in section:
+            del section["imageVariants"]
+            changed = True
+
+    if changed:
+        with open(path, "w") as f:
+            json.dump(story, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+    return changed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build WebP/AVIF variants of story images")
+    parser.add_argument("--image", nargs="+", metavar="ID", help="Only process these image IDs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Encoder processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Re-encode even if the source is unchanged")
+    args = parser.parse_args()
+
+    os.makedirs(VARIANTS_DIR, exist_ok=True)
+    formats = enabled_formats()
+    if not formats:
+        raise SystemExit("This Pillow build cannot write WebP or AVIF")
+
+    manifest = load_manifest()
+    image_ids = sorted(os.path.splitext(n)[0] for n in os.listdir(IMAGES_DIR) if n.endswith(".png"))
+    if args.image:
+        image_ids = [i for i in image_ids if i in args.image]
+    else:
+        prune_deleted(manifest, image_ids)
+
+    todo = {}
+    for image_id in image_ids:
+        src_path = os.path.join(IMAGES_DIR, f"{image_id}.png")
+        current, digest = is_current(manifest.get(image_id), src_path, formats)
+        if current and not args.force:
+            manifest[image_id]["size"] = os.path.getsize(src_path)
+            manifest[image_id]["mtime"] = os.stat(src_path).st_mtime_ns
+            continue
+        todo[image_id] = digest
+
+    print(f"{len(image_ids) - len(todo)} image(s) up to date, {len(todo)} to encode ({', '.join(formats)})")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = {
+            pool.submit(build_variants, image_id, os.path.join(IMAGES_DIR, f"{image_id}.png"), formats): image_id
+            for image_id in todo
+        }
+        for future in as_completed(futures):
+            image_id = futures[future]
+            src_path = os.path.join(IMAGES_DIR, f"{image_id}.png")
+            try:
+                variants = future.result()
+            except Exception as e:
+                print(f"  ✗ {image_id}: {e}")
+                continue
+            stat = os.stat(src_path)
+            manifest[image_id] = {
+                "source": todo[image_id] or source_hash(src_path),
+                "size": stat.st_size,
+                "mtime": stat.st_mtime_ns,
+                "variants": variants,
+            }
+            smallest = min(v["bytes"] for v in variants if v["bucket"] == "phone")
+            print(f"  ✓ {image_id}: {stat.st_size // 1024} KB → phone {smallest // 1024} KB")
+
+    save_manifest(manifest)
+
+    updated = 0
+    for story_dir in (EN_DIR, HI_DIR):
+        for name in sorted(os.listdir(story_dir)):
+            if name.endswith(".json") and update_story_variants(os.path.join(story_dir, name), manifest):
+                updated += 1
+    print(f"\nUpdated imageVariants in {updated} story file(s)")
+
+    total_src = sum(e["size"] for e in manifest.values())
+    total_phone = sum(min(v["bytes"] for v in e["variants"] if v["bucket"] == "phone") for e in manifest.values())
+    if total_phone:
+        print(f"PNG total {total_src / 1e6:.1f} MB, phone variants {total_phone / 1e6:.1f} MB "
+              f"({total_src / total_phone:.0f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""Compile the Hindu calendar from one canonical source plus per-city deltas.
+
+The five hindu-calendar*.json files repeat the same 65 templates and mostly the
+same events, with dates shifted a day for the city's timezone. The editable
+source now lives in calendar/source/:
+
+    events.json          version, description, sources, templates, events (the default calendar)
+    cities/<city>.json   {"base", "version", "description", "moved", "removed", "added", "after"}
+                         relative to the default calendar or to another city
+
+`build` regenerates the full hindu-calendar*.json files (still read by current
+app versions) and writes self-contained per-city, per-year shards with only
+the templates that year uses, plus calendar/index.json listing every shard's
+size and hash:
+
+    python3 scripts/calendar_compiler.py build
+    python3 scripts/calendar_compiler.py build --check      # exit 1 if anything is stale
+    python3 scripts/calendar_compiler.py split               # re-derive the source from hindu-calendar*.json
+"""
+
+import argparse
+import bisect
+import datetime
+import glob
+import hashlib
+import json
+import os
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALENDAR_DIR = os.path.join(REPO_ROOT, "calendar")
+SOURCE_DIR = os.path.join(CALENDAR_DIR, "source")
+CANONICAL_PATH = os.path.join(SOURCE_DIR, "events.json")
+CITIES_DIR = os.path.join(SOURCE_DIR, "cities")
+INDEX_PATH = os.path.join(CALENDAR_DIR, "index.json")
+
+DEFAULT_CITY = "default"
+# A city event is treated as a moved canonical event when everything but the date matches within this window.
+MAX_SHIFT_DAYS = 3
+
+
+def legacy_path(city: str) -> str:
+    name = "hindu-calendar.json" if city == DEFAULT_CITY else f"hindu-calendar-{city}.json"
+    return os.path.join(REPO_ROOT, name)
+
+
+def event_id(event: dict) -> str:
+    return f"{event['date']} {event['name']}"
+
+
+def event_key(event: dict) -> str:
+    return json.dumps(event, sort_keys=True)
+
+
+def without_date(event: dict) -> str:
+    return json.dumps({k: v for k, v in event.items() if k != "date"}, sort_keys=True)
+
+
+def days_between(a: str, b: str) -> int:
+    return (datetime.date.fromisoformat(b) - datetime.date.fromisoformat(a)).days
+
+
+# --- Deltas ----------------------------------------------------------------------
+
+def diff_events(base: list[dict], city: list[dict]) -> dict:
+    """Describe `city` as moves, removals and additions against `base`."""
+    city_keys = {event_key(e) for e in city}
+    base_keys = {event_key(e) for e in base}
+    removed = [e for e in base if event_key(e) not in city_keys]
+    added = [e for e in city if event_key(e) not in base_keys]
+
+    moved = {}
+    for event in removed:
+        candidates = [a for a in added if without_date(a) == without_date(event)
+                      and abs(days_between(event["date"], a["date"])) <= MAX_SHIFT_DAYS]
+        if candidates:
+            match = min(candidates, key=lambda a: abs(days_between(event["date"], a["date"])))
+            added.remove(match)
+            moved[event_id(event)] = match["date"]
+
+    return {
+        "moved": moved,
+        "removed": [event_id(e) for e in removed if event_id(e) not in moved],
+        "added": added,
+    }
+
+
+def place_events(events: list[dict], after: dict) -> list[dict]:
+    """Move each event in `after` to just behind the event it follows in the city's file (None: first)."""
+    events = list(events)
+    for eid, previous in after.items():
+        event = next(e for e in events if event_id(e) == eid)
+        events.remove(event)
+        index = 0 if previous is None else next(i for i, e in enumerate(events) if event_id(e) == previous) + 1
+        events.insert(index, event)
+    return events
+
+
+def order_fixups(events: list[dict], target: list[dict]) -> dict:
+    """The `after` entries that turn `events` into `target`'s order (same events, other order).
+
+    Events on the longest run already in the right relative order stay put; only the rest are recorded.
+    """
+    position = {event_id(e): i for i, e in enumerate(events)}
+    ranks = [position[event_id(e)] for e in target]
+    # Longest increasing subsequence of ranks, with back-pointers.
+    tails, tail_index, back = [], [], [None] * len(ranks)
+    for i, rank in enumerate(ranks):
+        j = bisect.bisect_left(tails, rank)
+        back[i] = tail_index[j - 1] if j else None
+        if j == len(tails):
+            tails.append(rank)
+            tail_index.append(i)
+        else:
+            tails[j] = rank
+            tail_index[j] = i
+    keep = set()
+    i = tail_index[-1] if tail_index else None
+    while i is not None:
+        keep.add(i)
+        i = back[i]
+    return {event_id(e): (event_id(target[i - 1]) if i else None)
+            for i, e in enumerate(target) if i not in keep}
+
+
+def apply_delta(base: list[dict], delta: dict) -> list[dict]:
+    moved = delta.get("moved", {})
+    removed = set(delta.get("removed", []))
+    events = []
+    for event in base:
+        eid = event_id(event)
+        if eid in removed:
+            continue
+        events.append(dict(event, date=moved[eid]) if eid in moved else event)
+    events.extend(delta.get("added", []))
+    events.sort(key=lambda e: e["date"])
+    # Same-day events (and a few files that aren't date-sorted) keep the city's own order, so a
+    # rebuild reproduces the served file byte for byte and clients don't re-download it.
+    return place_events(events, delta.get("after", {}))
+
+
+def delta_size(delta: dict) -> int:
+    return len(json.dumps(delta, separators=(",", ":")))
+
+
+# --- Source -------------------------------------------------------------------------
+
+def load_source() -> tuple[dict, dict[str, dict]]:
+    with open(CANONICAL_PATH) as f:
+        canonical = json.load(f)
+    deltas = {}
+    for path in sorted(glob.glob(os.path.join(CITIES_DIR, "*.json"))):
+        with open(path) as f:
+            deltas[os.path.splitext(os.path.basename(path))[0]] = json.load(f)
+    return canonical, deltas
+
+
+def resolve(city: str, canonical: dict, deltas: dict, seen: tuple = ()) -> dict:
+    """Full calendar document for a city, following `base` links back to the canonical source."""
+    if city == DEFAULT_CITY:
+        return canonical
+    if city in seen:
+        raise ValueError(f"Cycle in calendar deltas: {' → '.join(seen + (city,))}")
+    delta = deltas[city]
+    base = resolve(delta.get("base", DEFAULT_CITY), canonical, deltas, seen + (city,))
+    return {
+        "version": delta["version"],
+        "description": delta["description"],
+        "sources": canonical["sources"],
+        "templates": {**canonical["templates"], **delta.get("templates", {})},
+        "events": apply_delta(base["events"], delta),
+    }
+
+
+def write_json(path: str, data, compact: bool = False, trailing_newline: bool = True) -> bool:
+    """Write only when the content changed; returns True if the file was (or would be) rewritten."""
+    if compact:
+        text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    else:
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+    if trailing_newline:
+        text += "\n"
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            if f.read() == text:
+                return False
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return True
+
+
+def split():
+    """Derive calendar/source/ from the current hindu-calendar*.json files."""
+    with open(legacy_path(DEFAULT_CITY)) as f:
+        canonical = json.load(f)
+    write_json(CANONICAL_PATH, canonical)
+
+    cities = {}
+    for path in glob.glob(os.path.join(REPO_ROOT, "hindu-calendar-*.json")):
+        city = os.path.basename(path)[len("hindu-calendar-"):-len(".json")]
+        with open(path) as f:
+            cities[city] = json.load(f)
+
+    # Smaller calendars first so bigger ones can use them as a base (newyork ends up a small delta on bayarea).
+    resolved = {DEFAULT_CITY: canonical}
+    for city in sorted(cities, key=lambda c: (len(cities[c]["events"]), c)):
+        doc = cities[city]
+        best = None
+        for base_name, base in resolved.items():
+            delta = diff_events(base["events"], doc["events"])
+            if best is None or delta_size(delta) < delta_size(best[1]):
+                best = (base_name, delta)
+        base_name, delta = best
+        after = order_fixups(apply_delta(resolved[base_name]["events"], delta), doc["events"])
+        if after:
+            delta["after"] = after
+        templates = {k: v for k, v in doc["templates"].items() if canonical["templates"].get(k) != v}
+        entry = {"base": base_name, "version": doc["version"], "description": doc["description"]}
+        if templates:
+            entry["templates"] = templates
+        entry.update(delta)
+        write_json(os.path.join(CITIES_DIR, f"{city}.json"), entry)
+        resolved[city] = doc
+        print(f"  ✓ {city}: base {base_name}, {len(delta['moved'])} moved, {len(delta['removed'])} removed, "
+              f"{len(delta['added'])} added, {len(delta.get('after', {}))} reordered ({os.path.getsize(os.path.join(CITIES_DIR, f'{city}.json')) / 1024:.1f} KB)")
+
+
+# --- Build -----------------------------------------------------------------------------
+
+def year_shards(doc: dict) -> dict[int, dict]:
+    shards = {}
+    for event in doc["events"]:
+        shards.setdefault(int(event["date"][:4]), []).append(event)
+    return {
+        year: {
+            "version": doc["version"],
+            "year": year,
+            "templates": {k: doc["templates"][k] for k in sorted({e["template"] for e in events}) if k in doc["templates"]},
+            "events": events,
+        }
+        for year, events in sorted(shards.items())
+    }
+
+
+def build(check: bool = False) -> int:
+    canonical, deltas = load_source()
+    stale = []
+    index = {"sources": canonical["sources"], "cities": {}}
+    legacy_bytes = shard_bytes = 0
+
+    for city in [DEFAULT_CITY] + sorted(deltas):
+        doc = resolve(city, canonical, deltas)
+        path = legacy_path(city)
+        # The legacy files are served as-is and have never had a trailing newline.
+        if check:
+            with open(path) as f:
+                if json.load(f) != doc:
+                    stale.append(path)
+        elif write_json(path, doc, trailing_newline=False):
+            print(f"  ↻ {os.path.relpath(path, REPO_ROOT)}")
+        legacy_bytes += os.path.getsize(path)
+
+        years = {}
+        for year, shard in year_shards(doc).items():
+            shard = {"city": city, **shard}
+            shard_path = os.path.join(CALENDAR_DIR, city, f"{year}.json")
+            text = json.dumps(shard, ensure_ascii=False, separators=(",", ":")) + "\n"
+            if check:
+                if not os.path.exists(shard_path) or open(shard_path, encoding="utf-8").read() != text:
+                    stale.append(shard_path)
+            elif write_json(shard_path, shard, compact=True):
+                print(f"  ↻ {os.path.relpath(shard_path, REPO_ROOT)}")
+            encoded = text.encode("utf-8")
+            years[str(year)] = {
+                "path": f"{city}/{year}.json",
+                "events": len(shard["events"]),
+                "bytes": len(encoded),
+                "sha256": hashlib.sha256(encoded).hexdigest(),
+            }
+            shard_bytes += len(encoded)
+        index["cities"][city] = {"version": doc["version"], "description": doc["description"], "years": years}
+
+    if check:
+        with open(INDEX_PATH) as f:
+            if json.load(f) != index:
+                stale.append(INDEX_PATH)
+        for path in stale:
+            print(f"  ✗ {os.path.relpath(path, REPO_ROOT)} is out of date")
+        if stale:
+            print("\nRun: python3 scripts/calendar_compiler.py build")
+        return 1 if stale else 0
+
+    write_json(INDEX_PATH, index)
+    source_bytes = os.path.getsize(CANONICAL_PATH) + sum(
+        os.path.getsize(p) for p in glob.glob(os.path.join(CITIES_DIR, "*.json")))
+    years_per_city = sum(len(c["years"]) for c in index["cities"].values())
+    print(f"\n{len(index['cities'])} calendars: source {source_bytes / 1024:.0f} KB, "
+          f"full files {legacy_bytes / 1024:.0f} KB, {years_per_city} year shards "
+          f"averaging {shard_bytes / years_per_city / 1024:.1f} KB")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile per-city, per-year Hindu calendar files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="Regenerate hindu-calendar*.json, year shards and calendar/index.json")
+    build_cmd.add_argument("--check", action="store_true", help="Only report stale outputs (exit 1 if any)")
+    sub.add_parser("split", help="Rewrite calendar/source/ from the current hindu-calendar*.json files")
+    args = parser.parse_args()
+
+    if args.command == "split":
+        split()
+        return
+    sys.exit(build(args.check))
+
+
+if __name__ == "__main__":
+    main()
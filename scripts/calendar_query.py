@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Date-indexed queries over the compiled Hindu calendar shards.
+
+Events are parsed once into a sorted list of datetime.date values (overall and
+per category), so every lookup is a bisect rather than a scan over freshly
+parsed JSON. Only the year shards a query touches are loaded.
+
+    python3 scripts/calendar_query.py on 2026-03-10 --city chicago
+    python3 scripts/calendar_query.py between 2026-10-01 2026-10-31 --category festival
+    python3 scripts/calendar_query.py next-ekadashi --after 2026-05-01
+
+From Python:
+
+    cal = Calendar.load("newyork")
+    cal.next_ekadashi(datetime.date.today())
+    cal.events_between(datetime.date(2026, 10, 1), datetime.date(2026, 10, 31))
+"""
+
+import argparse
+import datetime
+import json
+import os
+from bisect import bisect_left, bisect_right
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CALENDAR_DIR = os.path.join(REPO_ROOT, "calendar")
+
+
+def as_date(value) -> datetime.date:
+    return value if isinstance(value, datetime.date) else datetime.date.fromisoformat(value)
+
+
+class DateIndex:
+    """Events sorted by date with a parallel list of parsed dates for bisect."""
+
+    def __init__(self, events: list[dict]):
+        pairs = sorted(((as_date(e["date"]), i, e) for i, e in enumerate(events)), key=lambda p: p[:2])
+        self.dates = [d for d, _, _ in pairs]
+        self.events = [e for _, _, e in pairs]
+
+    def between(self, start: datetime.date, end: datetime.date) -> list[dict]:
+        return self.events[bisect_left(self.dates, start):bisect_right(self.dates, end)]
+
+    def next(self, after: datetime.date, inclusive: bool = True) -> dict | None:
+        i = (bisect_left if inclusive else bisect_right)(self.dates, after)
+        return self.events[i] if i < len(self.events) else None
+
+
+class Calendar:
+    def __init__(self, events: list[dict], templates: dict | None = None):
+        self.templates = templates or {}
+        self.index = DateIndex(events)
+        by_category = {}
+        for event in self.index.events:
+            by_category.setdefault(event["category"], []).append(event)
+        self.categories = {category: DateIndex(events) for category, events in by_category.items()}
+
+    @classmethod
+    def load(cls, city: str = "default", years=None, calendar_dir: str = CALENDAR_DIR) -> "Calendar":
+        """Load a city's year shards (all years, or just `years`)."""
+        with open(os.path.join(calendar_dir, "index.json")) as f:
+            index = json.load(f)
+        if city not in index["cities"]:
+            raise KeyError(f"Unknown city {city!r} (have: {', '.join(sorted(index['cities']))})")
+        wanted = {str(y) for y in years} if years else None
+        events, templates = [], {}
+        for year, shard in index["cities"][city]["years"].items():
+            if wanted is not None and year not in wanted:
+                continue
+            with open(os.path.join(calendar_dir, shard["path"]), encoding="utf-8") as f:
+                data = json.load(f)
+            events.extend(data["events"])
+            templates.update(data["templates"])
+        return cls(events, templates)
+
+    @classmethod
+    def from_file(cls, path: str) -> "Calendar":
+        """Load a full hindu-calendar*.json document."""
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["events"], data.get("templates"))
+
+    def _index(self, category: str | None) -> DateIndex:
+        if category is None:
+            return self.index
+        return self.categories.get(category) or DateIndex([])
+
+    def events_on(self, day, category: str | None = None) -> list[dict]:
+        day = as_date(day)
+        return self._index(category).between(day, day)
+
+    def events_between(self, start, end, category: str | None = None) -> list[dict]:
+        """Events with start <= date <= end."""
+        return self._index(category).between(as_date(start), as_date(end))
+
+    def next_event(self, after=None, category: str | None = None, inclusive: bool = True) -> dict | None:
+        return self._index(category).next(as_date(after or datetime.date.today()), inclusive)
+
+    def next_ekadashi(self, after=None, inclusive: bool = True) -> dict | None:
+        return self.next_event(after, "ekadashi", inclusive)
+
+    def template(self, event: dict) -> dict | None:
+        return self.templates.get(event.get("template"))
+
+
+def main():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--city", default="default")
+    common.add_argument("--category", help="ekadashi, festival, vrat, purnima, auspicious")
+    common.add_argument("--details", action="store_true", help="Include each event's template")
+
+    parser = argparse.ArgumentParser(description="Query the compiled Hindu calendar")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("on", parents=[common]).add_argument("date")
+    between = sub.add_parser("between", parents=[common])
+    between.add_argument("start")
+    between.add_argument("end")
+    sub.add_parser("next", parents=[common], help="Next event on or after --after").add_argument("--after")
+    sub.add_parser("next-ekadashi", parents=[common]).add_argument("--after")
+    args = parser.parse_args()
+
+    if args.command == "on":
+        years = [args.date[:4]]
+    elif args.command == "between":
+        years = range(int(args.start[:4]), int(args.end[:4]) + 1)
+    else:
+        # The next event may be in the following year's shard.
+        after = as_date(args.after or datetime.date.today())
+        years = [after.year, after.year + 1]
+    cal = Calendar.load(args.city, years)
+
+    if args.command == "on":
+        events = cal.events_on(args.date, args.category)
+    elif args.command == "between":
+        events = cal.events_between(args.start, args.end, args.category)
+    else:
+        category = "ekadashi" if args.command == "next-ekadashi" else args.category
+        event = cal.next_event(args.after, category)
+        events = [event] if event else []
+
+    if args.details:
+        events = [dict(e, details=cal.template(e)) for e in events]
+    for event in events:
+        print(json.dumps(event, ensure_ascii=False))
+    if not events:
+        print("No events")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""Write pre-compressed siblings of the served JSON and per-family zstd dictionaries.
+
+Clients fetch lyrics, stories, calendars and catalogs as plain JSON from the
+raw content host, which doesn't compress them. The files are small and repeat
+the same keys and boilerplate (`lineHindi`, `sections`, `moralHi`, …), so each
+file on its own also compresses poorly. This writes, next to every served JSON
+file:
+
+    <file>.gz     gzip -9 (every client can decode it)
+    <file>.br     brotli 11, if the brotli package is installed
+    <file>.zst    zstd 19 with the family's trained dictionary, if zstandard is installed
+
+Decoding a sibling gives back the served file byte for byte, so its sha256
+still matches sync/manifest.json and the result can go straight to the JSON
+parser. Dictionaries are trained per content family (lyrics, stories,
+calendar) and written to compression/<family>-<id>.dict. A .zst frame names
+its dictionary ID, and a client downloads each dictionary once.
+compression/index.json lists the dictionaries and every file's encodings and
+sizes. payload_decoder.py is a small client-side helper that reads them.
+
+Files whose content and dictionary are unchanged are skipped. Dictionaries are
+kept until --retrain, since retraining rewrites every .zst in the family.
+
+    python3 scripts/compress_payloads.py              # after editing content, before content_sync.py publish
+    python3 scripts/compress_payloads.py --check      # exit 1 if anything is stale or over budget
+    python3 scripts/compress_payloads.py --retrain    # retrain the dictionaries on the current content
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COMPRESSION_DIR = os.path.join(REPO_ROOT, "compression")
+INDEX_PATH = os.path.join(COMPRESSION_DIR, "index.json")
+REPORT_PATH = os.path.join(REPO_ROOT, "build", "compression-report.json")
+
+# Bump to recompress everything after changing levels or the sibling format.
+SPEC_VERSION = 1
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+ZSTD_LEVEL = 19
+
+# Training samples are the files cut at line boundaries into pieces of about this size;
+# a family with only a handful of files otherwise gives zstd too few samples to train on.
+SAMPLE_BYTES = 2048
+# zstd reserves dictionary IDs below 32768 for registered dictionaries.
+FIRST_DICT_ID = 32768
+
+
+class Family(NamedTuple):
+    patterns: list[str]
+    dict_size: int | None   # trained dictionary size in bytes, or None for plain zstd
+    budget: int             # largest acceptable .gz size for one file, in bytes
+
+
+# Dictionary sizes were picked by compressing the current content: beyond these,
+# the extra dictionary bytes stopped buying smaller files.
+FAMILIES = {
+    "lyrics": Family(["lyrics-catalog.json", "lyrics/*.json"], 16 * 1024, 12 * 1024),
+    "stories": Family(["stories/catalog.json", "stories/en/*.json", "stories/hi/*.json",
+                       "weekly-story.json", "weekly-stories/*.json"], 32 * 1024, 12 * 1024),
+    "calendar": Family(["hindu-calendar*.json", "calendar/index.json", "calendar/*/[0-9][0-9][0-9][0-9].json"],
+                       32 * 1024, 24 * 1024),
+    "config": Family(["app-config.json", "live-darshan-catalog.json"], None, 4 * 1024),
+}
+
+ENCODINGS = ["gz", "br", "zst"]
+
+
+def available_encodings() -> list[str]:
+    return ["gz"] + (["br"] if brotli else []) + (["zst"] if zstandard else [])
+
+
+def rel(path: str) -> str:
+    return os.path.relpath(path, REPO_ROOT).replace(os.sep, "/")
+
+
+def family_files(family: Family) -> list[str]:
+    paths = {rel(p) for pattern in family.patterns for p in glob.glob(os.path.join(REPO_ROOT, pattern))}
+    return sorted(paths)
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def read(rel_path: str) -> bytes:
+    with open(os.path.join(REPO_ROOT, rel_path), "rb") as f:
+        return f.read()
+
+
+def write_atomic(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def load_index() -> dict:
+    if os.path.exists(INDEX_PATH):
+        with open(INDEX_PATH) as f:
+            index = json.load(f)
+        if index.get("specVersion") == SPEC_VERSION:
+            return index
+    return {"specVersion": SPEC_VERSION, "dictionaries": {}, "files": {}}
+
+
+# --- Dictionaries ----------------------------------------------------------------
+
+def samples(paths: list[str]) -> list[bytes]:
+    pieces = []
+    for path in paths:
+        piece = b""
+        for line in read(path).splitlines(keepends=True):
+            if piece and len(piece) + len(line) > SAMPLE_BYTES:
+                pieces.append(piece)
+                piece = b""
+            piece += line
+        if piece:
+            pieces.append(piece)
+    return pieces
+
+
+def train(name: str, family: Family, paths: list[str], dict_id: int) -> dict:
+    data = zstandard.train_dictionary(family.dict_size, samples(paths), dict_id=dict_id, level=ZSTD_LEVEL).as_bytes()
+    path = os.path.join(COMPRESSION_DIR, f"{name}-{dict_id}.dict")
+    write_atomic(path, data)
+    return {"id": dict_id, "path": rel(path), "bytes": len(data), "sha256": sha256(data)}
+
+
+# --- Compression (runs in worker processes) ---------------------------------------
+
+def compress(data: bytes, encoding: str, dictionary: bytes | None = None) -> bytes:
+    if encoding == "gz":
+        # mtime=0 keeps the output identical for identical input, so unchanged files don't churn in git.
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "zst":
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data, write_content_size=True).compress(data)
+    raise ValueError(f"Unknown encoding {encoding!r}")
+
+
+def compress_file(rel_path: str, encodings: list[str], dictionary: bytes | None) -> dict[str, int]:
+    data = read(rel_path)
+    sizes = {}
+    for encoding in encodings:
+        packed = compress(data, encoding, dictionary)
+        write_atomic(os.path.join(REPO_ROOT, f"{rel_path}.{encoding}"), packed)
+        sizes[encoding] = len(packed)
+    return sizes
+
+
+def remove_siblings(rel_path: str, encodings: list[str]) -> int:
+    removed = 0
+    for encoding in encodings:
+        path = os.path.join(REPO_ROOT, f"{rel_path}.{encoding}")
+        if os.path.exists(path):
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+# --- Publish ------------------------------------------------------------------------
+
+def plan(index: dict, encodings: list[str], force: bool) -> tuple[dict[str, list[str]], list[tuple]]:
+    """Return (family -> files, [(family, path, sha256)] needing compression)."""
+    families, todo = {}, []
+    for name, family in FAMILIES.items():
+        families[name] = family_files(family)
+        dict_id = index["dictionaries"].get(name, {}).get("id")
+        for path in families[name]:
+            digest = sha256(read(path))
+            entry = index["files"].get(path)
+            current = (
+                entry is not None
+                and entry["sha256"] == digest
+                and entry["dictionary"] == (dict_id if "zst" in encodings else None)
+                and set(entry["encodings"]) == set(encodings)
+                and all(os.path.exists(os.path.join(REPO_ROOT, f"{path}.{e}")) for e in encodings)
+            )
+            if force or not current:
+                todo.append((name, path, digest))
+    return families, todo
+
+
+def budget_report(index: dict, families: dict[str, list[str]]) -> dict:
+    report = {}
+    for name, paths in families.items():
+        entries = [index["files"][p] for p in paths if p in index["files"]]
+        totals = {"files": len(entries), "bytes": sum(e["bytes"] for e in entries)}
+        for encoding in ENCODINGS:
+            if entries and all(encoding in e["encodings"] for e in entries):
+                totals[encoding] = sum(e["encodings"][encoding] for e in entries)
+        dictionary = index["dictionaries"].get(name)
+        if dictionary and "zst" in totals:
+            totals["dictionaryBytes"] = dictionary["bytes"]
+        budget = FAMILIES[name].budget
+        totals["budget"] = budget
+        totals["overBudget"] = {p: index["files"][p]["encodings"]["gz"] for p in paths
+                                if p in index["files"] and index["files"][p]["encodings"]["gz"] > budget}
+        report[name] = totals
+    return report
+
+
+def print_report(report: dict):
+    def kb(n):
+        return f"{n / 1024:.1f} KB" if n is not None else "-"
+
+    print(f"\n{'family':<10}{'files':>6}{'raw':>11}{'gz':>11}{'br':>11}{'zst':>11}{'dict':>10}")
+    for name, t in report.items():
+        print(f"{name:<10}{t['files']:>6}{kb(t['bytes']):>11}{kb(t.get('gz')):>11}{kb(t.get('br')):>11}"
+              f"{kb(t.get('zst')):>11}{kb(t.get('dictionaryBytes')):>10}")
+        for path, size in t["overBudget"].items():
+            print(f"  ✗ {path}: {kb(size)} as .gz, over the {kb(t['budget'])} budget")
+
+
+def publish(force: bool = False, retrain: bool = False, check: bool = False, workers: int | None = None) -> int:
+    encodings = available_encodings()
+    missing = [e for e in ENCODINGS if e not in encodings]
+    if missing:
+        print(f"⚠️  Not writing .{'/.'.join(missing)} (pip install {' '.join({'br': 'brotli', 'zst': 'zstandard'}[e] for e in missing)})")
+
+    index = load_index()
+    if "zst" in encodings and not check:
+        next_id = max([d["id"] for d in index["dictionaries"].values()] + [FIRST_DICT_ID - 1]) + 1
+        for name, family in FAMILIES.items():
+            old = index["dictionaries"].get(name)
+            if family.dict_size is None or (old and not retrain and os.path.exists(os.path.join(REPO_ROOT, old["path"]))):
+                continue
+            index["dictionaries"][name] = train(name, family, family_files(family), next_id)
+            print(f"  ✓ Trained {name} dictionary {next_id} ({index['dictionaries'][name]['bytes'] // 1024} KB)")
+            next_id += 1
+            if old and old["path"] != index["dictionaries"][name]["path"] and os.path.exists(os.path.join(REPO_ROOT, old["path"])):
+                os.remove(os.path.join(REPO_ROOT, old["path"]))
+
+    families, todo = plan(index, encodings, force)
+    served = {p for paths in families.values() for p in paths}
+    gone = sorted(set(index["files"]) - served)
+
+    if check:
+        report = budget_report(index, families)
+        for _, path, _ in todo:
+            print(f"  ✗ {path} has stale or missing siblings")
+        for path in gone:
+            print(f"  ✗ {path} no longer exists but still has siblings")
+        print_report(report)
+        over = sum(len(t["overBudget"]) for t in report.values())
+        if todo or gone:
+            print("\nRun: python3 scripts/compress_payloads.py")
+        return 1 if todo or gone or over else 0
+
+    print(f"{len(served) - len(todo)} file(s) up to date, {len(todo)} to compress")
+    dictionaries = {name: read(d["path"]) for name, d in index["dictionaries"].items()} if "zst" in encodings else {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(compress_file, path, encodings, dictionaries.get(name)): (name, path, digest)
+                   for name, path, digest in todo}
+        for future in as_completed(futures):
+            name, path, digest = futures[future]
+            try:
+                sizes = future.result()
+            except Exception as e:
+                print(f"  ✗ {path}: {e}")
+                continue
+            index["files"][path] = {
+                "family": name,
+                "sha256": digest,
+                "bytes": os.path.getsize(os.path.join(REPO_ROOT, path)),
+                "dictionary": index["dictionaries"].get(name, {}).get("id") if "zst" in sizes else None,
+                "encodings": sizes,
+            }
+            # Siblings in an encoding we can no longer produce would now be stale.
+            remove_siblings(path, [e for e in ENCODINGS if e not in sizes])
+
+    for path in gone:
+        removed = remove_siblings(path, ENCODINGS)
+        del index["files"][path]
+        print(f"  🗑  {path}: removed {removed} sibling(s) of a deleted file")
+
+    index["files"] = dict(sorted(index["files"].items()))
+    write_atomic(INDEX_PATH, (json.dumps(index, indent=2) + "\n").encode("utf-8"))
+
+    report = budget_report(index, families)
+    write_atomic(REPORT_PATH, (json.dumps(report, indent=2) + "\n").encode("utf-8"))
+    print_report(report)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write .gz/.br/.zst siblings of served JSON and train zstd dictionaries")
+    parser.add_argument("--force", action="store_true", help="Recompress every file")
+    parser.add_argument("--retrain", action="store_true", help="Retrain the zstd dictionaries (rewrites every .zst)")
+    parser.add_argument("--check", action="store_true", help="Only report stale siblings and files over budget (exit 1 if any)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    sys.exit(publish(args.force, args.retrain, args.check, args.workers))
+
+
+if __name__ == "__main__":
+    main()
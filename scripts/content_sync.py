@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""Content manifest and per-revision delta feed for app sync.
+
+Instead of re-downloading every catalog whenever a `version` field is bumped,
+the app fetches one small manifest and, when its revision differs, one delta:
+
+    sync/revision.json       the current revision (a few dozen bytes; polled on startup)
+    sync/manifest.json       revision + sha256/size/version of every served file,
+                             and sha256/version of every catalog entry
+    sync/deltas/<rev>.json   what changed from revision <rev> to the current one:
+                             added/removed files, JSON Patch (RFC 6902) for changed
+                             JSON files, added/removed/patched catalog entries
+
+A revision is a hash of the served files' hashes, so the same content always
+has the same revision regardless of which commit or checkout produced it.
+`publish` writes deltas from the revisions of the last few commits. A delta
+carries everything needed to update the client's copy of the manifest; a
+client on an older revision (404 on its delta) fetches the full manifest and
+downloads whatever differs.
+
+    python3 scripts/content_sync.py publish [--history 20]
+    python3 scripts/content_sync.py delta HEAD~3 HEAD       # print a delta between two commits
+    python3 scripts/content_sync.py serve --port 8000       # local stand-in for the raw GitHub host
+    python3 scripts/content_sync.py pull http://localhost:8000/ --state /tmp/app
+"""
+
+import argparse
+import functools
+import hashlib
+import http.server
+import json
+import os
+import re
+import subprocess
+import sys
+import urllib.error
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SYNC_DIR = os.path.join(REPO_ROOT, "sync")
+MANIFEST_PATH = os.path.join(SYNC_DIR, "manifest.json")
+REVISION_PATH = os.path.join(SYNC_DIR, "revision.json")
+DELTAS_DIR = os.path.join(SYNC_DIR, "deltas")
+BLOB_CACHE_PATH = os.path.join(REPO_ROOT, "build", "sync-blob-cache.json")
+
+# Files the app fetches from the raw content host (scripture data is bundled, not synced).
+SERVED = [
+    "app-config.json",
+    "live-darshan-catalog.json",
+    "weekly-story.json",
+    "weekly-stories/*.json",
+    "hindu-calendar*.json",
+    "calendar/index.json",
+    "calendar/*/[0-9][0-9][0-9][0-9].json",
+    "lyrics-catalog.json",
+    "lyrics/*.json",
+    "stories/catalog.json",
+    "stories/en/*.json",
+    "stories/hi/*.json",
+    "stories/en/audio/*/*.mp3",
+    "stories/hi/audio/*/*.mp3",
+    "stories/images/*.png",
+    "stories/images/variants/*",
+]
+
+# Catalogs whose entries are tracked individually: path -> (key holding the list, or None for a top-level list)
+CATALOGS = {
+    "lyrics-catalog.json": None,
+    "stories/catalog.json": None,
+    "live-darshan-catalog.json": "temples",
+}
+
+# A JSON Patch is only shipped when it is meaningfully smaller than the new file.
+MAX_PATCH_RATIO = 0.5
+
+
+def glob_regex(pattern: str) -> str:
+    """Shell-style pattern where `*` stays within one path segment."""
+    out = []
+    for token in re.split(r"(\*|\[[^\]]*\])", pattern):
+        if token == "*":
+            out.append("[^/]*")
+        elif token.startswith("["):
+            out.append(token)
+        else:
+            out.append(re.escape(token))
+    return "".join(out)
+
+
+SERVED_RE = re.compile("^(?:" + "|".join(glob_regex(p) for p in SERVED) + ")$")
+
+
+def is_served(path: str) -> bool:
+    return bool(SERVED_RE.match(path))
+
+
+# --- Trees ------------------------------------------------------------------------
+# A tree maps served path -> [sha256, size, version] and can read any of its files.
+
+def file_meta(path: str, data: bytes) -> list:
+    """[sha256, size, top-level integer `version` of a JSON document or None]."""
+    version = None
+    if path.endswith(".json"):
+        doc = json.loads(data)
+        if isinstance(doc, dict) and isinstance(doc.get("version"), int):
+            version = doc["version"]
+    return [hashlib.sha256(data).hexdigest(), len(data), version]
+
+
+class WorkTree:
+    def __init__(self, root: str = REPO_ROOT):
+        self.root = root
+        self.files = {}
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".") and d not in ("build", "sync")]
+            for name in filenames:
+                rel = os.path.relpath(os.path.join(dirpath, name), root).replace(os.sep, "/")
+                if is_served(rel):
+                    self.files[rel] = file_meta(rel, self.read(rel))
+
+    def read(self, path: str) -> bytes:
+        with open(os.path.join(self.root, path), "rb") as f:
+            return f.read()
+
+
+class GitTree:
+    """Served files as of a commit; metadata per blob is cached across runs."""
+
+    def __init__(self, commit: str, blob_cache: dict):
+        self.commit = commit
+        listing = subprocess.run(["git", "ls-tree", "-r", "-z", commit], cwd=REPO_ROOT,
+                                 capture_output=True, check=True).stdout.decode("utf-8")
+        self.blobs = {}
+        for line in filter(None, listing.split("\0")):
+            meta, path = line.split("\t", 1)
+            _, kind, blob = meta.split()
+            if kind == "blob" and is_served(path):
+                self.blobs[path] = blob
+        self.files = {}
+        for path, blob in self.blobs.items():
+            if blob not in blob_cache:
+                blob_cache[blob] = file_meta(path, self.read(path))
+            self.files[path] = blob_cache[blob]
+
+    def read(self, path: str) -> bytes:
+        return subprocess.run(["git", "cat-file", "blob", self.blobs[path]], cwd=REPO_ROOT,
+                              capture_output=True, check=True).stdout
+
+
+def load_blob_cache() -> dict:
+    if not os.path.exists(BLOB_CACHE_PATH):
+        return {}
+    with open(BLOB_CACHE_PATH) as f:
+        return json.load(f)
+
+
+def save_blob_cache(cache: dict):
+    os.makedirs(os.path.dirname(BLOB_CACHE_PATH), exist_ok=True)
+    tmp_path = BLOB_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, BLOB_CACHE_PATH)
+
+
+# --- Manifest -----------------------------------------------------------------------
+
+def json_hash(doc) -> str:
+    """Hash of a JSON value independent of key order and formatting."""
+    raw = json.dumps(doc, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def catalog_entries(doc, list_key: str | None) -> list[dict]:
+    return doc if list_key is None else doc.get(list_key, [])
+
+
+def build_manifest(tree) -> dict:
+    files = {}
+    for path, (sha, size, version) in sorted(tree.files.items()):
+        meta = {"sha256": sha, "bytes": size}
+        if version is not None:
+            meta["version"] = version
+        files[path] = meta
+
+    entries = {}
+    for path, list_key in CATALOGS.items():
+        if path not in tree.files:
+            continue
+        entries[path] = {}
+        for entry in catalog_entries(json.loads(tree.read(path)), list_key):
+            meta = {"sha256": json_hash(entry)}
+            if "version" in entry:
+                meta["version"] = entry["version"]
+            entries[path][entry["id"]] = meta
+
+    return {"revision": manifest_revision(files), "files": files, "entries": entries}
+
+
+def manifest_revision(files: dict) -> str:
+    return hashlib.sha256("".join(f"{p} {files[p]['sha256']}\n" for p in sorted(files)).encode()).hexdigest()[:16]
+
+
+# --- JSON Patch (RFC 6902) ------------------------------------------------------------
+
+def pointer(path: list) -> str:
+    return "".join("/" + str(p).replace("~", "~0").replace("/", "~1") for p in path)
+
+
+def json_diff(a, b, path: list | None = None) -> list[dict]:
+    path = path or []
+    if type(a) is not type(b) or not isinstance(a, (dict, list)):
+        return [] if a == b else [{"op": "replace", "path": pointer(path), "value": b}]
+
+    ops = []
+    if isinstance(a, dict):
+        for key in a:
+            if key not in b:
+                ops.append({"op": "remove", "path": pointer(path + [key])})
+        for key, value in b.items():
+            if key not in a:
+                ops.append({"op": "add", "path": pointer(path + [key]), "value": value})
+            else:
+                ops.extend(json_diff(a[key], value, path + [key]))
+        return ops
+
+    # Lists: keep the common prefix and suffix, diff the overlapping middle element-wise,
+    # then remove (highest index first) or append what's left.
+    prefix = 0
+    while prefix < min(len(a), len(b)) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < min(len(a), len(b)) - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    a_mid, b_mid = a[prefix:len(a) - suffix], b[prefix:len(b) - suffix]
+    for i in range(min(len(a_mid), len(b_mid))):
+        ops.extend(json_diff(a_mid[i], b_mid[i], path + [prefix + i]))
+    for i in reversed(range(len(b_mid), len(a_mid))):
+        ops.append({"op": "remove", "path": pointer(path + [prefix + i])})
+    for i in range(len(a_mid), len(b_mid)):
+        ops.append({"op": "add", "path": pointer(path + [prefix + i]), "value": b_mid[i]})
+    return ops
+
+
+def apply_patch(doc, ops: list[dict]):
+    """Apply add/remove/replace operations (the subset json_diff emits)."""
+    for op in ops:
+        parts = [p.replace("~1", "/").replace("~0", "~") for p in op["path"].split("/")[1:]]
+        if not parts:
+            doc = op["value"]
+            continue
+        parent = doc
+        for part in parts[:-1]:
+            parent = parent[int(part)] if isinstance(parent, list) else parent[part]
+        last = parts[-1]
+        if isinstance(parent, list):
+            index = len(parent) if last == "-" else int(last)
+            if op["op"] == "add":
+                parent.insert(index, op["value"])
+            elif op["op"] == "remove":
+                del parent[index]
+            else:
+                parent[index] = op["value"]
+        elif op["op"] == "remove":
+            del parent[last]
+        else:
+            parent[last] = op["value"]
+    return doc
+
+
+# --- Deltas -------------------------------------------------------------------------------
+
+def build_delta(old_tree, old_manifest: dict, new_tree, new_manifest: dict) -> dict:
+    old_files, new_files = old_manifest["files"], new_manifest["files"]
+    delta = {
+        "from": old_manifest["revision"],
+        "to": new_manifest["revision"],
+        "added": {p: m for p, m in new_files.items() if p not in old_files},
+        "removed": sorted(p for p in old_files if p not in new_files),
+        "changed": {},
+        "entries": {},
+    }
+    for path, meta in new_files.items():
+        if path not in old_files or old_files[path]["sha256"] == meta["sha256"]:
+            continue
+        change = dict(meta)
+        if path.endswith(".json"):
+            new_doc = json.loads(new_tree.read(path))
+            ops = json_diff(json.loads(old_tree.read(path)), new_doc)
+            if len(json.dumps(ops, ensure_ascii=False).encode("utf-8")) <= meta["bytes"] * MAX_PATCH_RATIO:
+                # Patched documents aren't byte-identical to the served file, so they're checked by JSON hash.
+                change["patch"] = ops
+                change["patchedSha256"] = json_hash(new_doc)
+        delta["changed"][path] = change
+
+    for path in CATALOGS:
+        old, new = old_manifest["entries"].get(path, {}), new_manifest["entries"].get(path, {})
+        summary = {
+            "added": {i: m for i, m in new.items() if i not in old},
+            "removed": sorted(i for i in old if i not in new),
+            "patched": {i: m for i, m in new.items() if i in old and m["sha256"] != old[i]["sha256"]},
+        }
+        if any(summary.values()):
+            delta["entries"][path] = summary
+    return delta
+
+
+def apply_delta(manifest: dict, delta: dict) -> dict:
+    """The manifest at delta["to"], given the manifest at delta["from"]."""
+    files = {p: m for p, m in manifest["files"].items() if p not in delta["removed"]}
+    files.update(delta["added"])
+    for path, change in delta["changed"].items():
+        files[path] = {k: v for k, v in change.items() if k not in ("patch", "patchedSha256")}
+    entries = {path: dict(ids) for path, ids in manifest["entries"].items()}
+    for path, summary in delta["entries"].items():
+        catalog = entries.setdefault(path, {})
+        for entry_id in summary["removed"]:
+            catalog.pop(entry_id, None)
+        catalog.update(summary["added"])
+        catalog.update(summary["patched"])
+    return {"revision": delta["to"], "files": dict(sorted(files.items())), "entries": entries}
+
+
+def write_json(path: str, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def recent_commits(count: int) -> list[str]:
+    out = subprocess.run(["git", "rev-list", f"--max-count={count}", "HEAD"], cwd=REPO_ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    return out.split()
+
+
+def publish(history: int):
+    """Write sync/manifest.json for the working tree and deltas from the last `history` commits."""
+    current = WorkTree()
+    manifest = build_manifest(current)
+    write_json(MANIFEST_PATH, manifest)
+    write_json(REVISION_PATH, {"revision": manifest["revision"], "manifestBytes": os.path.getsize(MANIFEST_PATH)})
+    print(f"✓ manifest {manifest['revision']}: {len(manifest['files'])} files, "
+          f"{sum(map(len, manifest['entries'].values()))} catalog entries "
+          f"({os.path.getsize(MANIFEST_PATH) / 1024:.0f} KB)")
+
+    blob_cache = load_blob_cache()
+    written = set()
+    for commit in recent_commits(history):
+        tree = GitTree(commit, blob_cache)
+        old_manifest = build_manifest(tree)
+        rev = old_manifest["revision"]
+        if rev == manifest["revision"] or rev in written:
+            continue
+        delta = build_delta(tree, old_manifest, current, manifest)
+        assert apply_delta(old_manifest, delta) == manifest
+        path = os.path.join(DELTAS_DIR, f"{rev}.json")
+        write_json(path, delta)
+        written.add(rev)
+        patched = sum(1 for c in delta["changed"].values() if "patch" in c)
+        print(f"  ✓ {commit[:8]} → deltas/{rev}.json: +{len(delta['added'])} -{len(delta['removed'])} "
+              f"~{len(delta['changed'])} ({patched} patched), {os.path.getsize(path) / 1024:.1f} KB")
+    save_blob_cache(blob_cache)
+
+    if os.path.isdir(DELTAS_DIR):
+        for name in os.listdir(DELTAS_DIR):
+            if name.endswith(".json") and name[:-5] not in written:
+                os.remove(os.path.join(DELTAS_DIR, name))
+                print(f"  🗑  deltas/{name}")
+
+
+# --- Local host and client ---------------------------------------------------------------------
+
+def serve(port: int, root: str = REPO_ROOT):
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=root)
+    with http.server.ThreadingHTTPServer(("127.0.0.1", port), handler) as server:
+        print(f"Serving {root} on http://127.0.0.1:{port}/ (Ctrl+C to stop)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def fetch(url: str) -> bytes | None:
+    try:
+        with urllib.request.urlopen(url) as response:
+            return response.read()
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            return None
+        raise
+
+
+def write_file(state_dir: str, rel: str, data: bytes):
+    path = os.path.join(state_dir, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def pull(base_url: str, state_dir: str) -> dict:
+    """Bring a local copy up to date the way the app would; returns request/byte counts."""
+    base_url = base_url.rstrip("/") + "/"
+    stats = {"requests": 0, "bytes": 0, "patched": 0, "downloaded": 0, "removed": 0}
+
+    def get(rel: str) -> bytes | None:
+        data = fetch(base_url + rel)
+        stats["requests"] += 1
+        stats["bytes"] += len(data or b"")
+        return data
+
+    state_manifest = os.path.join(state_dir, ".manifest.json")
+    local = None
+    if os.path.exists(state_manifest):
+        with open(state_manifest) as f:
+            local = json.load(f)
+
+    revision = json.loads(get("sync/revision.json"))["revision"]
+    if local and local["revision"] == revision:
+        return stats
+
+    delta = get(f"sync/deltas/{local['revision']}.json") if local else None
+    if delta:
+        delta = json.loads(delta)
+        remote = apply_delta(local, delta)
+    else:
+        remote = json.loads(get("sync/manifest.json"))
+    if manifest_revision(remote["files"]) != remote["revision"]:
+        raise ValueError("Manifest does not match its revision")
+    local_files = local["files"] if local else {}
+
+    for rel, meta in remote["files"].items():
+        if rel in local_files and local_files[rel]["sha256"] == meta["sha256"]:
+            continue
+        change = delta["changed"].get(rel) if delta else None
+        if change and "patch" in change and rel in local_files:
+            try:
+                with open(os.path.join(state_dir, rel), encoding="utf-8") as f:
+                    doc = apply_patch(json.load(f), change["patch"])
+            except (OSError, ValueError, KeyError, IndexError, TypeError):
+                doc = None
+            if doc is not None and json_hash(doc) == change["patchedSha256"]:
+                write_file(state_dir, rel, json.dumps(doc, ensure_ascii=False, indent=2).encode("utf-8"))
+                stats["patched"] += 1
+                continue
+        data = get(rel)
+        if data is None or hashlib.sha256(data).hexdigest() != meta["sha256"]:
+            raise ValueError(f"Missing or corrupt download: {rel}")
+        write_file(state_dir, rel, data)
+        stats["downloaded"] += 1
+
+    for rel in set(local_files) - set(remote["files"]):
+        path = os.path.join(state_dir, rel)
+        if os.path.exists(path):
+            os.remove(path)
+        stats["removed"] += 1
+
+    os.makedirs(state_dir, exist_ok=True)
+    with open(state_manifest, "w") as f:
+        json.dump(remote, f)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Content manifest and delta feed for app sync")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pub = sub.add_parser("publish", help="Write sync/revision.json, sync/manifest.json and sync/deltas/")
+    pub.add_argument("--history", type=int, default=20, help="Write deltas from this many recent commits (default: 20)")
+
+    delta = sub.add_parser("delta", help="Print the delta between two commits")
+    delta.add_argument("old")
+    delta.add_argument("new", nargs="?", help="Commit (default: working tree)")
+
+    srv = sub.add_parser("serve", help="Serve the repo over HTTP like the raw content host")
+    srv.add_argument("--port", type=int, default=8000)
+    srv.add_argument("--root", default=REPO_ROOT)
+
+    pl = sub.add_parser("pull", help="Sync a local copy from a base URL like the app does")
+    pl.add_argument("base_url")
+    pl.add_argument("--state", required=True, help="Local copy directory")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        publish(args.history)
+    elif args.command == "delta":
+        blob_cache = load_blob_cache()
+        old = GitTree(args.old, blob_cache)
+        new = GitTree(args.new, blob_cache) if args.new else WorkTree()
+        save_blob_cache(blob_cache)
+        json.dump(build_delta(old, build_manifest(old), new, build_manifest(new)), sys.stdout,
+                  ensure_ascii=False, indent=2)
+        print()
+    elif args.command == "serve":
+        serve(args.port, args.root)
+    else:
+        stats = pull(args.base_url, args.state)
+        print(f"{stats['requests']} request(s), {stats['bytes'] / 1024:.1f} KB: {stats['downloaded']} downloaded, "
+              f"{stats['patched']} patched, {stats['removed']} removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""Stream normalized verse records out of any corpus without json.load-ing whole files.
+
+Every collection has its own JSON shape (`mandala/sukta`, `book/chapter/shloka`,
+`kaanda/sarg/shloka`, `type/content`, the Gita's `BhagavadGitaChapter` wrapper,
+the Critical Edition's `02001001a -> {text: {ud, ur, ascii}}` dict). This module
+knows all of them and yields one Record per verse with a canonical reference
+(`rigveda:1.1`, `mbh:2.1.1a`, `gita:2.47`, ...).
+
+Files are read in fixed-size chunks and split into top-level elements by a
+small string-aware bracket scanner; only elements that pass the range filter
+are handed to json.loads. Peak memory is one chunk plus one record, and a
+range such as `mbh:5.1`-`mbh:5.3` skips whole files by name and everything
+else by scanning, not decoding.
+
+    python3 scripts/corpus_reader.py read gita:2.47 gita:2.50
+    python3 scripts/corpus_reader.py count mbh:5
+    python3 scripts/corpus_reader.py count --all
+
+From Python:
+
+    for record in read("ramayana", "ramayana:5.1", "ramayana:5.3"):
+        record.ref, record.body["text"]
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+from typing import Callable, Iterator, NamedTuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CE_DIR = os.path.join(REPO_ROOT, "Mahabharata", "Critical Edition")
+
+CHUNK_SIZE = 1 << 16
+
+REF_RE = re.compile(r"^([a-z-]+):(\d+(?:\.\d+)*)([a-zA-Z]?)$")
+
+
+# --- References ------------------------------------------------------------------
+
+def half_ordinal(half: str) -> int:
+    """0 for whole verses, 1-26 for the usual a/c/e line letters, 27-52 for upper-case ones."""
+    if not half:
+        return 0
+    return ord(half) - 96 if half.islower() else ord(half) - 64 + 26
+
+
+def sort_key(parts: list[int], half: str = "") -> int:
+    """Pack up to three numeric components and a half-verse letter into one sortable int."""
+    n = 0
+    for i in range(3):
+        n = n * 10000 + (parts[i] if i < len(parts) else 0)
+    return n * 64 + half_ordinal(half)
+
+
+def parse_ref(ref: str) -> tuple[str, list[int], str]:
+    m = REF_RE.match(ref.strip())
+    if not m:
+        raise ValueError(f"Invalid reference: {ref!r} (expected e.g. 'gita:2.47')")
+    return m.group(1), [int(p) for p in m.group(2).split(".")], m.group(3)
+
+
+def format_ref(collection: str, parts: list[int], half: str = "") -> str:
+    return f"{collection}:{'.'.join(str(p) for p in parts)}{half}"
+
+
+def file_number(path: str) -> int:
+    """Leading/trailing number in a corpus file name (`rigveda_mandala_3.json`, `5_sundarakanda.json`)."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    return int(re.search(r"^\d+|\d+$", name).group())
+
+
+def in_range(parts: list[int], lo: list[int] | None, hi: list[int] | None) -> bool:
+    """Prefix-inclusive range test: [5, 2] lies within lo=[5], hi=[5, 3]; so does the file prefix [5]."""
+    return (lo is None or parts[:len(lo)] >= lo[:len(parts)]) and (hi is None or parts[:len(hi)] <= hi[:len(parts)])
+
+
+# --- Streaming JSON scanner --------------------------------------------------------
+
+WS_RE = re.compile(r"[\s\ufeff]*")
+# A string (group 1 is None while its closing quote has not been read yet) or a bracket.
+TOKEN_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*(")?|[\[\]{}]')
+STRING_RE = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*(")?')
+SCALAR_RE = re.compile(r"[^\s,:\]}]+")
+
+
+class JsonStream:
+    """Pull raw JSON values off a text file one at a time, reading CHUNK_SIZE characters at a time."""
+
+    def __init__(self, f, chunk_size: int = CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, keep_from: int) -> int:
+        """Drop the buffer before keep_from, append a chunk, and return how far offsets moved."""
+        if self.eof:
+            raise ValueError("Unexpected end of JSON input")
+        data = self.f.read(self.chunk_size)
+        if not data:
+            self.eof = True
+        self.buf = self.buf[keep_from:] + data
+        self.pos -= keep_from
+        return keep_from
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it ('' at end of input)."""
+        while True:
+            self.pos = WS_RE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self._fill(self.pos)
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON input, got {c!r}")
+        self.pos += 1
+        return c
+
+    def value(self) -> str:
+        """Consume the next value and return its raw text."""
+        c = self.peek()
+        start = self.pos
+        if c in "[{":
+            depth = 0
+            i = start
+            while True:
+                for m in TOKEN_RE.finditer(self.buf, i):
+                    token = m.group()
+                    if token[0] == '"':
+                        if m.group(1) is None:
+                            break
+                    elif token in "[{":
+                        depth += 1
+                    else:
+                        depth -= 1
+                        if depth == 0:
+                            self.pos = m.end()
+                            return self.buf[start:self.pos]
+                    i = m.end()
+                else:
+                    i = len(self.buf)
+                shift = self._fill(start)
+                start, i = start - shift, i - shift
+        pattern = STRING_RE if c == '"' else SCALAR_RE
+        while True:
+            m = pattern.match(self.buf, self.pos)
+            complete = m.group(1) is not None if c == '"' else m and (m.end() < len(self.buf) or self.eof)
+            if complete:
+                self.pos = m.end()
+                return m.group()
+            self._fill(self.pos)
+
+    def members(self) -> Iterator[str | int]:
+        """Walk the container that starts here, yielding object keys or array indexes.
+
+        The caller must consume each member's value (value(), or by descending
+        into it) before asking for the next one.
+        """
+        opener = self.expect("[{")
+        close = "]" if opener == "[" else "}"
+        if self.peek() == close:
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            if opener == "{":
+                key = json.loads(self.value())
+                self.expect(":")
+                yield key
+            else:
+                yield index
+                index += 1
+            if self.expect("," + close) == close:
+                return
+
+
+def iter_elements(path: str, container: str | None = None, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    """Yield (key or index, raw JSON text) for each element of the file's top-level array/object,
+    or of the array/object under `container` in a top-level object."""
+    with open(path, encoding="utf-8") as f:
+        stream = JsonStream(f, chunk_size)
+        if not stream.peek():
+            return
+        if container is not None:
+            for key in stream.members():
+                if key == container:
+                    break
+                stream.value()
+            else:
+                return
+        for key in stream.members():
+            yield key, stream.value()
+
+
+# --- Collections --------------------------------------------------------------------
+
+class Record(NamedTuple):
+    ref: str
+    collection: str
+    parts: list[int]
+    half: str
+    source: str
+    body: dict
+
+
+def field_re(name: str) -> re.Pattern:
+    # A top-level-looking `"name": 12` (preceded by { or , so an escaped quote inside a string can't match).
+    return re.compile(r'[{,]\s*"' + re.escape(name) + r'"\s*:\s*(-?\d+)')
+
+
+def fields(*names: str | tuple[str, ...]) -> Callable:
+    """Peek numeric fields out of a raw record; a tuple of names means "first one present".
+
+    Falls back to decoding the record when a field isn't where the regex looks.
+    """
+    options = [name if isinstance(name, tuple) else (name,) for name in names]
+    patterns = [[field_re(n) for n in names] for names in options]
+
+    def peek(path, key, raw):
+        parts = []
+        record = None
+        for names, regexes in zip(options, patterns):
+            m = next(filter(None, (p.search(raw) for p in regexes)), None)
+            if m is not None:
+                parts.append(int(m.group(1)))
+                continue
+            record = record or json.loads(raw)
+            parts.append(next(record[n] for n in names if n in record))
+        return parts, ""
+    return peek
+
+
+def file_prefixed(peek: Callable) -> Callable:
+    """Put the file's number in front of the peeked parts (Valmiki kaanda, Manas kaand)."""
+    def prefixed(path, key, raw):
+        parts, half = peek(path, key, raw)
+        return [file_number(path)] + parts, half
+    return prefixed
+
+
+def ce_key(path, key, raw):
+    return [int(key[0:2]), int(key[2:5]), int(key[5:8])], key[8:]
+
+
+def position(path, key, raw):
+    return [key + 1], ""
+
+
+def ce_file_parts(path: str) -> list[int]:
+    """MBh05.json covers book 5; chapters/MBh01/Chapter_012.json covers 1.12."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    if name.startswith("Chapter_"):
+        return [int(os.path.basename(os.path.dirname(path))[3:]), int(name[8:])]
+    return [int(name[3:5])]
+
+
+def critical_edition_files():
+    """Whole-book files where present, per-chapter files for the books that only exist split up."""
+    files = [p for p in sorted(glob.glob(os.path.join(CE_DIR, "MBh??.json")))]
+    books = {os.path.basename(p)[:5] for p in files}
+    for chapter_dir in sorted(glob.glob(os.path.join(CE_DIR, "chapters", "MBh??"))):
+        if os.path.basename(chapter_dir) not in books:
+            files.extend(sorted(glob.glob(os.path.join(chapter_dir, "Chapter_*.json"))))
+    return files
+
+
+def glob_files(pattern):
+    return lambda: sorted(glob.glob(os.path.join(REPO_ROOT, pattern)), key=lambda p: (len(p), p))
+
+
+def by_number(path: str) -> list[int]:
+    return [file_number(path)]
+
+
+class Collection(NamedTuple):
+    files: Callable[[], list[str]]
+    # (path, key or index, raw element) -> (parts, half); must not need a full decode when avoidable.
+    peek: Callable
+    # decoded element -> body stored/returned for the verse
+    body: Callable[[dict], dict]
+    # parts prefix implied by the file name, used to skip whole files outside a range
+    file_parts: Callable[[str], list[int]] | None = None
+    # key of the array inside a top-level object
+    container: str | None = None
+
+
+def gita_body(r: dict) -> dict:
+    return {k: v for k, v in r.items() if k not in ("chapter", "verse")}
+
+
+COLLECTIONS = {
+    "rigveda": Collection(glob_files("Rigveda/rigveda_mandala_*.json"), fields("mandala", "sukta"),
+                          lambda r: {"text": r["text"]}, by_number),
+    "atharvaveda": Collection(glob_files("AtharvaVeda/atharvaveda_kaanda_*.json"), fields("kaanda", "sukta"),
+                              lambda r: {"text": r["text"], "samhita": r["samhita"]}, by_number),
+    "yajurveda-madhyandina": Collection(glob_files("Yajurveda/vajasneyi_madhyadina_samhita.json"),
+                                        fields(("adhyaya", "chapter")), lambda r: {"text": r["text"]}),
+    "yajurveda-kanva": Collection(glob_files("Yajurveda/vajasneyi_kanva_samhita_chapters.json"),
+                                  fields(("adhyaya", "chapter")), lambda r: {"text": r["text"]}),
+    "mahabharata": Collection(glob_files("Mahabharata/mahabharata_book_*.json"), fields("book", "chapter", "shloka"),
+                              lambda r: {"text": r["text"]}, by_number),
+    "mbh": Collection(critical_edition_files, ce_key, lambda r: {"text": r["text"]}, ce_file_parts),
+    "ramayana": Collection(glob_files("ValmikiRamayana/*.json"), file_prefixed(fields("sarg", "shloka")),
+                           lambda r: {"text": r["text"], "kaanda": r["kaanda"]}, by_number),
+    "manas": Collection(glob_files("Ramcharitmanas/*.json"), file_prefixed(position),
+                        lambda r: {"type": r["type"], "text": r["content"], "kaand": r.get("kaand")}, by_number),
+    "gita": Collection(glob_files("SrimadBhagvadGita/bhagavad_gita_chapter_*.json"), fields("chapter", "verse"),
+                       gita_body, by_number, container="BhagavadGitaChapter"),
+}
+
+
+def collection_files(collection: str) -> list[str]:
+    return COLLECTIONS[collection].files()
+
+
+def load(collection: str, path: str, lo: list[int] | None = None, hi: list[int] | None = None) -> Iterator[tuple]:
+    """Yield (parts, half, body) for one source file, decoding only records within [lo, hi]."""
+    spec = COLLECTIONS[collection]
+    for key, raw in iter_elements(path, spec.container):
+        parts, half = spec.peek(path, key, raw)
+        if in_range(parts, lo, hi):
+            yield parts, half, spec.body(json.loads(raw))
+
+
+def read(collection: str, start: str | None = None, end: str | None = None) -> Iterator[Record]:
+    """Stream every record of a collection, or those between two prefix-inclusive references."""
+    lo = parse_ref(start)[1] if start else None
+    hi = parse_ref(end or start)[1] if start else None
+    spec = COLLECTIONS[collection]
+    for path in spec.files():
+        if spec.file_parts and not in_range(spec.file_parts(path), lo, hi):
+            continue
+        source = os.path.relpath(path, REPO_ROOT)
+        for parts, half, body in load(collection, path, lo, hi):
+            yield Record(format_ref(collection, parts, half), collection, parts, half, source, body)
+
+
+def read_all(collections: list[str] | None = None) -> Iterator[Record]:
+    for collection in collections or COLLECTIONS:
+        yield from read(collection)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream verse records from the corpora")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    read_cmd = sub.add_parser("read", help="Print records as JSON lines")
+    read_cmd.add_argument("start", help="Reference or prefix, e.g. mbh:2.1 or gita:2.47")
+    read_cmd.add_argument("end", nargs="?", help="Inclusive end reference (default: same as start)")
+
+    count = sub.add_parser("count", help="Count records and time the scan")
+    count.add_argument("start", nargs="?")
+    count.add_argument("end", nargs="?")
+    count.add_argument("--all", action="store_true", help="Every collection")
+    args = parser.parse_args()
+
+    if args.command == "read":
+        collection = parse_ref(args.start)[0]
+        for record in read(collection, args.start, args.end):
+            print(json.dumps({"ref": record.ref, **record.body}, ensure_ascii=False))
+        return
+
+    if not args.all and not args.start:
+        parser.error("count needs a reference or --all")
+    t = time.perf_counter()
+    records = read_all() if args.all else read(parse_ref(args.start)[0], args.start, args.end)
+    n = sum(1 for _ in records)
+    print(f"{n} records in {time.perf_counter() - t:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
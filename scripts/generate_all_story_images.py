@@ -5,16 +5,34 @@ Reads each story JSON, crafts a scene-specific prompt per section,
 generates the image, saves it, and updates the story JSON with image references.
 Also updates the Hindi translation JSON if it exists.
 
+stories/image-cache.json records, per image, a hash of (model, aspect ratio,
+full prompt). Only sections whose hash changed or whose PNG is missing are sent
+to Imagen; --invalidate forces specific stories/images and --gc removes PNGs
+that nothing references any more.
+
+Sections are generated on a bounded thread pool (--workers) that shares one
+token-bucket rate limiter (--qps); quota errors slow the shared rate down
+instead of parking each request on a fixed sleep.
+
+Every image job is traced (imagen_metrics.py): time waiting on the limiter,
+in Imagen, in error sleeps and saving, plus attempts, 429s and billed images.
+Spans are appended to build/imagen-trace.jsonl, the last run's totals are
+written to build/imagen-metrics.prom (Prometheus text format), and the run
+ends with a summary of what it actually cost.
+
 Uses gcloud ADC auth (same as TTS/translation scripts).
 """
 
+import hashlib
 import json
 import os
 import sys
 import time
 import argparse
-import vertexai
-from vertexai.preview.vision_models import ImageGenerationModel
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from imagen_metrics import PipelineMetrics, Span
 
 PROJECT_ID = "tts-stories-488001"
 LOCATION = "us-central1"
@@ -23,6 +41,19 @@ REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 EN_DIR = os.path.join(REPO_ROOT, "stories", "en")
 HI_DIR = os.path.join(REPO_ROOT, "stories", "hi")
 IMAGES_DIR = os.path.join(REPO_ROOT, "stories", "images")
+CACHE_PATH = os.path.join(REPO_ROOT, "stories", "image-cache.json")
+TRACE_PATH = os.path.join(REPO_ROOT, "build", "imagen-trace.jsonl")
+METRICS_PATH = os.path.join(REPO_ROOT, "build", "imagen-metrics.prom")
+
+MODEL_ID = "imagen-3.0-generate-002"
+ASPECT_RATIO = "3:4"
+
+# Imagen 3 allows ~20 requests/min per project by default; stay just under it.
+DEFAULT_QPS = 0.3
+DEFAULT_WORKERS = 4
+
+# Imagen 3 list price per generated image (USD).
+PRICE_PER_IMAGE = 0.03
 
 STYLE_PREFIX = (
     "Traditional Indian watercolor storybook illustration for children. "
@@ -211,102 +242,343 @@ STORY_PROMPTS = {
 }
 
 
-def generate_image(model, prompt: str, output_path: str, aspect_ratio: str = "3:4", max_retries: int = 8):
+class RateLimiter:
+    """Thread-safe token bucket shared by all workers.
+
+    Tokens refill at ``rate`` per second up to ``burst``. A quota error halves the
+    rate (down to ``min_rate``) and drains the bucket so every worker pauses, and
+    each success nudges the rate back up towards the configured ceiling. 429s that
+    arrive within one request interval of the last cut are the same quota burst
+    seen by several workers, so they cut the rate only once.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float | None = None):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate or rate / 16
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.last_cut = None
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def throttled(self) -> float:
+        """Back off after a 429; returns the expected pause in seconds."""
+        with self.lock:
+            self._refill()
+            if self.last_cut is None or self.updated - self.last_cut >= 1 / self.rate:
+                self.rate = max(self.min_rate, self.rate / 2)
+                self.last_cut = self.updated
+            # A fixed debt, however many workers report the same burst.
+            self.tokens = min(self.tokens, -1.0)
+            return (1 - self.tokens) / self.rate
+
+    def succeeded(self):
+        with self.lock:
+            self._refill()
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+
+def generate_image(model, prompt: str, output_path: str, aspect_ratio: str = "3:4", max_retries: int = 8,
+                   limiter: RateLimiter | None = None, span: Span | None = None):
     full_prompt = STYLE_PREFIX + prompt
+    span = span or Span()
+    backing_off = False
 
     for attempt in range(max_retries):
+        if limiter:
+            # After a 429 the limiter's bucket is drained, so this wait is the backoff, not ordinary queueing.
+            with span.timed("backoff" if backing_off else "queue"):
+                limiter.acquire()
+            backing_off = False
+        span.attempts += 1
         try:
-            response = model.generate_images(
-                prompt=full_prompt,
-                number_of_images=1,
-                aspect_ratio=aspect_ratio,
-            )
+            with span.timed("model"):
+                response = model.generate_images(
+                    prompt=full_prompt,
+                    number_of_images=1,
+                    aspect_ratio=aspect_ratio,
+                )
             if response.images:
-                response.images[0].save(location=output_path)
+                span.billed += len(response.images)
+                with span.timed("save"):
+                    response.images[0].save(location=output_path)
+                span.bytes = os.path.getsize(output_path)
+                if limiter:
+                    limiter.succeeded()
                 return True
+            span.empty += 1
             print(f"    ⚠️  Empty response, retrying...")
-            time.sleep(30)
+            with span.timed("sleep"):
+                time.sleep(30)
             continue
         except Exception as e:
             err = str(e)
             if "429" in err or "Quota" in err or "Resource exhausted" in err:
-                wait = 45 * (attempt + 1)
-                print(f"    ⏳ Rate limited, waiting {wait}s (attempt {attempt+1}/{max_retries})...")
-                time.sleep(wait)
+                span.throttled += 1
+                if limiter:
+                    wait = limiter.throttled()
+                    backing_off = True
+                    print(f"    ⏳ Rate limited, slowing to {limiter.rate:.2f} req/s, "
+                          f"pausing ~{wait:.0f}s (attempt {attempt+1}/{max_retries})...")
+                else:
+                    wait = 45 * (attempt + 1)
+                    print(f"    ⏳ Rate limited, waiting {wait}s (attempt {attempt+1}/{max_retries})...")
+                    with span.timed("backoff"):
+                        time.sleep(wait)
             else:
+                span.errors += 1
                 print(f"    ⚠️  Error: {err[:120]}, retrying in 30s...")
-                time.sleep(30)
+                with span.timed("sleep"):
+                    time.sleep(30)
     return False
 
 
-def update_story_json(story_id: str, image_ids: list[str]):
-    """Update the story JSON to reference generated images."""
-    en_path = os.path.join(EN_DIR, f"{story_id}.json")
-    if not os.path.exists(en_path):
-        return
+def cache_key(prompt: str, aspect_ratio: str = ASPECT_RATIO, model_id: str = MODEL_ID) -> str:
+    """Content address of a section image: everything that changes what we pay Imagen for."""
+    payload = json.dumps([model_id, aspect_ratio, STYLE_PREFIX + prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_cache() -> dict:
+    if not os.path.exists(CACHE_PATH):
+        return {}
+    with open(CACHE_PATH) as f:
+        return json.load(f).get("images", {})
+
 
-    with open(en_path) as f:
+def save_cache(cache: dict):
+    tmp_path = CACHE_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": 1, "images": dict(sorted(cache.items()))}, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp_path, CACHE_PATH)
+
+
+def cache_entry(key: str, aspect_ratio: str = ASPECT_RATIO) -> dict:
+    return {"key": key, "model": MODEL_ID, "aspectRatio": aspect_ratio}
+
+
+def image_slug(story_id: str) -> str:
+    return story_id.replace("puranic-", "").replace("epic-", "").replace("panchatantra-", "").replace("saint-", "").replace("vedic-", "").replace("wisdom-", "")
+
+
+def story_image_ids(story_id: str) -> list[str]:
+    slug = image_slug(story_id)
+    return [f"{slug}-{i+1:02d}" for i in range(len(STORY_PROMPTS[story_id]))]
+
+
+def set_section_images(path: str, image_ids: list[str]):
+    with open(path) as f:
         story = json.load(f)
 
+    changed = False
     for i, section in enumerate(story["sections"]):
-        if i < len(image_ids):
+        if i < len(image_ids) and section.get("image") != image_ids[i]:
             section["image"] = image_ids[i]
+            changed = True
 
-    with open(en_path, "w") as f:
-        json.dump(story, f, indent=2, ensure_ascii=False)
-        f.write("\n")
+    if changed:
+        with open(path, "w") as f:
+            json.dump(story, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+
+def update_story_json(story_id: str, image_ids: list[str]):
+    """Update the story JSON to reference generated images."""
+    en_path = os.path.join(EN_DIR, f"{story_id}.json")
+    if not os.path.exists(en_path):
+        return
+
+    set_section_images(en_path, image_ids)
 
     hi_path = os.path.join(HI_DIR, f"{story_id}.json")
     if os.path.exists(hi_path):
-        with open(hi_path) as f:
-            hi_story = json.load(f)
-        for i, section in enumerate(hi_story["sections"]):
-            if i < len(image_ids):
-                section["image"] = image_ids[i]
-        with open(hi_path, "w") as f:
-            json.dump(hi_story, f, indent=2, ensure_ascii=False)
-            f.write("\n")
+        set_section_images(hi_path, image_ids)
 
 
-def process_story(model, story_id: str, dry_run: bool = False):
-    if story_id not in STORY_PROMPTS:
-        print(f"  ⚠️  No prompts defined for {story_id}, skipping")
-        return
+def plan_story(story_id: str, cache: dict, dry_run: bool = False):
+    """Return (image_ids, pending jobs) for a story; jobs are (image_id, prompt, output_path, key).
 
-    prompts = STORY_PROMPTS[story_id]
-    image_ids = []
-    slug = story_id.replace("puranic-", "").replace("epic-", "").replace("panchatantra-", "").replace("saint-", "").replace("vedic-", "").replace("wisdom-", "")
+    A section is skipped when its PNG exists and the cache records the same
+    content key. PNGs that predate the cache are adopted as-is.
+    """
+    image_ids = story_image_ids(story_id)
+    jobs = []
 
-    for i, prompt in enumerate(prompts):
-        image_id = f"{slug}-{i+1:02d}"
-        image_ids.append(image_id)
+    for image_id, prompt in zip(image_ids, STORY_PROMPTS[story_id]):
         output_path = os.path.join(IMAGES_DIR, f"{image_id}.png")
+        key = cache_key(prompt)
+        exists = os.path.exists(output_path)
+
+        if exists and image_id not in cache:
+            cache[image_id] = cache_entry(key)
 
-        if os.path.exists(output_path):
-            print(f"  ✓ {image_id}.png already exists, skipping")
+        if exists and cache[image_id]["key"] == key:
             continue
 
         if dry_run:
-            print(f"  [DRY RUN] Would generate {image_id}.png")
-            continue
+            print(f"  [DRY RUN] Would generate {image_id}.png ({'stale' if exists else 'missing'})")
 
-        print(f"  Generating {image_id}.png ...")
-        try:
-            success = generate_image(model, prompt, output_path)
-            if success:
-                print(f"  ✓ Saved {image_id}.png")
+        jobs.append((image_id, prompt, output_path, key))
+
+    return image_ids, jobs
+
+
+def invalidate(cache: dict, targets: list[str]):
+    """Mark cache entries stale so the next run regenerates them.
+
+    Each target is a story ID (all of its sections) or a single image ID.
+    """
+    for target in targets:
+        ids = story_image_ids(target) if target in STORY_PROMPTS else [target]
+        for image_id in ids:
+            if os.path.exists(os.path.join(IMAGES_DIR, f"{image_id}.png")):
+                cache[image_id] = {**cache.get(image_id, {}), "key": None}
+                print(f"  ↻ Invalidated {image_id}")
             else:
-                print(f"  ✗ No image returned for {image_id}")
-        except Exception as e:
-            print(f"  ✗ Error generating {image_id}: {e}")
-            time.sleep(2)
+                print(f"  ⚠️  {image_id}.png does not exist, nothing to invalidate")
+
+
+def collect_garbage(cache: dict, dry_run: bool = False):
+    """Delete PNGs (and cache entries) that no prompt or story JSON refers to."""
+    referenced = set()
+    for sid in STORY_PROMPTS:
+        referenced.update(story_image_ids(sid))
+    for story_dir in (EN_DIR, HI_DIR):
+        for name in os.listdir(story_dir):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(story_dir, name)) as f:
+                story = json.load(f)
+            referenced.update(s["image"] for s in story.get("sections", []) if s.get("image"))
+
+    removed = 0
+    for name in sorted(os.listdir(IMAGES_DIR)):
+        image_id, ext = os.path.splitext(name)
+        if ext != ".png" or image_id in referenced:
             continue
+        if dry_run:
+            print(f"  [DRY RUN] Would delete orphaned {name}")
+        else:
+            os.remove(os.path.join(IMAGES_DIR, name))
+            print(f"  🗑  Deleted orphaned {name}")
+        removed += 1
+
+    for image_id in list(cache):
+        if image_id not in referenced and not dry_run:
+            del cache[image_id]
+
+    print(f"\n{removed} orphaned image(s) {'found' if dry_run else 'removed'}")
+
+
+def run_job(model, limiter: RateLimiter, metrics: PipelineMetrics, story_id: str, image_id: str, prompt: str,
+            output_path: str) -> bool:
+    print(f"  Generating {image_id}.png ...")
+    span = metrics.span(story_id, image_id)
+    success = False
+    try:
+        success = generate_image(model, prompt, output_path, aspect_ratio=ASPECT_RATIO, limiter=limiter, span=span)
+        if success:
+            print(f"  ✓ Saved {image_id}.png")
+        else:
+            print(f"  ✗ No image returned for {image_id}")
+    except Exception as e:
+        print(f"  ✗ Error generating {image_id}: {e}")
+    metrics.finish(span, success)
+    return success
+
+
+def load_model():
+    # Imported here so the prompts and cache helpers can be used without the Vertex AI SDK.
+    import vertexai
+    from vertexai.preview.vision_models import ImageGenerationModel
 
-        time.sleep(0.5)
+    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    return ImageGenerationModel.from_pretrained(MODEL_ID)
+
+
+def process_stories(model, story_ids: list[str], dry_run: bool = False, workers: int = DEFAULT_WORKERS,
+                    qps: float = DEFAULT_QPS, metrics: PipelineMetrics | None = None):
+    """Generate every stale or missing section image across ``story_ids`` on a bounded worker pool.
+
+    All workers draw from one RateLimiter, so throughput tracks the quota rather
+    than the number of threads. A story's JSON is updated once its last pending
+    image has finished, and the cache manifest after every saved image. ``model``
+    may be None, in which case it is only loaded if something needs generating.
+    Without ``metrics`` the run's metrics are only printed, not written.
+    """
+    cache = load_cache()
+    limiter = RateLimiter(qps, burst=workers)
+    pending = {}
+    image_ids = {}
+    jobs = []
+
+    for sid in story_ids:
+        if sid not in STORY_PROMPTS:
+            print(f"  ⚠️  No prompts defined for {sid}, skipping")
+            continue
+        image_ids[sid], story_jobs = plan_story(sid, cache, dry_run=dry_run)
+        pending[sid] = len(story_jobs)
+        jobs.extend((sid, job) for job in story_jobs)
 
-    if not dry_run:
-        update_story_json(story_id, image_ids)
-        print(f"  ✓ Updated {story_id} JSON with image references")
+    if dry_run:
+        print(f"\n{len(jobs)} image(s) to generate")
+        return
+
+    up_to_date = sum(len(ids) for ids in image_ids.values()) - len(jobs)
+    print(f"{up_to_date} image(s) up to date, {len(jobs)} to generate")
+    save_cache(cache)
+
+    for sid, count in pending.items():
+        if count == 0:
+            update_story_json(sid, image_ids[sid])
+
+    if not jobs:
+        return
+
+    if model is None:
+        model = load_model()
+
+    metrics = metrics or PipelineMetrics(price_per_image=PRICE_PER_IMAGE)
+    metrics.start_run(workers=workers, qps=qps, jobs=len(jobs), model=MODEL_ID)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for sid, (image_id, prompt, output_path, key) in jobs:
+            future = pool.submit(run_job, model, limiter, metrics, sid, image_id, prompt, output_path)
+            futures[future] = (sid, image_id, key)
+
+        for future in as_completed(futures):
+            sid, image_id, key = futures[future]
+            if future.result():
+                cache[image_id] = cache_entry(key)
+                save_cache(cache)
+            pending[sid] -= 1
+            if pending[sid] == 0:
+                update_story_json(sid, image_ids[sid])
+                print(f"  ✓ Updated {sid} JSON with image references")
+
+    metrics.end_run(finalRate=round(limiter.rate, 4))
+
+
+def process_story(model, story_id: str, dry_run: bool = False):
+    process_stories(model, [story_id], dry_run=dry_run, workers=1)
 
 
 def main():
@@ -314,7 +586,17 @@ def main():
     parser.add_argument("--story", help="Process a single story ID")
     parser.add_argument("--dry-run", action="store_true", help="Show what would be generated without actually generating")
     parser.add_argument("--list", action="store_true", help="List all stories that need images")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help=f"Concurrent Imagen requests (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--qps", type=float, default=DEFAULT_QPS, help=f"Request rate ceiling per second, shared by all workers (default: {DEFAULT_QPS})")
+    parser.add_argument("--invalidate", nargs="+", metavar="ID", help="Force regeneration of these story or image IDs on the next run")
+    parser.add_argument("--gc", action="store_true", help="Delete images no prompt or story references")
+    parser.add_argument("--trace", default=TRACE_PATH, help="Append per-call spans to this JSONL file")
+    parser.add_argument("--metrics", default=METRICS_PATH, help="Write the run's metrics here in Prometheus text format")
     args = parser.parse_args()
+    if args.workers <= 0:
+        parser.error("--workers must be at least 1")
+    if args.qps <= 0:
+        parser.error("--qps must be greater than 0")
 
     if args.list:
         for sid in sorted(STORY_PROMPTS.keys()):
@@ -328,28 +610,32 @@ def main():
             status = "HAS IMAGES" if has_images else "needs images"
             print(f"  {sid}: {count} prompts ({status})")
         total = sum(len(v) for v in STORY_PROMPTS.values())
-        print(f"\nTotal: {len(STORY_PROMPTS)} stories, {total} images (~${total * 0.03:.2f})")
+        print(f"\nTotal: {len(STORY_PROMPTS)} stories, {total} images (~${total * PRICE_PER_IMAGE:.2f})")
         return
 
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
-    model = ImageGenerationModel.from_pretrained("imagen-3.0-generate-002")
+    if args.invalidate or args.gc:
+        cache = load_cache()
+        if args.invalidate:
+            invalidate(cache, args.invalidate)
+        if args.gc:
+            collect_garbage(cache, dry_run=args.dry_run)
+        if not args.dry_run:
+            save_cache(cache)
+        return
 
     os.makedirs(IMAGES_DIR, exist_ok=True)
 
     if args.story:
         print(f"Processing: {args.story}")
-        process_story(model, args.story, dry_run=args.dry_run)
+        stories = [args.story]
     else:
         stories = sorted(STORY_PROMPTS.keys())
         total = sum(len(STORY_PROMPTS[s]) for s in stories)
-        print(f"Generating images for {len(stories)} stories ({total} images)")
-        print(f"Estimated cost: ~${total * 0.03:.2f}\n")
-
-        for sid in stories:
-            print(f"\n{'='*60}")
-            print(f"Story: {sid} ({len(STORY_PROMPTS[sid])} sections)")
-            print(f"{'='*60}")
-            process_story(model, sid, dry_run=args.dry_run)
+        print(f"Checking {len(stories)} stories ({total} images)")
+        print(f"Workers: {args.workers}, rate ceiling: {args.qps} req/s\n")
+
+    metrics = PipelineMetrics(args.trace, args.metrics, price_per_image=PRICE_PER_IMAGE)
+    process_stories(None, stories, dry_run=args.dry_run, workers=args.workers, qps=args.qps, metrics=metrics)
 
     print("\nDone!")
 
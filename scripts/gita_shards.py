@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""Split the Bhagavad Gita into a slim verse core plus per-author shards.
+
+Every verse in SrimadBhagvadGita/bhagavad_gita_chapter_*.json embeds ~20
+commentaries and ~8 translations, so reading one verse with one commentary
+means downloading and parsing the whole 1-2 MB chapter. This writes:
+
+    core/chapter_N.jsonl                    {"chapter", "verse", "text"} per line
+    commentaries/<author>/chapter_N.jsonl   {"verse", "text"} per line
+    translations/<author>/chapter_N.jsonl
+    chapter_N.index.json                    verse list, and per shard the byte
+                                            offset where each verse's line starts
+    index.json                              author names and chapter list
+
+A reader fetches index.json once, a chapter index per chapter it touches, and
+then only the lines it needs: from disk through mmap, or over HTTP with Range
+requests.
+
+    python3 scripts/gita_shards.py build [--out DIR]
+    python3 scripts/gita_shards.py get 2.47 --commentary sri-shankaracharya
+
+From Python:
+
+    gita = GitaShards("build/gita")          # or an https:// base URL
+    gita.verse(2, 47, commentaries=["swami-ramsukhdas"], translations=["swami-sivananda"])
+"""
+
+import argparse
+import glob
+import json
+import mmap
+import os
+import re
+import sys
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GITA_DIR = os.path.join(REPO_ROOT, "SrimadBhagvadGita")
+DEFAULT_OUT = os.path.join(REPO_ROOT, "build", "gita")
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def write_shard(out_dir: str, rel_path: str, verses: list[int], lines: dict[int, dict]) -> dict:
+    """Write one JSONL shard in `verses` order.
+
+    Returns {"path", "bytes", "starts"}, where starts[i] is the byte offset of
+    verses[i]'s line (None if this shard has nothing for that verse).
+    """
+    path = os.path.join(out_dir, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    starts = []
+    pos = 0
+    with open(path, "wb") as f:
+        for verse in verses:
+            if verse not in lines:
+                starts.append(None)
+                continue
+            line = json.dumps(lines[verse], ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+            f.write(line)
+            starts.append(pos)
+            pos += len(line)
+    return {"path": rel_path, "bytes": pos, "starts": starts}
+
+
+def span(shard: dict, i: int) -> tuple[int, int] | None:
+    """(start, length) of the i-th verse's line in a shard."""
+    start = shard["starts"][i]
+    if start is None:
+        return None
+    end = next((s for s in shard["starts"][i + 1:] if s is not None), shard["bytes"])
+    return start, end - start
+
+
+def build_shards(out_dir: str = DEFAULT_OUT):
+    index = {"version": 2, "commentaries": {}, "translations": {}, "chapters": []}
+    source_bytes = index_bytes = core_bytes = 0
+
+    files = sorted(glob.glob(os.path.join(GITA_DIR, "bhagavad_gita_chapter_*.json")),
+                   key=lambda p: int(re.search(r"(\d+)\.json$", p).group(1)))
+    for path in files:
+        source_bytes += os.path.getsize(path)
+        with open(path, encoding="utf-8") as f:
+            verses = json.load(f)["BhagavadGitaChapter"]
+        chapter = verses[0]["chapter"]
+        order = [v["verse"] for v in verses]
+
+        core = {v["verse"]: {"chapter": chapter, "verse": v["verse"], "text": v["text"]} for v in verses}
+        shards = {"core": write_shard(out_dir, f"core/chapter_{chapter}.jsonl", order, core)}
+
+        for kind in ("commentaries", "translations"):
+            per_author = {}
+            for v in verses:
+                for author, text in (v.get(kind) or {}).items():
+                    slug = slugify(author)
+                    index[kind].setdefault(slug, author)
+                    per_author.setdefault(slug, {})[v["verse"]] = {"verse": v["verse"], "text": text}
+            for slug, lines in sorted(per_author.items()):
+                shards[f"{kind}/{slug}"] = write_shard(out_dir, f"{kind}/{slug}/chapter_{chapter}.jsonl", order, lines)
+
+        chapter_index = os.path.join(out_dir, f"chapter_{chapter}.index.json")
+        with open(chapter_index, "w", encoding="utf-8") as f:
+            json.dump({"chapter": chapter, "verses": order, "shards": shards}, f, separators=(",", ":"))
+            f.write("\n")
+        index["chapters"].append(chapter)
+        index_bytes += os.path.getsize(chapter_index)
+        core_bytes += shards["core"]["bytes"]
+        print(f"  ✓ chapter {chapter}: {len(verses)} verses, core {shards['core']['bytes'] / 1024:.0f} KB, "
+              f"index {os.path.getsize(chapter_index) / 1024:.0f} KB (source {os.path.getsize(path) / 1024:.0f} KB)")
+
+    with open(os.path.join(out_dir, "index.json"), "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+    print(f"\nSource {source_bytes / 1e6:.1f} MB → core {core_bytes / 1e6:.2f} MB + chapter indexes "
+          f"{index_bytes / 1e3:.0f} KB ({len(index['commentaries'])} commentaries, "
+          f"{len(index['translations'])} translations) in {out_dir}")
+
+
+class GitaShards:
+    """Lazy reader over a shard directory or base URL; only requested lines are read."""
+
+    def __init__(self, base: str = DEFAULT_OUT):
+        self.base = base.rstrip("/")
+        self.remote = self.base.startswith(("http://", "https://"))
+        self.index = json.loads(self._read("index.json"))
+        self._chapters = {}
+        self._maps = {}
+
+    def close(self):
+        for f, m in self._maps.values():
+            m.close()
+            f.close()
+        self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read(self, rel_path: str, start: int | None = None, length: int | None = None) -> bytes:
+        if self.remote:
+            request = urllib.request.Request(f"{self.base}/{rel_path}")
+            if start is not None:
+                request.add_header("Range", f"bytes={start}-{start + length - 1}")
+            with urllib.request.urlopen(request) as response:
+                data = response.read()
+                # A server that ignores Range sends the whole file.
+                if start is not None and response.status == 200:
+                    data = data[start:start + length]
+                return data
+        path = os.path.join(self.base, rel_path)
+        if start is None:
+            with open(path, "rb") as f:
+                return f.read()
+        if rel_path not in self._maps:
+            f = open(path, "rb")
+            self._maps[rel_path] = (f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        return self._maps[rel_path][1][start:start + length]
+
+    def _chapter(self, chapter: int) -> dict:
+        if chapter not in self._chapters:
+            if chapter not in self.index["chapters"]:
+                raise KeyError(f"Chapter {chapter} is not in the shard index")
+            self._chapters[chapter] = json.loads(self._read(f"chapter_{chapter}.index.json"))
+        return self._chapters[chapter]
+
+    def _line(self, entry: dict, shard_key: str, verse: int) -> dict | None:
+        shard = entry["shards"].get(shard_key)
+        if shard is None or verse not in entry["verses"]:
+            return None
+        where = span(shard, entry["verses"].index(verse))
+        return json.loads(self._read(shard["path"], *where)) if where else None
+
+    def _lines(self, shard: dict) -> dict[int, dict]:
+        """All lines of one shard in a single read (used for whole chapters)."""
+        records = (json.loads(line) for line in self._read(shard["path"]).splitlines() if line)
+        return {r["verse"]: r for r in records}
+
+    @property
+    def commentaries(self) -> dict[str, str]:
+        return self.index["commentaries"]
+
+    @property
+    def translations(self) -> dict[str, str]:
+        return self.index["translations"]
+
+    def verse(self, chapter: int, verse: int, commentaries=(), translations=()) -> dict:
+        entry = self._chapter(chapter)
+        record = self._line(entry, "core", verse)
+        if record is None:
+            raise KeyError(f"Verse {chapter}.{verse} not found")
+        for kind, slugs in (("commentaries", commentaries), ("translations", translations)):
+            if not slugs:
+                continue
+            record[kind] = {}
+            for slug in slugs:
+                line = self._line(entry, f"{kind}/{slug}", verse)
+                if line is not None:
+                    record[kind][self.index[kind][slug]] = line["text"]
+        return record
+
+    def chapter(self, chapter: int, commentaries=(), translations=()) -> list[dict]:
+        entry = self._chapter(chapter)
+        records = self._lines(entry["shards"]["core"])
+        for kind, slugs in (("commentaries", commentaries), ("translations", translations)):
+            for slug in slugs:
+                shard = entry["shards"].get(f"{kind}/{slug}")
+                if shard is None:
+                    continue
+                for verse, line in self._lines(shard).items():
+                    records[verse].setdefault(kind, {})[self.index[kind][slug]] = line["text"]
+        return [records[v] for v in sorted(records)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shard the Bhagavad Gita by commentator/translator")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Write core/commentary/translation shards and index.json")
+    build.add_argument("--out", default=DEFAULT_OUT, help=f"Output directory (default: {os.path.relpath(DEFAULT_OUT, REPO_ROOT)})")
+
+    get = sub.add_parser("get", help="Print one verse (CHAPTER.VERSE) or chapter (CHAPTER)")
+    get.add_argument("ref")
+    get.add_argument("--base", default=DEFAULT_OUT, help="Shard directory or base URL")
+    get.add_argument("--commentary", nargs="+", default=[], metavar="SLUG")
+    get.add_argument("--translation", nargs="+", default=[], metavar="SLUG")
+
+    sub.add_parser("authors", help="List commentary/translation slugs").add_argument("--base", default=DEFAULT_OUT)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_shards(args.out)
+        return
+
+    with GitaShards(args.base) as gita:
+        if args.command == "authors":
+            json.dump({"commentaries": gita.commentaries, "translations": gita.translations},
+                      sys.stdout, ensure_ascii=False, indent=2)
+            print()
+            return
+        chapter, _, verse = args.ref.partition(".")
+        if verse:
+            result = gita.verse(int(chapter), int(verse), args.commentary, args.translation)
+        else:
+            result = gita.chapter(int(chapter), args.commentary, args.translation)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
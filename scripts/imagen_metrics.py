@@ -0,0 +1,221 @@
+"""Spans, aggregates and exports for generate_all_story_images.py runs.
+
+Every image job gets a Span. generate_image() times each phase of the job
+(waiting for the rate limiter, backing off after a 429, the Imagen call, fixed
+error sleeps, the PNG save) and counts attempts, 429s, other errors and empty responses. When a job
+ends, its span is appended to a JSONL trace and folded into per-story and
+per-run aggregates. At the end of the run the trace gets a summary record,
+a Prometheus text file is written (for node_exporter's textfile collector),
+and a summary with the images actually billed is printed.
+
+Trace records, one JSON object per line, all tagged with the run's start time as `run`:
+
+    {"type": "run", "run": ..., "workers": 4, "qps": 0.3, "jobs": 12}
+    {"type": "call", "run": ..., "story": ..., "image": ..., "ok": true, "attempts": 2, "throttled": 1,
+     "errors": 0, "empty": 0, "billed": 1, "bytes": 1534201, "seconds": {"queue": 3.3, "backoff": 12.0, ...},
+     "modelLatencies": [0.4, 7.5]}
+    {"type": "summary", "run": ..., "totals": {...}, "stories": {...}}
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PHASES = ("queue", "backoff", "model", "sleep", "save")
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile; 0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q * len(ordered) + 0.5) - 1))]
+
+
+class Span:
+    """What one image job cost: time per phase, attempts and outcomes."""
+
+    def __init__(self, story: str = "", image: str = ""):
+        self.story = story
+        self.image = image
+        self.started = time.time()
+        self.ended = None
+        self.ok = False
+        self.attempts = 0
+        self.throttled = 0      # 429 / quota responses
+        self.errors = 0         # any other exception from the API
+        self.empty = 0          # responses without an image
+        self.billed = 0         # images Imagen returned (and charges for)
+        self.bytes = 0
+        self.phases = {phase: [] for phase in PHASES}
+
+    @contextmanager
+    def timed(self, phase: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[phase].append(time.perf_counter() - start)
+
+    def seconds(self, phase: str) -> float:
+        return sum(self.phases[phase], 0.0)
+
+    def record(self) -> dict:
+        return {
+            "story": self.story,
+            "image": self.image,
+            "ok": self.ok,
+            "start": round(self.started, 3),
+            "wallS": round(self.ended - self.started, 3),
+            "attempts": self.attempts,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "empty": self.empty,
+            "billed": self.billed,
+            "bytes": self.bytes,
+            "seconds": {phase: round(self.seconds(phase), 3) for phase in PHASES},
+            "modelLatencies": [round(s, 3) for s in self.phases["model"]],
+        }
+
+
+def empty_totals() -> dict:
+    return {"images": 0, "failed": 0, "attempts": 0, "throttled": 0, "errors": 0, "empty": 0, "billed": 0,
+            "bytes": 0, "seconds": {phase: 0.0 for phase in PHASES}}
+
+
+def add(totals: dict, span: Span):
+    totals["images" if span.ok else "failed"] += 1
+    for field in ("attempts", "throttled", "errors", "empty", "billed", "bytes"):
+        totals[field] += getattr(span, field)
+    for phase in PHASES:
+        totals["seconds"][phase] += span.seconds(phase)
+
+
+class PipelineMetrics:
+    """Collects spans from the worker threads and writes the trace, metrics file and summary.
+
+    Both paths are optional; without them the metrics are only kept in memory and printed.
+    """
+
+    def __init__(self, trace_path: str | None = None, prom_path: str | None = None, price_per_image: float = 0.0):
+        self.trace_path = trace_path
+        self.prom_path = prom_path
+        self.price_per_image = price_per_image
+        self.lock = threading.Lock()
+        self.trace = None
+        self.run = None
+        self.config = {}
+        self.totals = empty_totals()
+        self.stories = {}
+        self.story_spans = {}
+        self.latencies = []
+
+    def _write(self, kind: str, record: dict):
+        if self.trace:
+            self.trace.write(json.dumps({"type": kind, "run": self.run, **record}, ensure_ascii=False) + "\n")
+            self.trace.flush()
+
+    def start_run(self, **config):
+        self.run = time.time()
+        self.config = config
+        if self.trace_path:
+            os.makedirs(os.path.dirname(self.trace_path) or ".", exist_ok=True)
+            self.trace = open(self.trace_path, "a")
+        self._write("run", config)
+
+    def span(self, story: str, image: str) -> Span:
+        return Span(story, image)
+
+    def finish(self, span: Span, ok: bool):
+        span.ok = ok
+        span.ended = time.time()
+        with self.lock:
+            add(self.totals, span)
+            add(self.stories.setdefault(span.story, empty_totals()), span)
+            first, last = self.story_spans.get(span.story, (span.started, span.ended))
+            self.story_spans[span.story] = (min(first, span.started), max(last, span.ended))
+            self.latencies.extend(span.phases["model"])
+            self._write("call", span.record())
+
+    def end_run(self, **final):
+        wall = time.time() - self.run
+        for story, (first, last) in self.story_spans.items():
+            self.stories[story]["wallS"] = round(last - first, 3)
+        for totals in (self.totals, *self.stories.values()):
+            totals["seconds"] = {phase: round(seconds, 3) for phase, seconds in totals["seconds"].items()}
+        self.totals["wallS"] = round(wall, 3)
+        self.totals["cost"] = round(self.totals["billed"] * self.price_per_image, 2)
+        self.totals["modelLatency"] = {"p50": round(percentile(self.latencies, 0.5), 3),
+                                       "p95": round(percentile(self.latencies, 0.95), 3)}
+        self.totals.update(final)
+        self._write("summary", {"totals": self.totals, "stories": self.stories})
+        if self.trace:
+            self.trace.close()
+            self.trace = None
+        if self.prom_path:
+            self.write_prometheus(self.prom_path)
+        self.print_summary()
+
+    # --- Exports ------------------------------------------------------------------
+
+    def prometheus(self) -> str:
+        t = self.totals
+        lines = []
+
+        # Every value describes the last run (the file is rewritten each time), so they are all gauges.
+        def metric(name: str, kind: str, help_text: str, samples: list[tuple[str, float]]):
+            lines.append(f"# HELP imagen_{name} {help_text}")
+            lines.append(f"# TYPE imagen_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"imagen_{name}{labels} {value}")
+
+        metric("jobs", "gauge", "Image jobs finished in the last run, by result.",
+               [('{result="ok"}', t["images"]), ('{result="failed"}', t["failed"])])
+        metric("attempts", "gauge", "Imagen API calls made, including retries.", [("", t["attempts"])])
+        metric("throttled", "gauge", "Calls rejected with 429 / quota exhausted.", [("", t["throttled"])])
+        metric("errors", "gauge", "Calls that failed with any other error.", [("", t["errors"])])
+        metric("empty_responses", "gauge", "Calls that returned no image.", [("", t["empty"])])
+        metric("billed_images", "gauge", "Images returned by Imagen, i.e. billed.", [("", t["billed"])])
+        metric("cost_usd", "gauge", "Billed images times the per-image price.", [("", t["cost"])])
+        metric("bytes_written", "gauge", "PNG bytes saved.", [("", t["bytes"])])
+        metric("phase_seconds", "gauge", "Worker time per phase, summed over jobs.",
+               [(f'{{phase="{phase}"}}', round(t["seconds"][phase], 3)) for phase in PHASES])
+        metric("model_latency_seconds", "summary", "Latency of individual Imagen calls.",
+               [('{quantile="0.5"}', t["modelLatency"]["p50"]), ('{quantile="0.95"}', t["modelLatency"]["p95"])])
+        lines.append(f"imagen_model_latency_seconds_sum {sum(self.latencies):.3f}")
+        lines.append(f"imagen_model_latency_seconds_count {len(self.latencies)}")
+        metric("run_duration_seconds", "gauge", "Wall time of the last run.", [("", t["wallS"])])
+        metric("run_timestamp_seconds", "gauge", "When the last run started.", [("", round(self.run))])
+        metric("workers", "gauge", "Worker threads.", [("", self.config.get("workers", 0))])
+        metric("qps_limit", "gauge", "Configured request rate ceiling.", [("", self.config.get("qps", 0))])
+        metric("rate_final", "gauge", "Limiter rate at the end of the run, after any 429 backoff.",
+               [("", t.get("finalRate", 0))])
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+    def print_summary(self):
+        t = self.totals
+        jobs = t["images"] + t["failed"]
+        wall = t["wallS"]
+        rate = t["images"] / wall * 60 if wall else 0
+        worker_time = sum(t["seconds"].values()) or 1
+        print(f"\nImagen run: {t['images']} saved, {t['failed']} failed in {wall:.1f}s ({rate:.1f} images/min)")
+        print(f"  Billed images: {t['billed']} (~${t['cost']:.2f}), {t['attempts']} calls for {jobs} job(s): "
+              f"{t['throttled']} rate limited, {t['errors']} errors, {t['empty']} empty")
+        print(f"  Imagen latency: p50 {t['modelLatency']['p50']:.1f}s, p95 {t['modelLatency']['p95']:.1f}s")
+        print("  Worker time: " + ", ".join(f"{phase} {t['seconds'][phase]:.1f}s ({t['seconds'][phase] / worker_time:.0%})"
+                                             for phase in PHASES))
+        slow = sorted(self.stories.items(), key=lambda item: -item[1]["seconds"]["model"])[:3]
+        if len(self.stories) > 1:
+            print("  Slowest stories: " + ", ".join(f"{story} {s['seconds']['model']:.1f}s" for story, s in slow))
+        written = [p for p in (self.trace_path, self.prom_path) if p]
+        if written:
+            print(f"  Metrics: {', '.join(os.path.relpath(p) for p in written)}")
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Load-test read_server.py: many keep-alive connections replaying a mix of requests.
+
+Each connection sends one request at a time, chosen at random from the path
+list, for --duration seconds. The summary gives requests per second, latency
+percentiles and status counts, and is also written to build/load-test.json.
+Before the timed part, every path is requested once. This warms the server's
+cache (the numbers are for a warm cache), gets each path's ETag for
+--revalidate, and drops paths that don't return 200.
+
+    python3 scripts/load_test.py                                    # starts a server on a free port
+    python3 scripts/load_test.py --url http://127.0.0.1:8080 --connections 256 --duration 30
+    python3 scripts/load_test.py --gzip --revalidate 0.5            # half the requests are conditional
+    python3 scripts/load_test.py --paths paths.txt                  # one request path per line
+
+The client runs in the same single process as its event loop, so on a small
+machine it competes with the server for CPU. Run it from another box to
+measure the server alone.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, "build", "load-test.json")
+
+
+def default_paths() -> list[str]:
+    month = datetime.date.today().strftime("%Y-%m")
+    return [
+        "/verses/gita/2.47",
+        "/verses/gita/2.1/2.20",
+        "/verses/gita/12.13/12.14",
+        "/verses/rigveda/1.1",
+        "/verses/rigveda/10.129",
+        "/verses/atharvaveda/1.1",
+        "/verses/mbh/5.1.1/5.1.20",
+        "/verses/mahabharata/3.1.1/3.1.10",
+        "/verses/ramayana/5.1/5.2?limit=50",
+        "/verses/manas/1.1/1.20",
+        "/lyrics",
+        "/lyrics/gayatri-mantra",
+        "/lyrics/shiva-tandava-stotram",
+        f"/calendar/default/{month}",
+        f"/calendar/newyork/{month}",
+        "/files/app-config.json",
+        "/files/stories/catalog.json",
+    ]
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Connection:
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def request(self, raw: bytes) -> tuple[int, int]:
+        """Send one request; returns (status, body bytes). Reconnects if the server closed the connection."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(raw)
+        status_line = await self.reader.readline()
+        if not status_line:
+            self.close()
+            raise ConnectionError("server closed the connection")
+        status = int(status_line.split()[1])
+        length, close = 0, False
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"connection":
+                close = value.strip().lower() == b"close"
+        if length:
+            await self.reader.readexactly(length)
+        if close:
+            self.close()
+        return status, length
+
+    def close(self):
+        if self.writer:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def build_request(host: str, path: str, gzip: bool, etag: str | None = None) -> bytes:
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}"]
+    if gzip:
+        lines.append("Accept-Encoding: gzip")
+    if etag:
+        lines.append(f"If-None-Match: {etag}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def warm_up(base: str, paths: list[str], gzip: bool) -> dict[str, str]:
+    """Request every path once; returns path -> ETag for the ones that answered 200."""
+    etags = {}
+    for path in paths:
+        request = urllib.request.Request(base + path, headers={"Accept-Encoding": "gzip"} if gzip else {})
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+                etags[path] = response.headers.get("ETag")
+        except OSError as e:
+            print(f"  ⚠️  {path}: {e}, leaving it out")
+    return etags
+
+
+async def run(host: str, port: int, requests: dict[str, tuple[bytes, bytes]], connections: int, duration: float,
+              revalidate: float, seed: int) -> dict:
+    paths = sorted(requests)
+    latencies = {path: [] for path in paths}
+    statuses, totals = {}, {"bytes": 0, "errors": 0}
+    deadline = time.perf_counter() + duration
+
+    async def worker(n: int):
+        rng = random.Random(seed + n)
+        conn = Connection(host, port)
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            plain, conditional = requests[path]
+            started = time.perf_counter()
+            try:
+                status, size = await conn.request(conditional if rng.random() < revalidate else plain)
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                totals["errors"] += 1
+                conn.close()
+                continue
+            latencies[path].append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            totals["bytes"] += size
+        conn.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    every = [s for samples in latencies.values() for s in samples]
+    return {
+        "connections": connections,
+        "durationS": round(elapsed, 2),
+        "requests": len(every),
+        "rps": round(len(every) / elapsed, 1),
+        "errors": totals["errors"],
+        "bytesPerS": round(totals["bytes"] / elapsed),
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "latencyMs": {name: round(percentile(every, q) * 1000, 2)
+                      for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))},
+        "paths": {path: {"requests": len(samples), "p50Ms": round(percentile(samples, 0.5) * 1000, 2)}
+                  for path, samples in latencies.items()},
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, cache_mb: int) -> subprocess.Popen:
+    server = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "scripts", "read_server.py"),
+                               "--port", str(port), "--cache-mb", str(cache_mb)], stdout=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit("✗ read_server.py did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test read_server.py")
+    parser.add_argument("--url", help="Server to test (default: start read_server.py on a free port)")
+    parser.add_argument("--connections", type=int, default=64, help="Concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to run")
+    parser.add_argument("--paths", help="File with one request path per line (default: a built-in mix)")
+    parser.add_argument("--gzip", action="store_true", help="Send Accept-Encoding: gzip")
+    parser.add_argument("--revalidate", type=float, default=0.0, help="Share of requests sent with If-None-Match")
+    parser.add_argument("--cache-mb", type=int, default=256, help="Cache size for the server this starts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        base = args.url.rstrip("/")
+    else:
+        port = free_port()
+        server = start_server(port, args.cache_mb)
+        base = f"http://127.0.0.1:{port}"
+    url = urlsplit(base)
+    host, port = url.hostname, url.port or 80
+
+    if args.paths:
+        with open(args.paths) as f:
+            paths = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    else:
+        paths = default_paths()
+
+    try:
+        print(f"Warming {len(paths)} paths on {base} ...")
+        etags = warm_up(base, paths, args.gzip)
+        if not etags:
+            raise SystemExit("✗ No path answered 200")
+        requests = {path: (build_request(url.netloc, path, args.gzip), build_request(url.netloc, path, args.gzip, etag))
+                    for path, etag in etags.items()}
+        mode = (", gzip" if args.gzip else "") + (f", {args.revalidate:.0%} conditional" if args.revalidate else "")
+        print(f"{args.connections} connections for {args.duration:g}s{mode}")
+        results = asyncio.run(run(host, port, requests, args.connections, args.duration, args.revalidate, args.seed))
+        with urllib.request.urlopen(base + "/stats") as response:
+            results["server"] = json.load(response)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    results.update({"url": base, "gzip": args.gzip, "revalidate": args.revalidate})
+    lat = results["latencyMs"]
+    print(f"\n{results['requests']} requests in {results['durationS']}s: {results['rps']:.0f} req/s, "
+          f"{results['bytesPerS'] / 1e6:.1f} MB/s")
+    print(f"Latency: p50 {lat['p50']} ms, p95 {lat['p95']} ms, p99 {lat['p99']} ms, max {lat['max']} ms")
+    statuses = [f"{k}: {v}" for k, v in results["statuses"].items()]
+    if results["errors"]:
+        statuses.append(f"errors: {results['errors']}")
+    print(f"Statuses: {', '.join(statuses)}")
+    cache = results["server"]["cache"]
+    print(f"Server cache: {cache['entries']} entries, {cache['bytes'] / 1e6:.1f} MB, "
+          f"{cache['hits']} hits / {cache['misses']} misses, {cache['evictions']} evictions")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+        f.write("\n")
+    print(f"\n✓ Results written to {os.path.relpath(args.output)}")
+    if results["errors"] or any(not k.startswith(("2", "3")) for k in results["statuses"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""Fetch served JSON through its pre-compressed siblings (see compress_payloads.py).
+
+Has no dependencies on the rest of the repo, so clients and tools can copy it as is.
+brotli and zstandard are optional: without them the decoder falls back to .gz.
+
+    client = PayloadClient("https://raw.githubusercontent.com/jyoti0512shukla/DharmicData/main")
+    story = client.get_json("stories/en/vedic-agni-hymn.json")
+
+    python3 scripts/payload_decoder.py stories/en/vedic-agni-hymn.json          # from this checkout
+    python3 scripts/payload_decoder.py --base https://… lyrics/hanuman-chalisa.json
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import urllib.request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INDEX = "compression/index.json"
+
+
+def supported_encodings() -> list[str]:
+    """Encodings this process can decode, smallest first."""
+    return (["zst"] if zstandard else []) + (["br"] if brotli else []) + ["gz"]
+
+
+def dictionary_id(data: bytes) -> int:
+    """The dictionary ID a zstd frame was compressed with (0 if none)."""
+    return zstandard.get_frame_parameters(data).dict_id
+
+
+def decode(data: bytes, encoding: str, dictionary: bytes | None = None) -> bytes:
+    if encoding == "gz":
+        return gzip.decompress(data)
+    if encoding == "br":
+        return brotli.decompress(data)
+    if encoding == "zst":
+        dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=dict_data).decompress(data)
+    raise ValueError(f"Unknown encoding {encoding!r}")
+
+
+class PayloadClient:
+    """Reads from a URL or a local checkout, keeping the index and dictionaries after the first fetch."""
+
+    def __init__(self, base: str = REPO_ROOT):
+        self.base = base.rstrip("/")
+        self.index = json.loads(self._read(INDEX))
+        self.dictionaries = {}  # dictionary ID -> bytes
+
+    def _read(self, path: str) -> bytes:
+        if self.base.startswith(("http://", "https://")):
+            with urllib.request.urlopen(f"{self.base}/{path}") as response:
+                return response.read()
+        with open(os.path.join(self.base, path), "rb") as f:
+            return f.read()
+
+    def _dictionary(self, dict_id: int) -> bytes | None:
+        if dict_id and dict_id not in self.dictionaries:
+            entry = next((d for d in self.index["dictionaries"].values() if d["id"] == dict_id), None)
+            if entry is None:
+                raise ValueError(f"No dictionary {dict_id} in {INDEX}")
+            data = self._read(entry["path"])
+            if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+                raise ValueError(f"{entry['path']} doesn't match its sha256 in {INDEX}")
+            self.dictionaries[dict_id] = data
+        return self.dictionaries.get(dict_id)
+
+    def get(self, path: str) -> bytes:
+        """The served bytes of path, fetched in the smallest encoding both sides support."""
+        entry = self.index["files"].get(path)
+        if entry is None:
+            return self._read(path)
+        encoding = next(e for e in supported_encodings() + ["raw"] if e == "raw" or e in entry["encodings"])
+        if encoding == "raw":
+            return self._read(path)
+        packed = self._read(f"{path}.{encoding}")
+        dictionary = self._dictionary(dictionary_id(packed)) if encoding == "zst" else None
+        data = decode(packed, encoding, dictionary)
+        if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            raise ValueError(f"{path}.{encoding} doesn't decode to the indexed {path}; rerun compress_payloads.py")
+        return data
+
+    def get_json(self, path: str):
+        return json.loads(self.get(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a served JSON file, fetched through its compressed sibling")
+    parser.add_argument("path", help="Served path, e.g. lyrics/hanuman-chalisa.json")
+    parser.add_argument("--base", default=REPO_ROOT, help="Content URL or checkout (default: this repo)")
+    args = parser.parse_args()
+    try:
+        doc = PayloadClient(args.base).get_json(args.path)
+    except (OSError, ValueError) as e:
+        print(f"✗ {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(doc, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+#!/usr/bin/env python3
+"""Asyncio HTTP server for verse ranges, lyrics, calendar months and the served files.
+
+Clients otherwise read whole source files from GitHub raw: a 4 MB Mahabharata
+book for one shloka, a whole year of calendar for this month. This serves just
+the slice asked for, from parsed data kept in memory (standard library only):
+
+    GET /verses/{collection}/{start}[/{end}]    gita/2.47, mbh/5.1.1/5.1.20, rigveda/1.1 (whole sukta)
+                                                ?limit=N (default 200); "next" names the first verse left out
+    GET /lyrics                                 lyrics catalog, ?type= ?deity= ?category= filters
+    GET /lyrics/{id}                            one catalog entry plus its lyrics file, if there is one
+    GET /calendar                               cities and years
+    GET /calendar/{city}/{YYYY-MM}              a month's events and the templates they use, ?category=
+    GET /calendar/{city}/{from}/{to}            events from YYYY-MM-DD to YYYY-MM-DD inclusive
+    GET /files/{path}                           any served file as-is (Range requests supported)
+    GET /stats                                  cache and request counters
+
+Ranges are prefix-inclusive, as in corpus_reader.py: /verses/ramayana/5.1/5.3
+is every shloka of sargas 1-3 of kaanda 5.
+
+Parsed source files and rendered responses share one LRU cache bounded by
+--cache-mb. A verse file is kept as one compact JSON encoding per verse, so
+an entry's size is the bytes it really holds. A cache entry is dropped as
+soon as a source file it came from changes on disk. Every response has a
+strong ETag (a hash of the body, with "-gz" for the gzip representation),
+and If-None-Match gets a 304. Bodies over 1 KB are gzipped for clients that
+accept it. Files are parsed on a thread pool and each file is loaded only
+once, however many requests are waiting for it, so a 4 MB cold parse doesn't
+stall other connections.
+
+    python3 scripts/read_server.py --port 8080
+    curl -s localhost:8080/verses/gita/2.47 | python3 -m json.tool
+    python3 scripts/load_test.py --url http://127.0.0.1:8080     # see load_test.py
+"""
+
+import argparse
+import asyncio
+import calendar
+import datetime
+import email.utils
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import corpus_reader
+from calendar_query import Calendar
+from content_sync import is_served
+
+REPO_ROOT = corpus_reader.REPO_ROOT
+
+DEFAULT_PORT = 8080
+DEFAULT_CACHE_MB = 256
+DEFAULT_LIMIT = 200
+MAX_LIMIT = 2000
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+KEEPALIVE_TIMEOUT = 15
+MAX_HEADER_LINES = 100
+# Rough per-entry cost of a verse's sort key and list slots on top of its encoded bytes.
+RECORD_OVERHEAD = 120
+# Parsed JSON objects (calendars, catalogs) take about this many times their file size in memory.
+PARSED_OVERHEAD = 3
+
+STATUS_TEXT = {200: "OK", 206: "Partial Content", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 416: "Range Not Satisfiable", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: list | None = None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or []
+
+
+def encode(doc) -> bytes:
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def stamp(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+# --- Cache --------------------------------------------------------------------------
+
+class LRUCache:
+    """Least-recently-used entries go first once the total size passes max_bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (value, size)
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, size: int):
+        self.discard(key)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "bytes": self.bytes, "maxBytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class VerseFile(NamedTuple):
+    keys: list[int]        # corpus_reader.sort_key of each verse, ascending
+    refs: list[str]
+    encoded: list[bytes]   # {"ref": ..., **body} per verse, compact JSON
+
+    @property
+    def size(self) -> int:
+        return sum(len(e) for e in self.encoded) + RECORD_OVERHEAD * len(self.keys)
+
+
+def load_verse_file(collection: str, path: str) -> VerseFile:
+    rows = sorted(
+        ((corpus_reader.sort_key(parts, half), corpus_reader.format_ref(collection, parts, half), body)
+         for parts, half, body in corpus_reader.load(collection, path)),
+        key=lambda row: row[0],
+    )
+    return VerseFile([k for k, _, _ in rows], [r for _, r, _ in rows], [encode({"ref": r, **b}) for _, r, b in rows])
+
+
+def load_json(path: str):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_bytes(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def load_calendar(path: str) -> Calendar:
+    data = load_json(path)
+    return Calendar(data["events"], data["templates"])
+
+
+def upper_key(hi: list[int]) -> int:
+    """Smallest sort key past everything under the prefix hi."""
+    return corpus_reader.sort_key(hi[:-1] + [hi[-1] + 1])
+
+
+class Response(NamedTuple):
+    body: bytes
+    content_type: str
+    etag: str
+    gz: bytes | None
+    deps: tuple   # ((path, stamp), ...) the body was built from
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gz or b"") + 200
+
+
+def make_response(body: bytes, deps, content_type: str = "application/json; charset=utf-8") -> Response:
+    gz = None
+    if len(body) >= GZIP_MIN_BYTES and (content_type.startswith("application/json") or content_type.startswith("text/")):
+        gz = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    return Response(body, content_type, f'"{hashlib.sha256(body).hexdigest()[:32]}"', gz, tuple(deps))
+
+
+# --- HTTP helpers -------------------------------------------------------------------
+
+def accepts_gzip(header: str) -> bool:
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            q = params.strip()
+            try:
+                return not (q.startswith("q=") and float(q[2:]) == 0)
+            except ValueError:
+                return True
+    return False
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def byte_range(header: str, size: int) -> tuple[int, int] | None:
+    """(start, end inclusive) for a single `bytes=` range; None to send the whole file.
+
+    Raises HTTPError(416) when the range starts past the end of the file.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        else:
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPError(416, f"Range {header} is outside the {size}-byte file", [("Content-Range", f"bytes */{size}")])
+    return start, end
+
+
+_date = [0, ""]
+
+
+def http_date() -> str:
+    now = int(time.time())
+    if _date[0] != now:
+        _date[:] = [now, email.utils.formatdate(now, usegmt=True)]
+    return _date[1]
+
+
+# --- Server -------------------------------------------------------------------------
+
+class ReadServer:
+    def __init__(self, root: str = REPO_ROOT, cache_bytes: int = DEFAULT_CACHE_MB << 20, workers: int | None = None):
+        self.root = root
+        self.cache = LRUCache(cache_bytes)
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.loading = {}      # cache key -> Future, so concurrent misses share one load
+        self.files = {}        # collection -> source files, listed on first use
+        self.requests = {}     # status -> count
+        self.started = time.time()
+
+    def path(self, rel: str) -> str:
+        return os.path.join(self.root, rel)
+
+    async def parsed(self, key: tuple, path: str, loader, size=None):
+        """Load path with loader (on the pool), cached under key until the file changes."""
+        current = stamp(path)
+        if current is None:
+            raise HTTPError(404, f"{os.path.relpath(path, self.root)} does not exist")
+        hit = self.cache.get(key)
+        if hit is not None and hit[0] == current:
+            return hit[1]
+        if key not in self.loading:
+            self.loading[key] = asyncio.get_running_loop().run_in_executor(self.pool, loader, path)
+        future = self.loading[key]
+        try:
+            value = await asyncio.shield(future)
+        finally:
+            if self.loading.get(key) is future and future.done():
+                del self.loading[key]
+        self.cache.put(key, (current, value), size(value) if size else current[1] * PARSED_OVERHEAD)
+        return value
+
+    # --- Endpoints ---
+
+    async def verses(self, collection: str, start: str, end: str | None, query: dict) -> tuple[dict, list]:
+        if collection not in corpus_reader.COLLECTIONS:
+            raise HTTPError(404, f"Unknown collection {collection!r} (have: {', '.join(corpus_reader.COLLECTIONS)})")
+        try:
+            lo = corpus_reader.parse_ref(f"{collection}:{start}")[1]
+            hi = corpus_reader.parse_ref(f"{collection}:{end or start}")[1]
+            limit = int(query.get("limit", [DEFAULT_LIMIT])[0])
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        if not 0 < limit <= MAX_LIMIT:
+            raise HTTPError(400, f"limit must be between 1 and {MAX_LIMIT}")
+        if len(lo) > 3 or len(hi) > 3:
+            raise HTTPError(400, "References have at most three numeric parts")
+
+        spec = corpus_reader.COLLECTIONS[collection]
+        if collection not in self.files:
+            self.files[collection] = spec.files()
+        # One verse past the limit tells us where the next page starts.
+        refs, out, deps = [], [], []
+        lo_key, hi_key = corpus_reader.sort_key(lo), upper_key(hi)
+        for path in self.files[collection]:
+            if len(out) > limit:
+                break
+            if spec.file_parts and not corpus_reader.in_range(spec.file_parts(path), lo, hi):
+                continue
+            verse_file = await self.parsed(("verses", collection, path), path,
+                                           lambda p, c=collection: load_verse_file(c, p), lambda v: v.size)
+            deps.append((path, stamp(path)))
+            i, j = bisect_left(verse_file.keys, lo_key), bisect_left(verse_file.keys, hi_key)
+            j = min(j, i + limit + 1 - len(out))
+            refs.extend(verse_file.refs[i:j])
+            out.extend(verse_file.encoded[i:j])
+        next_ref = refs[limit] if len(out) > limit else None
+        out = out[:limit]
+        if not out:
+            raise HTTPError(404, f"No verses in {collection}:{start}" + (f" - {collection}:{end}" if end else ""))
+        head = encode({"collection": collection, "start": f"{collection}:{start}",
+                       "end": f"{collection}:{end or start}", "count": len(out), "next": next_ref})
+        return head[:-1] + b',"verses":[' + b",".join(out) + b"]}", deps
+
+    async def lyrics(self, lyric_id: str | None, query: dict) -> tuple[bytes, list]:
+        catalog_path = self.path("lyrics-catalog.json")
+        catalog = await self.parsed(("json", catalog_path), catalog_path, load_json)
+        deps = [(catalog_path, stamp(catalog_path))]
+        if lyric_id is None:
+            entries = [e for e in catalog if all(e.get(field) == values[0] for field, values in query.items()
+                                                 if field in ("type", "deity", "category"))]
+            return encode({"count": len(entries), "lyrics": entries}), deps
+        entry = next((e for e in catalog if e.get("id") == lyric_id), None)
+        lyrics_path = self.path(f"lyrics/{lyric_id}.json")
+        content = None
+        if os.path.basename(lyrics_path) == f"{lyric_id}.json" and stamp(lyrics_path):
+            content = await self.parsed(("json", lyrics_path), lyrics_path, load_json)
+            deps.append((lyrics_path, stamp(lyrics_path)))
+        if entry is None and content is None:
+            raise HTTPError(404, f"No lyrics {lyric_id!r}")
+        return encode({"entry": entry, "content": content}), deps
+
+    async def calendar(self, parts: list[str], query: dict) -> tuple[bytes, list]:
+        index_path = self.path("calendar/index.json")
+        index = await self.parsed(("json", index_path), index_path, load_json)
+        deps = [(index_path, stamp(index_path))]
+        if not parts:
+            cities = {city: sorted(info["years"]) for city, info in index["cities"].items()}
+            return encode({"cities": cities}), deps
+        city, rest = parts[0], parts[1:]
+        if city not in index["cities"]:
+            raise HTTPError(404, f"Unknown city {city!r} (have: {', '.join(sorted(index['cities']))})")
+        try:
+            if len(rest) == 1:
+                year, month = (int(p) for p in rest[0].split("-"))
+                first = datetime.date(year, month, 1)
+                last = datetime.date(year, month, calendar.monthrange(year, month)[1])
+            elif len(rest) == 2:
+                first, last = datetime.date.fromisoformat(rest[0]), datetime.date.fromisoformat(rest[1])
+            else:
+                raise ValueError("expected /calendar/{city}/{YYYY-MM} or /calendar/{city}/{from}/{to}")
+        except ValueError as e:
+            raise HTTPError(400, f"Bad calendar range: {e}")
+        if last < first or (last - first).days > 366:
+            raise HTTPError(400, "The range must run forwards and cover at most a year")
+
+        category = query.get("category", [None])[0]
+        events, templates = [], {}
+        years = index["cities"][city]["years"]
+        for year in range(first.year, last.year + 1):
+            shard = years.get(str(year))
+            if shard is None:
+                continue
+            shard_path = self.path(f"calendar/{shard['path']}")
+            cal = await self.parsed(("calendar", shard_path), shard_path, load_calendar)
+            deps.append((shard_path, stamp(shard_path)))
+            for event in cal.events_between(first, last, category):
+                events.append(event)
+                if event.get("template") in cal.templates:
+                    templates[event["template"]] = cal.templates[event["template"]]
+        return encode({"city": city, "from": first.isoformat(), "to": last.isoformat(), "count": len(events),
+                       "events": events, "templates": templates}), deps
+
+    async def stats(self) -> bytes:
+        return encode({"uptimeS": round(time.time() - self.started, 1), "cache": self.cache.stats(),
+                       "requests": {str(k): v for k, v in sorted(self.requests.items())}})
+
+    # --- Routing ---
+
+    async def render(self, target: str) -> Response:
+        """Build (or fetch from the cache) the response for a normalized request target."""
+        cached = self.cache.get(("response", target))
+        if cached is not None and all(stamp(path) == st for path, st in cached.deps):
+            return cached
+
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        parts = [unquote(p) for p in url.path.split("/") if p]
+        if not parts:
+            raise HTTPError(404, "See the module docstring of scripts/read_server.py for the endpoints")
+        kind, args = parts[0], parts[1:]
+        content_type = "application/json; charset=utf-8"
+        if kind == "verses" and len(args) in (2, 3):
+            body, deps = await self.verses(args[0], args[1], args[2] if len(args) == 3 else None, query)
+        elif kind == "lyrics" and len(args) <= 1:
+            body, deps = await self.lyrics(args[0] if args else None, query)
+        elif kind == "calendar" and len(args) <= 3:
+            body, deps = await self.calendar(args, query)
+        elif kind == "files" and args:
+            rel = "/".join(args)
+            if ".." in rel.split("/") or not is_served(rel):
+                raise HTTPError(404, f"{rel} is not a served file")
+            path = self.path(rel)
+            body = await self.parsed(("bytes", path), path, read_bytes, len)
+            deps = [(path, stamp(path))]
+            content_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+            if content_type == "application/json":
+                content_type += "; charset=utf-8"
+        elif kind == "stats" and not args:
+            return make_response(await self.stats(), [])
+        else:
+            raise HTTPError(404, f"No endpoint for {url.path}")
+
+        response = make_response(body, deps, content_type)
+        self.cache.put(("response", target), response, response.size)
+        return response
+
+    async def respond(self, method: str, target: str, headers: dict) -> tuple[int, list, bytes]:
+        if method not in ("GET", "HEAD"):
+            raise HTTPError(405, f"{method} is not supported")
+        url = urlsplit(target)
+        query = "&".join(sorted(url.query.split("&"))) if url.query else ""
+        response = await self.render(url.path + ("?" + query if query else ""))
+
+        out = [("Content-Type", response.content_type), ("Cache-Control", "public, max-age=60")]
+        if response.gz is not None:
+            out.append(("Vary", "Accept-Encoding"))
+        body, etag, status = response.body, response.etag, 200
+
+        range_header = headers.get("range")
+        if range_header and url.path.startswith("/files/") and headers.get("if-range", etag) == etag:
+            span = byte_range(range_header, len(body))
+            if span:
+                start, end = span
+                out += [("ETag", etag), ("Content-Range", f"bytes {start}-{end}/{len(body)}"), ("Accept-Ranges", "bytes")]
+                return 206, out, body[start:end + 1]
+
+        if response.gz is not None and accepts_gzip(headers.get("accept-encoding", "")):
+            body, etag = response.gz, etag[:-1] + '-gz"'
+            out.append(("Content-Encoding", "gzip"))
+        out.append(("ETag", etag))
+        if url.path.startswith("/files/"):
+            out.append(("Accept-Ranges", "bytes"))
+        if etag_matches(headers.get("if-none-match", ""), etag):
+            return 304, out, b""
+        return status, out, body
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEPALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                try:
+                    status, out, body = await self.respond(method, target, headers)
+                except HTTPError as e:
+                    status, out, body = e.status, [("Content-Type", "application/json; charset=utf-8"), *e.headers], encode({"error": str(e)})
+                except Exception as e:
+                    status, out, body = 500, [("Content-Type", "application/json; charset=utf-8")], encode({"error": repr(e)})
+                self.requests[status] = self.requests.get(status, 0) + 1
+
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              if version == "HTTP/1.1" else headers.get("connection", "").lower() == "keep-alive")
+                out += [("Date", http_date()), ("Content-Length", str(len(body))),
+                        ("Connection", "keep-alive" if keep_alive else "close")]
+                head = f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n" + "".join(f"{k}: {v}\r\n" for k, v in out)
+                writer.write(head.encode("latin-1") + b"\r\n" + (b"" if method == "HEAD" or status == 304 else body))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        print(f"Serving {self.root} on http://{host}:{port}/ "
+              f"(cache {self.cache.max_bytes >> 20} MB, Ctrl+C to stop)")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve verse ranges, lyrics, calendar months and served files over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB, help="Memory for parsed files and responses")
+    parser.add_argument("--workers", type=int, default=None, help="Threads for parsing files on a cache miss")
+    args = parser.parse_args()
+    server = ReadServer(cache_bytes=args.cache_mb << 20, workers=args.workers)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Compile the scripture corpora into one verse-addressable SQLite store.
+
+Every record gets a canonical reference such as `rigveda:1.1`, `gita:2.47`,
+`mbh:2.1.1a` (Critical Edition line) or `ramayana:5.1.1`, and lives in a
+WITHOUT ROWID table keyed by that reference. Point lookups are a single B-tree
+probe and range lookups walk a (collection, seq) index, so reading one verse
+no longer means json.load-ing a multi-megabyte file.
+
+    python3 scripts/scripture_store.py build
+    python3 scripts/scripture_store.py get gita:2.47 mbh:2.1.1a
+    python3 scripts/scripture_store.py range rigveda:1.1 rigveda:1.3
+    python3 scripts/scripture_store.py range mbh:2.1          # a whole chapter
+
+From Python:
+
+    with ScriptureStore() as store:
+        store.get("gita:2.47")["text"]
+        store.range("mbh:2.1.1", "mbh:2.1.10")
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+import zlib
+
+from corpus_reader import COLLECTIONS, REPO_ROOT, collection_files, format_ref, load, parse_ref, sort_key
+
+DEFAULT_DB = os.path.join(REPO_ROOT, "build", "scripture.sqlite")
+
+# Bodies larger than this are stored zlib-compressed (Gita commentaries, whole suktas).
+COMPRESS_MIN_BYTES = 512
+
+
+# --- Compiler -------------------------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    collection TEXT NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS verses (
+    ref TEXT PRIMARY KEY,
+    collection TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    source INTEGER NOT NULL,
+    body BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS verses_seq ON verses (collection, seq);
+CREATE INDEX IF NOT EXISTS verses_source ON verses (source);
+"""
+
+
+def encode_body(body: dict) -> bytes:
+    raw = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return b"z" + zlib.compress(raw, 6)
+    return b"j" + raw
+
+
+def decode_body(blob: bytes) -> dict:
+    raw = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    return json.loads(raw)
+
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def collect_records(collection: str, loaded) -> tuple[dict, int]:
+    """Key one file's records by ref. Some sources repeat a reference (e.g. a mis-numbered
+    sarga); the first occurrence wins and later ones are attached to it rather than lost."""
+    records = {}
+    duplicates = 0
+    for parts, half, body in loaded:
+        ref = format_ref(collection, parts, half)
+        if ref in records:
+            records[ref][1].setdefault("duplicates", []).append(body)
+            duplicates += 1
+        else:
+            records[ref] = (sort_key(parts, half), body)
+    return records, duplicates
+
+
+def insert_records(conn: sqlite3.Connection, collection: str, source_id: int, records: dict) -> list[tuple[str, str]]:
+    """Insert one file's records; returns (ref, owning path) for each one another file already holds.
+
+    A conflicting record is left out rather than replacing the other file's row: that file may
+    be unchanged and skipped on later builds, so a replaced verse would stay lost.
+    """
+    conflicts = []
+    for ref, (seq, body) in records.items():
+        try:
+            conn.execute("INSERT INTO verses VALUES (?, ?, ?, ?, ?)",
+                         (ref, collection, seq, source_id, encode_body(body)))
+        except sqlite3.IntegrityError:
+            owner = conn.execute(
+                "SELECT s.path FROM verses v JOIN sources s ON s.id = v.source "
+                "WHERE v.ref = ? OR (v.collection = ? AND v.seq = ?) LIMIT 1", (ref, collection, seq)
+            ).fetchone()
+            conflicts.append((ref, owner[0] if owner else "?"))
+    return conflicts
+
+
+def compile_store(db_path: str = DEFAULT_DB, collections: list[str] | None = None, force: bool = False):
+    """Build or incrementally refresh the store; files whose hash is unchanged are skipped."""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    known = {path: (sid, sha) for sid, path, sha in conn.execute("SELECT id, path, sha256 FROM sources")}
+    seen = set()
+    compiled = skipped = 0
+
+    for collection in collections or COLLECTIONS:
+        for path in collection_files(collection):
+            rel = os.path.relpath(path, REPO_ROOT)
+            seen.add(rel)
+            sha = file_sha256(path)
+            if rel in known and known[rel][1] == sha and not force:
+                skipped += 1
+                continue
+
+            t = time.perf_counter()
+            with conn:
+                if rel in known:
+                    source_id = known[rel][0]
+                    conn.execute("DELETE FROM verses WHERE source = ?", (source_id,))
+                    conn.execute("UPDATE sources SET sha256 = ? WHERE id = ?", (sha, source_id))
+                else:
+                    source_id = conn.execute(
+                        "INSERT INTO sources (path, collection, sha256) VALUES (?, ?, ?)", (rel, collection, sha)
+                    ).lastrowid
+                records, duplicates = collect_records(collection, load(collection, path))
+                conflicts = insert_records(conn, collection, source_id, records)
+                if conflicts:
+                    # No hash, so the file is compiled (and the conflicts reported) again on the next build.
+                    conn.execute("UPDATE sources SET sha256 = '' WHERE id = ?", (source_id,))
+            compiled += 1
+            note = f", {duplicates} duplicate ref(s) kept under 'duplicates'" if duplicates else ""
+            if conflicts:
+                print(f"  ⚠️  {rel} ({time.perf_counter() - t:.2f}s{note}, "
+                      f"{len(conflicts)} ref(s) already held by another file were skipped)")
+                for ref, owner in conflicts[:5]:
+                    print(f"      {ref} is in {owner}")
+            else:
+                print(f"  ✓ {rel} ({time.perf_counter() - t:.2f}s{note})")
+
+    if collections is None:
+        for rel in set(known) - seen:
+            with conn:
+                conn.execute("DELETE FROM verses WHERE source = ?", (known[rel][0],))
+                conn.execute("DELETE FROM sources WHERE id = ?", (known[rel][0],))
+            print(f"  🗑  {rel} (source removed)")
+
+    count = conn.execute("SELECT COUNT(*) FROM verses").fetchone()[0]
+    conn.execute("ANALYZE")
+    conn.close()
+    print(f"\n{compiled} file(s) compiled, {skipped} unchanged; {count} records in {db_path} "
+          f"({os.path.getsize(db_path) / 1e6:.1f} MB)")
+
+
+# --- Lookup API -------------------------------------------------------------------
+
+class ScriptureStore:
+    """Read-only, memory-mapped view of a compiled store."""
+
+    def __init__(self, db_path: str = DEFAULT_DB):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"{db_path} not found; run `scripture_store.py build` first")
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.execute("PRAGMA mmap_size = 1073741824")
+        self.conn.execute("PRAGMA cache_size = -2048")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, ref: str) -> dict | None:
+        """Return one record (with its `ref`), or None if the reference does not exist."""
+        collection, parts, half = parse_ref(ref)
+        row = self.conn.execute(
+            "SELECT ref, body FROM verses WHERE ref = ?", (format_ref(collection, parts, half),)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"ref": row[0], **decode_body(row[1])}
+
+    __getitem__ = get
+
+    def range(self, start: str, end: str | None = None, limit: int | None = None) -> list[dict]:
+        """Records from `start` through `end` inclusive, in canonical order.
+
+        Partial references cover everything beneath them, so `range("mbh:2.1")`
+        is the whole of chapter 2.1 and `range("gita:2", "gita:3")` two chapters.
+        """
+        collection, lo_parts, lo_half = parse_ref(start)
+        end_collection, hi_parts, hi_half = parse_ref(end or start)
+        if end_collection != collection:
+            raise ValueError("A range must stay within one collection")
+        lo = sort_key(lo_parts, lo_half)
+        if hi_half:
+            hi = sort_key(hi_parts, hi_half)
+        else:
+            hi = sort_key(hi_parts + [9999] * (3 - len(hi_parts)), "") + 63
+        sql = "SELECT ref, body FROM verses WHERE collection = ? AND seq BETWEEN ? AND ? ORDER BY seq"
+        params = [collection, lo, hi]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [{"ref": ref, **decode_body(body)} for ref, body in self.conn.execute(sql, params)]
+
+    def collections(self) -> dict[str, int]:
+        return dict(self.conn.execute("SELECT collection, COUNT(*) FROM verses GROUP BY collection"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile and query the verse-addressable scripture store")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"Store path (default: {os.path.relpath(DEFAULT_DB, REPO_ROOT)})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Compile (or incrementally refresh) the store")
+    build.add_argument("--collection", nargs="+", choices=sorted(COLLECTIONS), help="Only these collections")
+    build.add_argument("--force", action="store_true", help="Recompile files even if unchanged")
+
+    get = sub.add_parser("get", help="Print records by reference")
+    get.add_argument("refs", nargs="+")
+
+    rng = sub.add_parser("range", help="Print records from START through END")
+    rng.add_argument("start")
+    rng.add_argument("end", nargs="?")
+
+    sub.add_parser("stats", help="Record counts per collection")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        compile_store(args.db, args.collection, force=args.force)
+        return
+
+    with ScriptureStore(args.db) as store:
+        if args.command == "get":
+            records = [store.get(ref) or {"ref": ref, "error": "not found"} for ref in args.refs]
+        elif args.command == "range":
+            records = store.range(args.start, args.end)
+        else:
+            json.dump(store.collections(), sys.stdout, indent=2)
+            print()
+            return
+    for record in records:
+        print(json.dumps(record, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
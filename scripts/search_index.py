@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""Full-text search over every scripture corpus (Devanagari, IAST and ASCII).
+
+Records are streamed by corpus_reader.py, with the same canonical references
+as scripture_store.py. Text is normalised before indexing and querying:
+Unicode-decomposed, lower-cased, with Vedic svara marks (॑ ॒ …), nukta,
+Latin diacritics and zero-width joiners stripped, so `dharmakṣetre`,
+`dharmakSetre` and `dharmaksetre` all hit the same postings and accented
+Rigveda text matches unaccented queries.
+
+The index is a SQLite file with one postings blob per (term, source file), so
+a changed corpus file is re-indexed on its own, plus an append-only vocabulary
+whose trigrams map to term ids for partial-word lookups. Query syntax:
+
+    word            exact (normalised) token
+    word*           prefix
+    *part*          substring anywhere in a token (trigram lookup; ≥3 characters)
+    "two words"     phrase
+    collection:gita restrict to one collection
+
+All clauses must match; hits are ranked by BM25.
+
+    python3 scripts/search_index.py build
+    python3 scripts/search_index.py query 'धर्मक्षेत्रे' '"dharmakṣetre kurukṣetre"' 'collection:rigveda *अग्निम*'
+"""
+
+import argparse
+import array
+import math
+import os
+import re
+import sqlite3
+import time
+import unicodedata
+from collections import defaultdict
+
+from corpus_reader import COLLECTIONS, REPO_ROOT, collection_files, format_ref, load
+from scripture_store import file_sha256
+
+DEFAULT_DB = os.path.join(REPO_ROOT, "build", "search.sqlite")
+
+# Combining Latin diacritics, Devanagari stress/svara marks and nukta, Vedic
+# extensions, ZWJ/ZWNJ and apostrophe-like avagraha stand-ins.
+STRIP_RE = re.compile("[\u0300-\u036f\u093c\u0951-\u0954\u1cd0-\u1cff\ua8e0-\ua8ff\u200c\u200d'\u2018\u2019]")
+# Word characters plus Devanagari (which \w misses for dependent vowel signs), minus the dandas.
+TOKEN_RE = re.compile(r"[\w\u0900-\u0963\u0966-\u097f]+")
+# Gap inserted between fields so a phrase cannot straddle, e.g., `ud` and `ur`.
+FIELD_GAP = 64
+SNIPPET_CHARS = 160
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def normalize(text: str) -> str:
+    return STRIP_RE.sub("", unicodedata.normalize("NFD", text).lower())
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN_RE.findall(normalize(text)) if not t.isdigit()]
+
+
+def trigrams(term: str) -> set[str]:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def searchable_fields(body: dict) -> list[str]:
+    """Text fields worth indexing for one record, primary text first."""
+    text = body.get("text")
+    if isinstance(text, dict):
+        fields = [text[k] for k in ("ud", "ur", "ascii") if k in text]
+    else:
+        fields = [text]
+    fields.extend((body.get("translations") or {}).values())
+    return [f for f in fields if isinstance(f, str) and f]
+
+
+# --- Index builder ----------------------------------------------------------------
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    collection TEXT NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    file INTEGER NOT NULL,
+    ref TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    snippet TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS docs_file ON docs (file);
+CREATE TABLE IF NOT EXISTS vocab (
+    id INTEGER PRIMARY KEY,
+    term TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term INTEGER NOT NULL,
+    file INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (term, file)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_file ON postings (file);
+CREATE TABLE IF NOT EXISTS grams (
+    gram TEXT PRIMARY KEY,
+    terms BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def encode_postings(docs: dict[int, list[int]]) -> bytes:
+    """uint32 array: [n, doc ids…, term freqs…, positions of doc 1…, positions of doc 2…]."""
+    ids = sorted(docs)
+    data = array.array("I", [len(ids)])
+    data.extend(ids)
+    data.extend(len(docs[d]) for d in ids)
+    for d in ids:
+        data.extend(docs[d])
+    return data.tobytes()
+
+
+def decode_postings(blob: bytes) -> dict[int, list[int]]:
+    data = array.array("I")
+    data.frombytes(blob)
+    n = data[0]
+    ids = data[1:n + 1]
+    freqs = data[n + 1:2 * n + 1]
+    out = {}
+    pos = 2 * n + 1
+    for doc, tf in zip(ids, freqs):
+        out[doc] = data[pos:pos + tf]
+        pos += tf
+    return out
+
+
+def index_file(conn, file_id: int, collection: str, path: str, vocab: dict[str, int],
+               new_terms: list[str]) -> int:
+    postings = defaultdict(dict)
+    count = 0
+    for parts, half, body in load(collection, path):
+        fields = searchable_fields(body)
+        doc_terms = defaultdict(list)
+        position = 0
+        for field in fields:
+            for token in tokenize(field):
+                doc_terms[token].append(position)
+                position += 1
+            position += FIELD_GAP
+        snippet = " ".join(fields[0].split())[:SNIPPET_CHARS] if fields else ""
+        doc_id = conn.execute(
+            "INSERT INTO docs (file, ref, length, snippet) VALUES (?, ?, ?, ?)",
+            (file_id, format_ref(collection, parts, half), sum(map(len, doc_terms.values())), snippet),
+        ).lastrowid
+        for token, positions in doc_terms.items():
+            postings[token][doc_id] = positions
+        count += 1
+
+    for term in postings:
+        if term not in vocab:
+            vocab[term] = conn.execute("INSERT INTO vocab (term) VALUES (?)", (term,)).lastrowid
+            new_terms.append(term)
+    conn.executemany(
+        "INSERT INTO postings (term, file, data) VALUES (?, ?, ?)",
+        ((vocab[term], file_id, encode_postings(docs)) for term, docs in postings.items()),
+    )
+    return count
+
+
+def extend_grams(conn, vocab: dict[str, int], new_terms: list[str]):
+    """Append newly seen vocabulary terms to the trigram → term-id lists."""
+    grams = defaultdict(list)
+    for term in new_terms:
+        for gram in trigrams(term):
+            grams[gram].append(vocab[term])
+    with conn:
+        for gram, ids in grams.items():
+            row = conn.execute("SELECT terms FROM grams WHERE gram = ?", (gram,)).fetchone()
+            data = array.array("I")
+            if row:
+                data.frombytes(row[0])
+            data.extend(ids)
+            conn.execute("INSERT OR REPLACE INTO grams (gram, terms) VALUES (?, ?)", (gram, data.tobytes()))
+
+
+def drop_file(conn, file_id: int):
+    for table in ("docs", "postings"):
+        conn.execute(f"DELETE FROM {table} WHERE file = ?", (file_id,))
+
+
+def build_index(db_path: str = DEFAULT_DB, collections: list[str] | None = None, force: bool = False):
+    """Index every corpus file, re-indexing only files whose content hash changed."""
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    conn.executescript(SCHEMA)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+
+    known = {path: (fid, sha) for fid, path, sha in conn.execute("SELECT id, path, sha256 FROM files")}
+    vocab = {term: tid for tid, term in conn.execute("SELECT id, term FROM vocab")}
+    new_terms = []
+    seen = set()
+    indexed = skipped = 0
+
+    for collection in collections or COLLECTIONS:
+        for path in collection_files(collection):
+            rel = os.path.relpath(path, REPO_ROOT)
+            seen.add(rel)
+            sha = file_sha256(path)
+            if rel in known and known[rel][1] == sha and not force:
+                skipped += 1
+                continue
+
+            t = time.perf_counter()
+            with conn:
+                if rel in known:
+                    file_id = known[rel][0]
+                    drop_file(conn, file_id)
+                    conn.execute("UPDATE files SET sha256 = ? WHERE id = ?", (sha, file_id))
+                else:
+                    file_id = conn.execute(
+                        "INSERT INTO files (path, collection, sha256) VALUES (?, ?, ?)", (rel, collection, sha)
+                    ).lastrowid
+                docs = index_file(conn, file_id, collection, path, vocab, new_terms)
+            indexed += 1
+            print(f"  ✓ {rel}: {docs} docs ({time.perf_counter() - t:.2f}s)")
+
+    if collections is None:
+        for rel in set(known) - seen:
+            with conn:
+                drop_file(conn, known[rel][0])
+                conn.execute("DELETE FROM files WHERE id = ?", (known[rel][0],))
+            print(f"  🗑  {rel} (source removed)")
+
+    extend_grams(conn, vocab, new_terms)
+    total = conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+    conn.close()
+    print(f"\n{indexed} file(s) indexed, {skipped} unchanged; {total} docs in {db_path} "
+          f"({os.path.getsize(db_path) / 1e6:.1f} MB)")
+
+
+# --- Query ------------------------------------------------------------------------
+
+CLAUSE_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+
+class SearchIndex:
+    """Read-only query interface over a built index."""
+
+    def __init__(self, db_path: str = DEFAULT_DB):
+        if not os.path.exists(db_path):
+            raise FileNotFoundError(f"{db_path} not found; run `search_index.py build` first")
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.execute("PRAGMA mmap_size = 1073741824")
+        self.n_docs, avg = self.conn.execute("SELECT COUNT(*), AVG(length) FROM docs").fetchone()
+        self.avg_length = avg or 1.0
+        self.file_collection = dict(self.conn.execute("SELECT id, collection FROM files"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _postings(self, term_ids: set[int], files: set[int] | None) -> dict[int, list[int]]:
+        """Merged doc → positions for any of `term_ids`."""
+        merged = defaultdict(list)
+        for term_id in term_ids:
+            for file_id, blob in self.conn.execute("SELECT file, data FROM postings WHERE term = ?", (term_id,)):
+                if files is not None and file_id not in files:
+                    continue
+                for doc, positions in decode_postings(blob).items():
+                    merged[doc].extend(positions)
+        return merged
+
+    def _expand(self, token: str) -> set[int]:
+        """Vocabulary ids matched by one query token (exact, `pre*` or `*sub*`)."""
+        if token.startswith("*") and token.endswith("*") and len(token) > 2:
+            part = normalize(token[1:-1])
+            grams = trigrams(part)
+            if not grams:
+                raise ValueError(f"Substring queries need at least 3 characters: {token!r}")
+            candidates = None
+            for gram in grams:
+                row = self.conn.execute("SELECT terms FROM grams WHERE gram = ?", (gram,)).fetchone()
+                if row is None:
+                    return set()
+                ids = array.array("I")
+                ids.frombytes(row[0])
+                candidates = set(ids) if candidates is None else candidates & set(ids)
+            if len(part) == 3:
+                return candidates
+            return {tid for tid in candidates if part in self._term(tid)}
+        if token.endswith("*") and len(token) > 1:
+            prefix = normalize(token[:-1])
+            rows = self.conn.execute(
+                "SELECT id FROM vocab WHERE term >= ? AND term < ?", (prefix, prefix + "\U0010ffff")
+            )
+            return {r[0] for r in rows}
+        terms = tokenize(token)
+        if not terms:
+            return set()
+        row = self.conn.execute("SELECT id FROM vocab WHERE term = ?", (terms[0],)).fetchone()
+        return {row[0]} if row else set()
+
+    def _term(self, term_id: int) -> str:
+        return self.conn.execute("SELECT term FROM vocab WHERE id = ?", (term_id,)).fetchone()[0]
+
+    def search(self, query: str, limit: int = 20, collection: str | None = None) -> list[dict]:
+        """Ranked hits for `query`: dicts with ref, score, collection and snippet."""
+        files = None
+        clauses = []
+        for phrase, word in CLAUSE_RE.findall(query):
+            if word.startswith("collection:"):
+                collection = word.split(":", 1)[1]
+            elif phrase:
+                clauses.append(("phrase", phrase))
+            else:
+                clauses.append(("term", word))
+        if collection:
+            files = {fid for fid, c in self.file_collection.items() if c == collection}
+        if not clauses:
+            return []
+
+        candidates = None
+        matches = []
+        for kind, text in clauses:
+            if kind == "phrase":
+                matched = self._phrase(text, files)
+            else:
+                term_ids = self._expand(text)
+                matched = self._postings(term_ids, files) if term_ids else {}
+            candidates = set(matched) if candidates is None else candidates & set(matched)
+            if not candidates:
+                return []
+            idf = math.log(1 + (self.n_docs - len(matched) + 0.5) / (len(matched) + 0.5))
+            matches.append((idf, matched))
+
+        docs = self._docs(candidates)
+        ranked = []
+        for doc in candidates:
+            length, ref, snippet, file_id = docs[doc]
+            norm = 1 - BM25_B + BM25_B * length / self.avg_length
+            score = 0.0
+            for idf, matched in matches:
+                tf = len(matched[doc])
+                score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+            ranked.append({
+                "ref": ref,
+                "score": round(score, 4),
+                "collection": self.file_collection[file_id],
+                "snippet": snippet,
+            })
+        ranked.sort(key=lambda hit: -hit["score"])
+        return ranked[:limit]
+
+    def _phrase(self, text: str, files: set[int] | None) -> dict[int, list[int]]:
+        tokens = tokenize(text)
+        if not tokens:
+            return {}
+        per_token = [self._postings(self._expand(t), files) for t in tokens]
+        docs = set(per_token[0])
+        for p in per_token[1:]:
+            docs &= set(p)
+        matched = {}
+        for doc in docs:
+            starts = set(per_token[0][doc])
+            for offset, p in enumerate(per_token[1:], start=1):
+                starts &= {pos - offset for pos in p[doc]}
+                if not starts:
+                    break
+            if starts:
+                matched[doc] = sorted(starts)
+        return matched
+
+    def _docs(self, ids) -> dict[int, tuple]:
+        out = {}
+        ids = list(ids)
+        for i in range(0, len(ids), 900):
+            chunk = ids[i:i + 900]
+            rows = self.conn.execute(
+                f"SELECT id, length, ref, snippet, file FROM docs WHERE id IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for doc, length, ref, snippet, file_id in rows:
+                out[doc] = (length, ref, snippet, file_id)
+        return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query the scripture full-text index")
+    parser.add_argument("--db", default=DEFAULT_DB, help=f"Index path (default: {os.path.relpath(DEFAULT_DB, REPO_ROOT)})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Build or incrementally refresh the index")
+    build.add_argument("--collection", nargs="+", choices=sorted(COLLECTIONS), help="Only these collections")
+    build.add_argument("--force", action="store_true", help="Re-index files even if unchanged")
+
+    query = sub.add_parser("query", help="Run one or more queries")
+    query.add_argument("queries", nargs="+")
+    query.add_argument("--limit", type=int, default=10)
+    query.add_argument("--collection", choices=sorted(COLLECTIONS))
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_index(args.db, args.collection, force=args.force)
+        return
+
+    with SearchIndex(args.db) as index:
+        for q in args.queries:
+            t = time.perf_counter()
+            hits = index.search(q, limit=args.limit, collection=args.collection)
+            print(f"\n{q!r}: {len(hits)} hit(s) in {(time.perf_counter() - t) * 1000:.1f} ms")
+            for hit in hits:
+                print(f"  {hit['score']:8.3f}  {hit['ref']:<22} {hit['snippet'][:90]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""Romanize Devanagari verse text to IAST and ASCII with precompiled tables, in bulk.
+
+Only the Critical Edition carries romanized text (`ur` in IAST and `ascii` in
+Harvard-Kyoto, next to the Devanagari `ud`). This produces the same two forms,
+with the same conventions, for every other corpus:
+
+    ud     संनिधौ  कृष्णात्  ततोऽब्रवीत्  प्राञ्जलिः
+    ur     saṁnidhau  kr̥ṣṇāt  tato’bravīt  prāñjaliḥ
+    ascii  saMnidhau  kRSNAt  tato'bravIt  prAJjaliH
+
+Every consonant (with or without nukta) followed by a virama, a vowel sign or
+nothing is one entry in a table built at import, so a whole verse is one regex
+pass plus one str.translate. Conjuncts fall out of the virama entries. Vedic
+svara marks (U+0951 and U+0952) become a combining acute and a combining
+macron below in IAST, and / and _ in ASCII. A mark written after an anusvara or
+visarga is moved back onto the vowel it belongs to, and a nasal written before
+an avagraha goes after it (दत्तोंऽशः, datto’ṁśaḥ). As in the Critical Edition, ASCII
+writes ॠ as q, ॢ as L and candrabindu as &, and an a directly before an
+independent i or u gets a colon so it doesn't read as ai or au (नारायणउरो,
+nārāyaṇa:uro). Nukta letters get their usual IAST forms (क़ q, ज़ z, ड़ ṛ, फ़ f);
+ASCII drops the nukta where Harvard-Kyoto has no free letter. The Sanskrit
+inherent `a` is always written, also for the Awadhi of the Ramcharitmanas. Text
+outside Devanagari is left alone.
+
+`build` writes one sidecar per source file, build/romanized/{collection}/{file},
+mapping each verse reference to {"ur", "ascii"} for its `text`. It uses a
+process pool, skips files whose source hash is unchanged, and reports any
+Devanagari left in the output (a character no table maps). `verify` checks
+the tables against the Critical Edition's own ud/ur/ascii triples (with
+whitespace ignored, since ur also splits words the Devanagari runs together).
+
+    python3 scripts/transliterate.py text "धर्मक्षेत्रे कुरुक्षेत्रे"
+    python3 scripts/transliterate.py build                       # every corpus except the Critical Edition
+    python3 scripts/transliterate.py build --collection rigveda gita --force
+    python3 scripts/transliterate.py verify                      # exit 1 below --min-agreement
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import corpus_reader
+
+REPO_ROOT = corpus_reader.REPO_ROOT
+DEFAULT_OUT = os.path.join(REPO_ROOT, "build", "romanized")
+SCHEMES = ("iast", "ascii")
+# The Critical Edition already has both forms.
+ROMANIZED = {"mbh"}
+
+# Bump to rebuild every sidecar after changing a table.
+SPEC_VERSION = 2
+
+VIRAMA = "्"
+NUKTA = "़"
+UDATTA, ANUDATTA = "॑", "॒"
+
+# letter: (IAST, ASCII)
+CONSONANTS = {
+    "क": ("k", "k"), "ख": ("kh", "kh"), "ग": ("g", "g"), "घ": ("gh", "gh"), "ङ": ("ṅ", "G"),
+    "च": ("c", "c"), "छ": ("ch", "ch"), "ज": ("j", "j"), "झ": ("jh", "jh"), "ञ": ("ñ", "J"),
+    "ट": ("ṭ", "T"), "ठ": ("ṭh", "Th"), "ड": ("ḍ", "D"), "ढ": ("ḍh", "Dh"), "ण": ("ṇ", "N"),
+    "त": ("t", "t"), "थ": ("th", "th"), "द": ("d", "d"), "ध": ("dh", "dh"), "न": ("n", "n"),
+    "प": ("p", "p"), "फ": ("ph", "ph"), "ब": ("b", "b"), "भ": ("bh", "bh"), "म": ("m", "m"),
+    "य": ("y", "y"), "र": ("r", "r"), "ल": ("l", "l"), "व": ("v", "v"),
+    "श": ("ś", "z"), "ष": ("ṣ", "S"), "स": ("s", "s"), "ह": ("h", "h"),
+    "ळ": ("ḷ", "L"), "ऱ": ("ṟ", "r"), "ऩ": ("ṉ", "n"),
+}
+NUKTA_CONSONANTS = {
+    "क": ("q", "q"), "ख": ("k͟h", "kh"), "ग": ("ġ", "g"), "ज": ("z", "j"),
+    "ड": ("ṛ", "D"), "ढ": ("ṛh", "Dh"), "फ": ("f", "f"), "य": ("ẏ", "y"),
+}
+# independent vowel: (vowel sign or None, IAST, ASCII)
+VOWELS = {
+    "अ": (None, "a", "a"), "आ": ("ा", "ā", "A"), "इ": ("ि", "i", "i"), "ई": ("ी", "ī", "I"),
+    "उ": ("ु", "u", "u"), "ऊ": ("ू", "ū", "U"), "ऋ": ("ृ", "r̥", "R"), "ॠ": ("ॄ", "r̥̄", "q"),
+    "ऌ": ("ॢ", "l̥", "L"), "ॡ": ("ॣ", "l̥̄", "LL"), "ए": ("े", "e", "e"), "ऐ": ("ै", "ai", "ai"),
+    "ओ": ("ो", "o", "o"), "औ": ("ौ", "au", "au"), "ऍ": ("ॅ", "ê", "e"), "ऑ": ("ॉ", "ô", "o"),
+}
+# everything else that maps one character to a fixed string: (IAST, ASCII)
+SIGNS = {
+    "ं": ("ṁ", "M"), "ः": ("ḥ", "H"), "ँ": ("m̐", "&"), "ᳪ": ("ṁ", "M"),
+    "ऽ": ("’", "'"), "ॐ": ("oṁ", "OM"), "।": ("|", "|"), "॥": ("||", "||"), "॰": (".", "."),
+    UDATTA: ("́", "/"), ANUDATTA: ("̱", "_"),
+    **{chr(0x0966 + d): (str(d), str(d)) for d in range(10)},
+}
+# Spellings folded before lookup: precomposed nukta letters, the short-o sign
+# that mahabharata_book_*.json uses for every o (Sanskrit has no short o), and
+# the stray U+093A marks scattered through ValmikiRamayana/2_ayodhyakanda.json.
+NORMALIZE = {
+    **{chr(0x0958 + i): base + NUKTA for i, base in enumerate("कखगजडढफय")},
+    "ॊ": "ो", "ॆ": "े", "ऒ": "ओ", "ऎ": "ए", "\u093a": None,
+}
+
+NORMALIZE_TABLE = str.maketrans(NORMALIZE)
+AVAGRAHA_NASAL_RE = re.compile("([ंँ])(ऽ)")
+# rigveda_mandala_*.json sometimes writes visarga as an ASCII colon (वि॒श्वत॑: परि॒भूरसि॑).
+COLON_VISARGA_RE = re.compile("(?<=[\u0900-\u097f]):")
+# An inherent a directly before इ or उ would read as the diphthong ai or au.
+HIATUS_RE = re.compile("([" + "".join(CONSONANTS) + "]" + NUKTA + "?)(?=[इउ])")
+DEVANAGARI_RE = re.compile("[\u0900-\u097f]")
+SYLLABLE_RE = re.compile(
+    "([" + "".join(CONSONANTS) + "]" + NUKTA + "?)(" + VIRAMA + "|["
+    + "".join(sign for sign, _, _ in VOWELS.values() if sign) + "])?"
+)
+
+
+def compile_tables(scheme: str) -> tuple[dict, dict, re.Pattern]:
+    """(syllable -> romanization, str.translate table, svara reordering regex) for one scheme."""
+    col = SCHEMES.index(scheme)
+    syllables = {}
+    for letter, forms in CONSONANTS.items():
+        for nukta in ("", NUKTA):
+            consonant = (NUKTA_CONSONANTS.get(letter) if nukta else None) or forms
+            base = letter + nukta
+            syllables[base] = consonant[col] + "a"
+            syllables[base + VIRAMA] = consonant[col]
+            for sign, iast, ascii_ in VOWELS.values():
+                if sign:
+                    syllables[base + sign] = consonant[col] + (iast, ascii_)[col]
+    single = {letter: (iast, ascii_)[col] for letter, (_, iast, ascii_) in VOWELS.items()}
+    # A vowel sign with no consonant before it (after a svara mark, say) still reads as its vowel.
+    single.update({sign: (iast, ascii_)[col] for sign, iast, ascii_ in VOWELS.values() if sign})
+    single.update({char: forms[col] for char, forms in SIGNS.items()})
+    single[NUKTA] = ""
+    # Every virama after a consonant was taken by a syllable entry; what's left follows a vowel sign or a danda.
+    single[VIRAMA] = ""
+    marks = re.escape(SIGNS[UDATTA][col] + SIGNS[ANUDATTA][col])
+    nasals = "|".join(re.escape(SIGNS[c][col]) for c in "ंःँ")
+    reorder = re.compile(f"({nasals})([{marks}]+)")
+    return syllables, str.maketrans(single), reorder
+
+
+TABLES = {scheme: compile_tables(scheme) for scheme in SCHEMES}
+
+
+def transliterate(text: str, scheme: str = "iast") -> str:
+    syllables, single, reorder = TABLES[scheme]
+    text = text.translate(NORMALIZE_TABLE)
+    svara = UDATTA in text or ANUDATTA in text
+    if ":" in text:
+        text = COLON_VISARGA_RE.sub("ः", text)
+    if "ऽ" in text:
+        # The nasal of an elided a is written before the avagraha (दत्तोंऽशः) but read after it.
+        text = AVAGRAHA_NASAL_RE.sub(r"\2\1", text)
+    if "इ" in text or "उ" in text:
+        text = HIATUS_RE.sub(r"\1:", text)
+    text = SYLLABLE_RE.sub(lambda m: syllables[m[0]], text).translate(single)
+    if svara:
+        text = reorder.sub(r"\2\1", text)
+    return text
+
+
+def romanize(text: str) -> dict:
+    return {"ur": transliterate(text, "iast"), "ascii": transliterate(text, "ascii")}
+
+
+# --- Sidecars -------------------------------------------------------------------
+
+def sidecar_path(out_dir: str, collection: str, source: str) -> str:
+    return os.path.join(out_dir, collection, os.path.basename(source))
+
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def leftover_devanagari(text: str) -> int:
+    """Devanagari characters no table mapped (they end up in the output as is)."""
+    return len(DEVANAGARI_RE.findall(text))
+
+
+def romanize_file(collection: str, path: str, out_path: str, digest: str) -> tuple[int, int, int]:
+    """Write one sidecar (runs in a worker process); returns (verses, source bytes, leftover Devanagari)."""
+    verses = {}
+    leftover = 0
+    for parts, half, body in corpus_reader.load(collection, path):
+        if isinstance(body.get("text"), str):
+            forms = romanize(body["text"])
+            leftover += sum(leftover_devanagari(form) for form in forms.values())
+            verses[corpus_reader.format_ref(collection, parts, half)] = forms
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"specVersion": SPEC_VERSION, "source": os.path.relpath(path, REPO_ROOT), "sha256": digest,
+                   "verses": verses}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, out_path)
+    return len(verses), os.path.getsize(path), leftover
+
+
+def is_current(out_path: str, digest: str) -> bool:
+    if not os.path.exists(out_path):
+        return False
+    with open(out_path, encoding="utf-8") as f:
+        # The header fields come first, so there's no need to parse the whole sidecar.
+        head = f.read(512)
+    return f'"specVersion":{SPEC_VERSION},' in head and f'"sha256":"{digest}"' in head
+
+
+def build(collections: list[str], out_dir: str = DEFAULT_OUT, force: bool = False, workers: int | None = None):
+    todo, current = [], 0
+    for collection in collections:
+        for path in corpus_reader.collection_files(collection):
+            digest = file_sha256(path)
+            out_path = sidecar_path(out_dir, collection, path)
+            if not force and is_current(out_path, digest):
+                current += 1
+                continue
+            todo.append((collection, path, out_path, digest))
+
+    print(f"{current} sidecar(s) up to date, {len(todo)} to build")
+    started = time.perf_counter()
+    verses = source_bytes = leftover = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(romanize_file, *job): job for job in todo}
+        for future in as_completed(futures):
+            collection, path, _, _ = futures[future]
+            try:
+                n, size, left = future.result()
+            except Exception as e:
+                print(f"  ✗ {os.path.relpath(path, REPO_ROOT)}: {e}")
+                continue
+            verses += n
+            source_bytes += size
+            leftover += left
+            if left:
+                print(f"  ⚠️  {collection}/{os.path.basename(path)}: {n} verses, {left} Devanagari character(s) left unmapped")
+            else:
+                print(f"  ✓ {collection}/{os.path.basename(path)}: {n} verses")
+    if todo:
+        elapsed = time.perf_counter() - started
+        print(f"\n{verses} verses from {source_bytes / 1e6:.1f} MB in {elapsed:.1f}s "
+              f"({source_bytes / 1e6 / elapsed:.1f} MB/s) → {os.path.relpath(out_dir)}")
+        if leftover:
+            print(f"⚠️  {leftover} Devanagari character(s) left in the output; add them to the tables")
+
+
+def load_sidecar(collection: str, source: str, out_dir: str = DEFAULT_OUT) -> dict:
+    """ref -> {"ur", "ascii"} for one source file, as written by build."""
+    with open(sidecar_path(out_dir, collection, source), encoding="utf-8") as f:
+        return json.load(f)["verses"]
+
+
+# --- Verification against the Critical Edition --------------------------------------
+
+def squash(text: str) -> str:
+    # ud puts the pada separator at a syllable boundary (स्या;देतच्), ur at the word boundary (syād; etac).
+    return "".join(text.replace(";", "").split())
+
+
+def verify(show: int = 10) -> float:
+    checked = agreed = 0
+    misses = {scheme: [] for scheme in SCHEMES}
+    for path in corpus_reader.collection_files("mbh"):
+        for key, raw in corpus_reader.iter_elements(path):
+            text = json.loads(raw)["text"]
+            checked += 1
+            ok = True
+            for scheme, field in zip(SCHEMES, ("ur", "ascii")):
+                got = transliterate(text["ud"], scheme)
+                if squash(got) != squash(text[field]):
+                    ok = False
+                    if len(misses[scheme]) < show:
+                        misses[scheme].append((key, text["ud"].strip(), text[field].strip(), got.strip()))
+            agreed += ok
+    for scheme, rows in misses.items():
+        for key, ud, want, got in rows:
+            print(f"  ✗ {scheme} {key}: {ud}\n      expected {want}\n      got      {got}")
+    agreement = agreed / checked if checked else 0.0
+    print(f"\n{agreed}/{checked} Critical Edition lines match in both schemes ({agreement:.3%})")
+    return agreement
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Romanize Devanagari corpora to IAST and ASCII")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    text_cmd = sub.add_parser("text", help="Romanize text given on the command line")
+    text_cmd.add_argument("text", nargs="+")
+    text_cmd.add_argument("--scheme", choices=SCHEMES, help="Only this scheme (default: both)")
+
+    build_cmd = sub.add_parser("build", help="Write romanized sidecars for whole corpora")
+    build_cmd.add_argument("--collection", nargs="+", choices=sorted(corpus_reader.COLLECTIONS),
+                           help="Only these collections (default: all except mbh)")
+    build_cmd.add_argument("--out", default=DEFAULT_OUT)
+    build_cmd.add_argument("--force", action="store_true", help="Rebuild even if the source is unchanged")
+    build_cmd.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (default: CPU count)")
+
+    verify_cmd = sub.add_parser("verify", help="Check the tables against the Critical Edition's ud/ur/ascii")
+    verify_cmd.add_argument("--show", type=int, default=10, help="Mismatches to print per scheme")
+    verify_cmd.add_argument("--min-agreement", type=float, default=0.99, help="Exit 1 below this share of lines")
+    args = parser.parse_args()
+
+    if args.command == "text":
+        text = " ".join(args.text)
+        for scheme in [args.scheme] if args.scheme else SCHEMES:
+            print(transliterate(text, scheme))
+    elif args.command == "build":
+        build(args.collection or [c for c in corpus_reader.COLLECTIONS if c not in ROMANIZED],
+              args.out, args.force, args.workers)
+    else:
+        if verify(args.show) < args.min_agreement:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()